@@ -1,12 +1,21 @@
 import gevent
+import json
 import os
 from flask import Flask
 # from flask_socketio import SocketIO
-from app.extensions import db, migrate, jwt, socketio
+from app.extensions import db, migrate, jwt, socketio, membership_cache, session_registry, username_cache, username_search_cache, invalidation_bus, metrics, replicas, rate_limiter, room_emitter, compressor
 from flask_cors import CORS
 from flasgger import Swagger
 from app.controllers.user_controller import UserController
 from app.controllers.conversation_controller import ConversationController
+from app.controllers.metrics_controller import MetricsController
+from app.services.message_writer import message_writer
+from app.services.read_cursor_writer import read_cursor_writer
+from app.services.typing_indicators import typing_indicators
+from app.utils.hashing import hasher
+from app.utils.json_provider import FastJSONProvider
+from app.utils.replicas import replica_binds
+from app.commands import seed_cli, archive_cli
 from dotenv import load_dotenv
 from datetime import timedelta
 
@@ -15,6 +24,7 @@ load_dotenv()
 
 # def create_app():
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 
 # Allow origins
 # CORS(app)
@@ -54,6 +64,13 @@ swagger = Swagger(app, template=swagger_template)
 # DB connection 
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv("DATABASE_URL")
 
+# Read replicas (comma separated URLs), reads stay on the primary when unset
+app.config["SQLALCHEMY_BINDS"] = replica_binds(os.getenv("DATABASE_REPLICA_URLS"))
+app.config["REPLICA_STICKY_SIZE"] = int(os.getenv("REPLICA_STICKY_SIZE", 100_000))
+app.config["REPLICA_STICKY_TTL"] = float(os.getenv("REPLICA_STICKY_TTL", 5))
+app.config["REPLICA_MAX_LAG"] = float(os.getenv("REPLICA_MAX_LAG", 2))
+app.config["REPLICA_LAG_CHECK_INTERVAL"] = float(os.getenv("REPLICA_LAG_CHECK_INTERVAL", 1))
+
 # JWT
 app.config["JWT_TOKEN_LOCATION"] = ["cookies"]
 app.config['JWT_SECRET_KEY'] = os.getenv("JWT_SECRET_KEY")
@@ -62,10 +79,108 @@ app.config["JWT_REFRESH_TOKEN_EXPIRES"] = timedelta(days=7)
 app.config["JWT_COOKIE_CSRF_PROTECT"] = False
 app.config["JWT_ACCESS_COOKIE_NAME"] = "access_token_cookie"
 
+# Password hashing
+app.config["BCRYPT_ROUNDS"] = int(os.getenv("BCRYPT_ROUNDS", 12))
+app.config["BCRYPT_WORKERS"] = int(os.getenv("BCRYPT_WORKERS", os.cpu_count() or 1))
+app.config["BCRYPT_MAX_PENDING"] = int(os.getenv("BCRYPT_MAX_PENDING", 64))
+
+# Multi-worker sockets (e.g. redis://localhost:6379/0), in-process when unset
+app.config["SOCKETIO_MESSAGE_QUEUE"] = os.getenv("SOCKETIO_MESSAGE_QUEUE")
+app.config["SESSION_REGISTRY_URL"] = os.getenv("SESSION_REGISTRY_URL", app.config["SOCKETIO_MESSAGE_QUEUE"])
+# Sockets of a worker that stopped refreshing its heartbeat this long ago count as gone
+app.config["SESSION_HEARTBEAT_TTL_MS"] = float(os.getenv("SESSION_HEARTBEAT_TTL_MS", 30000))
+# Read-your-writes markers shared between workers, per process when unset
+app.config["REPLICA_STICKY_URL"] = os.getenv("REPLICA_STICKY_URL", app.config["SESSION_REGISTRY_URL"])
+
+# Socket event token buckets, event -> {"sid": [per second, burst], "user": [per second, burst]}
+app.config["RATE_LIMITS"] = json.loads(os.getenv("RATE_LIMITS")) if os.getenv("RATE_LIMITS") else {
+    "send_message": {"sid": [5, 10], "user": [10, 20]},
+    "join_conversation": {"sid": [10, 50], "user": [20, 100]},
+    "leave_conversation": {"sid": [10, 50]},
+    "mark_read": {"sid": [10, 20]},
+    "typing": {"sid": [10, 20]},
+}
+app.config["RATE_LIMIT_URL"] = os.getenv("RATE_LIMIT_URL", app.config["SESSION_REGISTRY_URL"])
+
+# Room broadcast backpressure
+app.config["EMIT_QUEUE_SIZE"] = int(os.getenv("EMIT_QUEUE_SIZE", 1000))
+app.config["EMIT_QUEUE_TIMEOUT_MS"] = float(os.getenv("EMIT_QUEUE_TIMEOUT_MS", 1000))
+app.config["SOCKET_BACKLOG_LIMIT"] = int(os.getenv("SOCKET_BACKLOG_LIMIT", 1000))
+
+# Response compression (brotli when installed, gzip otherwise)
+app.config["COMPRESSION_ENABLED"] = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+app.config["COMPRESSION_MIN_SIZE"] = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+app.config["COMPRESSION_MIMETYPES"] = os.getenv("COMPRESSION_MIMETYPES", "application/json,application/x-ndjson,text/csv").split(",")
+app.config["COMPRESSION_GZIP_LEVEL"] = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+app.config["COMPRESSION_BROTLI_QUALITY"] = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 4))
+
+# Engine.IO packet compression, applies to long-polling, websocket frames depend on the server's permessage-deflate support
+app.config["SOCKETIO_HTTP_COMPRESSION"] = os.getenv("SOCKETIO_HTTP_COMPRESSION", "true").lower() == "true"
+app.config["SOCKETIO_COMPRESSION_THRESHOLD"] = int(os.getenv("SOCKETIO_COMPRESSION_THRESHOLD", 1024))
+
+# Caches
+app.config["MEMBERSHIP_CACHE_SIZE"] = int(os.getenv("MEMBERSHIP_CACHE_SIZE", 100_000))
+app.config["MEMBERSHIP_CACHE_TTL"] = int(os.getenv("MEMBERSHIP_CACHE_TTL", 300))
+app.config["USERNAME_CACHE_SIZE"] = int(os.getenv("USERNAME_CACHE_SIZE", 100_000))
+app.config["USERNAME_CACHE_TTL"] = int(os.getenv("USERNAME_CACHE_TTL", 600))
+app.config["USERNAME_SEARCH_CACHE_SIZE"] = int(os.getenv("USERNAME_SEARCH_CACHE_SIZE", 10_000))
+app.config["USERNAME_SEARCH_CACHE_TTL"] = int(os.getenv("USERNAME_SEARCH_CACHE_TTL", 30))
+# Caches are per process, invalidations reach the other workers over this Redis
+app.config["CACHE_INVALIDATION_URL"] = os.getenv("CACHE_INVALIDATION_URL", app.config["SESSION_REGISTRY_URL"])
+
+# Group commit for socket messages
+app.config["MESSAGE_BATCHING"] = os.getenv("MESSAGE_BATCHING", "false").lower() == "true"
+app.config["MESSAGE_BATCH_SIZE"] = int(os.getenv("MESSAGE_BATCH_SIZE", 100))
+app.config["MESSAGE_BATCH_DELAY_MS"] = float(os.getenv("MESSAGE_BATCH_DELAY_MS", 5))
+
+# Sync cursors stay this far behind the newest writes so slow commits are not skipped
+app.config["SYNC_SAFETY_MARGIN_MS"] = float(os.getenv("SYNC_SAFETY_MARGIN_MS", 5000))
+
+# Read cursors from rapid scrolling are coalesced for this long
+app.config["READ_CURSOR_FLUSH_MS"] = float(os.getenv("READ_CURSOR_FLUSH_MS", 500))
+
+# Typing indicators: expiry after silence, per-conversation broadcast throttle, timer wheel resolution
+app.config["TYPING_TIMEOUT_MS"] = float(os.getenv("TYPING_TIMEOUT_MS", 5000))
+app.config["TYPING_BROADCAST_INTERVAL_MS"] = float(os.getenv("TYPING_BROADCAST_INTERVAL_MS", 500))
+app.config["TYPING_TICK_MS"] = float(os.getenv("TYPING_TICK_MS", 100))
+
+# Messages older than this are moved to message_archive by `flask archive messages`
+app.config["ARCHIVE_AFTER_DAYS"] = int(os.getenv("ARCHIVE_AFTER_DAYS", 90))
+
 db.init_app(app)
+replicas.init_app(app)
 migrate.init_app(app, db)
 jwt.init_app(app)
-socketio.init_app(app)
+socketio.init_app(
+    app,
+    message_queue=app.config["SOCKETIO_MESSAGE_QUEUE"],
+    http_compression=app.config["SOCKETIO_HTTP_COMPRESSION"],
+    compression_threshold=app.config["SOCKETIO_COMPRESSION_THRESHOLD"]
+)
+session_registry.init_app(app)
+rate_limiter.init_app(app)
+room_emitter.init_app(app)
+membership_cache.init_app(app, "MEMBERSHIP_CACHE")
+username_cache.init_app(app, "USERNAME_CACHE")
+username_search_cache.init_app(app, "USERNAME_SEARCH_CACHE")
+invalidation_bus.register("membership", membership_cache)
+invalidation_bus.register("username", username_cache)
+invalidation_bus.register("username_search", username_search_cache)
+invalidation_bus.init_app(app)
+message_writer.init_app(app)
+read_cursor_writer.init_app(app)
+typing_indicators.init_app(app)
+hasher.init_app(app)
+metrics.init_app(app)
+compressor.init_app(app)
+metrics.register_cache("membership", membership_cache)
+metrics.register_cache("username", username_cache)
+metrics.register_cache("username_search", username_search_cache)
+metrics.gauge("chatster_connected_sockets", "Sockets connected to this process", lambda: session_registry.count())
+metrics.gauge("chatster_room_emit_backlog", "Broadcasts queued across all rooms", lambda: room_emitter.backlog())
+
+app.cli.add_command(seed_cli)
+app.cli.add_command(archive_cli)
 
 message_controller = ConversationController(socketio)
 app.register_blueprint(message_controller.blueprint, url_prefix="/conversations")
@@ -73,6 +188,9 @@ app.register_blueprint(message_controller.blueprint, url_prefix="/conversations"
 user_controller = UserController(socketio)
 app.register_blueprint(user_controller.blueprint, url_prefix="/users")
 
+metrics_controller = MetricsController()
+app.register_blueprint(metrics_controller.blueprint)
+
 # return app
 # if __name__ == "__main__":
 #     socketio.run(app, host="127.0.0.1", port=5000, debug=True)
\ No newline at end of file
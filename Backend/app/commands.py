@@ -0,0 +1,265 @@
+import bisect
+import csv
+import datetime
+import io
+import itertools
+import json
+import random
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from app.extensions import db
+from app.models import conversation_participant
+from app.models.conversation import Conversation
+from app.models.message import Message
+from app.models.archived_message import ArchivedMessage
+from app.models.user import User
+from app.models.username_trigram import UsernameTrigram
+from app.utils.hashing import hash_password
+from app.utils.trigrams import trigrams
+
+seed_cli = AppGroup("seed", help="Bulk load synthetic or imported data for capacity planning.")
+archive_cli = AppGroup("archive", help="Move cold data out of the hot tables.")
+
+SNIPPET_LENGTH = 100
+
+def copy_rows(table, batch):
+    """Streams a batch into a Postgres table with COPY"""
+    columns = list(batch[0].keys())
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([row[column] for column in columns] for row in batch)
+    buffer.seek(0)
+
+    connection = db.engine.raw_connection()
+    try:
+        quoted = ", ".join(f'"{column}"' for column in columns)
+        connection.cursor().copy_expert(f'COPY "{table.name}" ({quoted}) FROM STDIN WITH (FORMAT csv)', buffer)
+        connection.commit()
+    finally:
+        connection.close()
+
+def bulk_insert(table, rows, batch_size):
+    """Inserts rows in large transactions, through COPY on Postgres and executemany elsewhere
+    
+    :returns: int (inserted rows)
+    """
+    use_copy = db.engine.dialect.driver == "psycopg2"
+    total = 0
+
+    for batch in iter(lambda: list(itertools.islice(rows, batch_size)), []):
+        if use_copy:
+            copy_rows(table, batch)
+        else:
+            with db.engine.begin() as connection:
+                connection.execute(table.insert(), batch)
+
+        total += len(batch)
+        click.echo(f"  {table.name}: {total} rows", err=True)
+
+    return total
+
+def sync_sequence(table):
+    """Moves a Postgres id sequence past explicitly inserted ids"""
+    if db.engine.dialect.name == "postgresql":
+        db.session.execute(db.text(f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), (SELECT max(id) FROM \"{table.name}\"))"))
+        db.session.commit()
+
+def skewed_sizes(count, minimum, maximum, skew, rng):
+    """Draws count Pareto distributed sizes clamped to [minimum, maximum]"""
+    return [min(maximum, max(minimum, int(minimum * rng.paretovariate(skew)))) for _ in range(count)]
+
+def zipf_cumulative_weights(count, skew):
+    """Cumulative Zipf weights so that a few items receive most of the traffic"""
+    return list(itertools.accumulate(1 / (rank ** skew) for rank in range(1, count + 1)))
+
+def id_range(model):
+    """Returns (min, max) primary key of a table"""
+    return db.session.execute(db.select(db.func.min(model.id), db.func.max(model.id))).one()
+
+def index_usernames(after_id, batch_size):
+    """Builds search trigrams for users with id greater than after_id"""
+    def entries():
+        last_id = after_id
+        while True:
+            rows = db.session.execute(
+                db.select(User.id, User.username).where(User.id > last_id).order_by(User.id).limit(batch_size)
+            ).all()
+            if not rows:
+                return
+            for user_id, username in rows:
+                for gram in trigrams(username):
+                    yield {"trigram": gram, "user_id": user_id}
+            last_id = rows[-1].id
+
+    bulk_insert(UsernameTrigram.__table__, entries(), batch_size)
+
+def refresh_conversation_summaries():
+    """Recomputes the denormalized last message summary of every conversation"""
+    db.session.execute(db.text(
+        "UPDATE conversation SET last_message_id = (SELECT max(m.id) FROM message m WHERE m.conversation_id = conversation.id)"
+    ))
+    db.session.execute(db.text(
+        f"""
+        UPDATE conversation SET
+            last_message_at = (SELECT m.timestamp FROM message m WHERE m.id = conversation.last_message_id),
+            last_message_snippet = (SELECT substr(m.content, 1, {SNIPPET_LENGTH}) FROM message m WHERE m.id = conversation.last_message_id),
+            last_message_username = (
+                SELECT u.username FROM message m JOIN "user" u ON u.id = m.sender_id
+                WHERE m.id = conversation.last_message_id
+            )
+        WHERE last_message_id IS NOT NULL
+        """
+    ))
+    db.session.commit()
+
+@seed_cli.command("users")
+@click.option("--count", type=int, required=True, help="Number of users to create.")
+@click.option("--password", default="password", show_default=True, help="Shared password, hashed once.")
+@click.option("--batch-size", type=int, default=50_000, show_default=True)
+@click.option("--prefix", default="user", show_default=True, help="Username/email prefix.")
+def seed_users(count, password, batch_size, prefix):
+    """Generate users sharing one pre-hashed password"""
+    hashed = hash_password(password)
+    _, last_id = id_range(User)
+    offset = (last_id or 0) + 1
+
+    rows = (
+        {"email": f"{prefix}{i}@example.com", "username": f"{prefix}{i}", "password": hashed, "membership_version": 0}
+        for i in range(offset, offset + count)
+    )
+    bulk_insert(User.__table__, rows, batch_size)
+    index_usernames(last_id or 0, batch_size)
+
+@seed_cli.command("conversations")
+@click.option("--count", type=int, required=True, help="Number of conversations to create.")
+@click.option("--min-members", type=int, default=2, show_default=True)
+@click.option("--max-members", type=int, default=5000, show_default=True)
+@click.option("--skew", type=float, default=1.5, show_default=True, help="Pareto shape of room sizes, lower means more large rooms.")
+@click.option("--batch-size", type=int, default=50_000, show_default=True)
+@click.option("--seed", "random_seed", type=int, default=0, show_default=True)
+def seed_conversations(count, min_members, max_members, skew, batch_size, random_seed):
+    """Generate conversations with skewed member counts drawn from existing users"""
+    rng = random.Random(random_seed)
+    first_user, last_user = id_range(User)
+    if first_user is None:
+        raise click.ClickException("Seed users first.")
+
+    _, last_conversation = id_range(Conversation)
+    first_new = (last_conversation or 0) + 1
+    now = datetime.datetime.now(datetime.timezone.utc)
+
+    bulk_insert(
+        Conversation.__table__,
+        ({"id": i, "chat_name": f"conversation {i}", "last_message_at": now} for i in range(first_new, first_new + count)),
+        batch_size
+    )
+    sync_sequence(Conversation.__table__)
+
+    sizes = skewed_sizes(count, min_members, min(max_members, last_user - first_user + 1), skew, rng)
+
+    def participants():
+        for conversation_id, size in zip(range(first_new, first_new + count), sizes):
+            for user_id in rng.sample(range(first_user, last_user + 1), size):
+                yield {"user_id": user_id, "conversation_id": conversation_id}
+
+    bulk_insert(conversation_participant, participants(), batch_size)
+
+@seed_cli.command("messages")
+@click.option("--count", type=int, required=True, help="Number of messages to create.")
+@click.option("--skew", type=float, default=1.1, show_default=True, help="Zipf exponent of conversation activity.")
+@click.option("--days", type=int, default=365, show_default=True, help="Spread messages over this many past days.")
+@click.option("--batch-size", type=int, default=100_000, show_default=True)
+@click.option("--seed", "random_seed", type=int, default=0, show_default=True)
+def seed_messages(count, skew, days, batch_size, random_seed):
+    """Generate messages concentrated on a few hot conversations"""
+    rng = random.Random(random_seed)
+
+    members = {}
+    for user_id, conversation_id in db.session.execute(db.select(conversation_participant.c.user_id, conversation_participant.c.conversation_id)):
+        members.setdefault(conversation_id, []).append(user_id)
+    if not members:
+        raise click.ClickException("Seed conversations first.")
+
+    conversation_ids = list(members)
+    rng.shuffle(conversation_ids)
+    cumulative = zipf_cumulative_weights(len(conversation_ids), skew)
+    total_weight = cumulative[-1]
+
+    start = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days)
+    step = datetime.timedelta(days=days) / max(count, 1)
+
+    def messages():
+        for i in range(count):
+            conversation_id = conversation_ids[bisect.bisect(cumulative, rng.random() * total_weight)]
+            yield {
+                "content": f"message {i}",
+                "timestamp": start + step * i,
+                "conversation_id": conversation_id,
+                "sender_id": rng.choice(members[conversation_id]),
+            }
+
+    bulk_insert(Message.__table__, messages(), batch_size)
+    refresh_conversation_summaries()
+
+@seed_cli.command("import-messages")
+@click.argument("source", type=click.File("r"))
+@click.option("--batch-size", type=int, default=100_000, show_default=True)
+def import_messages(source, batch_size):
+    """Import NDJSON messages with conversation_id, sender_id, content and timestamp fields"""
+    def messages():
+        for line in source:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            yield {
+                "content": entry["content"],
+                "timestamp": datetime.datetime.fromisoformat(entry["timestamp"]),
+                "conversation_id": int(entry["conversation_id"]),
+                "sender_id": int(entry["sender_id"]),
+            }
+
+    bulk_insert(Message.__table__, messages(), batch_size)
+    refresh_conversation_summaries()
+
+def archive_message_batch(cutoff, batch_size):
+    """Moves the oldest batch of messages sent before cutoff into message_archive in one transaction
+    
+    :returns: int (moved rows)
+    """
+    ids = db.session.execute(
+        db.select(Message.id).where(Message.timestamp < cutoff).order_by(Message.id).limit(batch_size)
+    ).scalars().all()
+    if not ids:
+        return 0
+
+    columns = ["id", "content", "timestamp", "conversation_id", "sender_id"]
+    db.session.execute(
+        db.insert(ArchivedMessage).from_select(
+            columns,
+            db.select(Message.id, Message.content, Message.timestamp, Message.conversation_id, Message.sender_id).where(Message.id.in_(ids))
+        )
+    )
+    db.session.execute(db.delete(Message).where(Message.id.in_(ids)).execution_options(synchronize_session=False))
+    db.session.commit()
+
+    return len(ids)
+
+@archive_cli.command("messages")
+@click.option("--older-than-days", type=int, default=None, help="Archive messages older than this. Defaults to ARCHIVE_AFTER_DAYS.")
+@click.option("--batch-size", type=int, default=5_000, show_default=True)
+def archive_messages(older_than_days, batch_size):
+    """Move messages older than the cutoff from message into message_archive in batches"""
+    if older_than_days is None:
+        older_than_days = current_app.config["ARCHIVE_AFTER_DAYS"]
+
+    cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=older_than_days)
+    total = 0
+    while True:
+        moved = archive_message_batch(cutoff, batch_size)
+        if not moved:
+            break
+
+        total += moved
+        click.echo(f"  message_archive: {total} rows", err=True)
+
+    click.echo(f"Archived {total} messages older than {cutoff.isoformat()}")
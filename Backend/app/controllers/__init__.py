@@ -1,2 +0,0 @@
-connected_users = {} # sid -> user_id
-connected_sessions = {} # user_id -> sid
\ No newline at end of file
@@ -1,11 +1,21 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.services.conversation_service import ConversationService
 from app.services.user_service import UserService
+from app.services.typing_indicators import typing_indicators
 from flask_socketio import emit, join_room, leave_room
-from app.controllers import connected_users, connected_sessions
+from app.extensions import session_registry, metrics, replicas, rate_limiter, room_emitter
+from app.utils.session_registry import user_room
 from app.dtos.conversation_dto import ConversationDTO
 from app.dtos.message_dto import MessageDTO
+from app.dtos.search_result_dto import SearchResultDTO
+from app.dtos.membership_event_dto import MembershipEventDTO
+from app.dtos.base import utc
+from app.utils.http_cache import not_modified, tag
+from app.utils import json_provider
+import csv
+import datetime
+import io
 
 class ConversationController:
     def __init__(self, socketio):
@@ -21,62 +31,233 @@ class ConversationController:
 
         @self.blueprint.route("/conversations", methods=["GET"])
         @jwt_required()
+        @replicas.read_only
         def get_conversations():
             """
             Return a list of conversations for the logged-in user
             ---
             tags:
                 - Conversation
-            summary: Get a list of the user's conversations.
+            summary: Get a list of the user's conversations with their unread counts, most recently active first.
             security:
             - jwt: []
+            parameters:
+                - in: query
+                  name: limit
+                  type: integer
+                  required: false
+                  description: Maximum number of conversations to return. All conversations are returned when omitted.
+                - in: query
+                  name: before
+                  type: string
+                  required: false
+                  description: Opaque cursor from a previous response's next_cursor.
             responses:
                 200:
                     description: A list of conversations retrieved successfully.
+                304:
+                    description: Not modified since the ETag sent in If-None-Match.
+                400:
+                    description: Invalid cursor.
                 401:
                     description: Unauthorized - Missing or invalid JWT token.
             """
             user_id = get_jwt_identity()
-            conversations = self.service.get_conversations(user_id)
-            conversations_dto = list()
-            for conversation in conversations:
-                try:
-                    last_message = self.service.get_messages(conversation.id, 1, 0)[0]
-                    conv_dto = ConversationDTO(conversation.id, conversation.chat_name, last_message.content, last_message.sender.username, last_message.timestamp.isoformat(), True).__dict__
-                except IndexError:
-                    conv_dto = ConversationDTO(conversation.id, conversation.chat_name, "", "", "", True).__dict__
-                conversations_dto.append(conv_dto)
-            # conversations_dto = [ConversationDTO.from_conversation(conversation).__dict__ for conversation in conversations]
-            return jsonify({"conversations": conversations_dto}), 200
+            limit = request.args.get("limit", type=int)
+            before = request.args.get("before")
+
+            etag = self.service.get_inbox_etag(user_id, limit, before)
+            cached = not_modified(etag)
+            if cached:
+                return cached
+
+            try:
+                conversations = self.service.get_inbox(user_id, limit, before)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            conversations_dto = [
+                ConversationDTO.from_conversation(conversation, True, unread_count).to_dict()
+                for conversation, unread_count in conversations
+            ]
+            next_cursor = self.service.get_inbox_cursor(conversations, limit)
+            return tag(jsonify({"conversations": conversations_dto, "next_cursor": next_cursor}), etag), 200
         
         @self.blueprint.route("/all_conversations", methods=["GET"])
         @jwt_required()
+        @replicas.read_only
         def get_all_conversations():
             """
             Return a list of all conversations
             ---
             tags:
                 - Conversation
-            summary: Get a list of all conversations.
+            summary: Get a page of all conversations.
             security:
             - jwt: []
+            parameters:
+                - in: query
+                  name: limit
+                  type: integer
+                  required: false
+                  default: 100
+                  description: Number of conversations to return, clamped to 1..500.
+                - in: query
+                  name: after
+                  type: string
+                  required: false
+                  description: Opaque cursor from a previous response's next_cursor.
+                - in: query
+                  name: name
+                  type: string
+                  required: false
+                  description: Only return conversations whose name contains this text.
             responses:
                 200:
                     description: A list of conversations retrieved successfully.
+                304:
+                    description: Not modified since the ETag sent in If-None-Match.
+                400:
+                    description: Invalid cursor.
                 401:
                     description: Unauthorized - Missing or invalid JWT token.
             """
             user_id = get_jwt_identity()
-            conversations = self.service.get_all_conversations()
-            conversations_dto = list()
-            for conversation in conversations:
-                can_access = self.service.is_user_in_conversation(user_id, conversation.id)
-                conv_dto = ConversationDTO(conversation.id, conversation.chat_name, "", "", "", can_access).__dict__
-                conversations_dto.append(conv_dto)
-            return jsonify({"conversations": conversations_dto}), 200
+            limit = max(1, min(request.args.get("limit", 100, type=int), 500))
+            after = request.args.get("after")
+            name = request.args.get("name")
+
+            etag = self.service.get_directory_etag(user_id, limit, after, name)
+            cached = not_modified(etag)
+            if cached:
+                return cached
+
+            try:
+                rows = self.service.get_conversation_directory(user_id, limit, after, name)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            conversations_dto = [
+                ConversationDTO(row.id, row.chat_name, "", "", "", bool(row.can_access)).to_dict()
+                for row in rows
+            ]
+            next_cursor = self.service.get_directory_cursor(rows, limit)
+            return tag(jsonify({"conversations": conversations_dto, "next_cursor": next_cursor}), etag), 200
+
+        @self.blueprint.route("/search", methods=["GET"])
+        @jwt_required()
+        @replicas.read_only
+        def search_messages():
+            """
+            Full-text search over messages of the user's conversations
+            ---
+            tags:
+                - Conversation
+            summary: Search message content, best matches first.
+            security:
+            - jwt: []
+            parameters:
+                - in: query
+                  name: q
+                  type: string
+                  required: true
+                  description: Search terms.
+                - in: query
+                  name: limit
+                  type: integer
+                  required: false
+                  default: 20
+                  description: Maximum number of results to return.
+                - in: query
+                  name: after
+                  type: string
+                  required: false
+                  description: Opaque cursor from a previous response's next_cursor.
+            responses:
+                200:
+                    description: Ranked results with highlighted snippets.
+                400:
+                    description: Missing query or invalid cursor.
+                401:
+                    description: Unauthorized - Missing or invalid JWT token.
+            """
+            user_id = get_jwt_identity()
+            query = (request.args.get("q") or "").strip()
+            limit = max(1, min(request.args.get("limit", 20, type=int), 100))
+            after = request.args.get("after")
+
+            if not query:
+                return jsonify({"error": "q is required"}), 400
+
+            try:
+                rows = self.service.search_messages(user_id, query, limit, after)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            results_dto = [SearchResultDTO.from_row(row).to_dict() for row in rows]
+            next_cursor = self.service.get_search_cursor(rows, limit)
+            return jsonify({"results": results_dto, "next_cursor": next_cursor}), 200
+
+        @self.blueprint.route("/sync", methods=["GET"])
+        @jwt_required()
+        @replicas.read_only
+        def sync():
+            """
+            Return everything that changed for the user since a sync cursor
+            ---
+            tags:
+                - Conversation
+            summary: Delta sync for reconnecting clients. New messages across all of the user's conversations, membership changes and newly joined conversations.
+            security:
+            - jwt: []
+            parameters:
+                - in: query
+                  name: since
+                  type: string
+                  required: false
+                  description: Opaque cursor from a previous response's next_cursor. Without it only the current cursor is returned.
+                - in: query
+                  name: limit
+                  type: integer
+                  required: false
+                  default: 500
+                  description: Maximum number of messages and of membership events to return (max 1000).
+            responses:
+                200:
+                    description: >
+                        Changes in ID order. Keep calling with next_cursor while has_more is true.
+                        Delivery is at least once, deduplicate by ID. The cursor stays SYNC_SAFETY_MARGIN_MS
+                        behind the newest writes, so those are returned again by the next sync, and nothing
+                        committed within that margin of being written is ever skipped.
+                400:
+                    description: Invalid cursor.
+                401:
+                    description: Unauthorized - Missing or invalid JWT token.
+            """
+            user_id = get_jwt_identity()
+            since = request.args.get("since")
+            limit = max(1, min(request.args.get("limit", 500, type=int), 1000))
+
+            if not since:
+                next_cursor = self.service.get_sync_cursor(user_id)
+                return jsonify({"messages": [], "membership": [], "conversations": [], "next_cursor": next_cursor, "has_more": False}), 200
+
+            try:
+                messages, events, conversations, next_cursor, has_more = self.service.get_changes(user_id, since, limit)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            return jsonify({
+                "messages": [MessageDTO.from_message(message).to_dict() for message in messages],
+                "membership": [MembershipEventDTO.from_event(event).to_dict() for event in events],
+                "conversations": [ConversationDTO.from_conversation(conversation, True).to_dict() for conversation in conversations],
+                "next_cursor": next_cursor,
+                "has_more": has_more
+            }), 200
 
         @self.blueprint.route("/conversations/<int:conversation_id>/messages", methods=["GET"])
         @jwt_required()
+        @replicas.read_only
         def get_messages(conversation_id):
             """
             Return messages for a specific conversation
@@ -103,10 +284,17 @@ class ConversationController:
                   type: integer
                   required: false
                   default: 0
-                  description: The starting message offset for pagination.
+                  description: The starting message offset for pagination (ignored when before is given).
+                - in: query
+                  name: before
+                  type: string
+                  required: false
+                  description: Opaque cursor from a previous response's next_cursor. Returns messages older than it.
             responses:
                 200:
                     description: Messages retrieved successfully.
+                304:
+                    description: Not modified since the ETag sent in If-None-Match.
                 401:
                     description: Unauthorized - Missing or invalid JWT token.
                 403:
@@ -115,19 +303,168 @@ class ConversationController:
             user_id = get_jwt_identity()
 
             if not self.service.is_user_in_conversation(user_id, conversation_id):
-                print(user_id)
                 return jsonify({"error": "Access denied"}), 403
             
             limit = int(request.args.get("limit", 30))
             offset = int(request.args.get("offset", 0))
+            before = request.args.get("before")
 
-            messages = self.service.get_messages(conversation_id, limit, offset)
+            etag = self.service.get_history_etag(conversation_id, limit, None if before else offset, before)
+            cached = not_modified(etag)
+            if cached:
+                return cached
+
+            try:
+                if before:
+                    messages = self.service.get_messages_before(conversation_id, limit, before)
+                else:
+                    messages = self.service.get_messages(conversation_id, limit, offset)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
 
             messages_dto = [
-                MessageDTO.from_message(m).__dict__
+                MessageDTO.from_message(m).to_dict()
                 for m in messages
             ]
-            return jsonify({"messages": messages_dto}), 200
+            next_cursor = self.service.get_next_cursor(messages, limit)
+            return tag(jsonify({"messages": messages_dto, "next_cursor": next_cursor}), etag), 200
+
+        @self.blueprint.route("/conversations/<int:conversation_id>/export", methods=["GET"])
+        @jwt_required()
+        def export_messages(conversation_id):
+            """
+            Stream a full export of a conversation
+            ---
+            tags:
+                - Conversation
+            summary: Export all messages of a conversation, oldest first, as NDJSON or CSV.
+            security:
+            - jwt: []
+            parameters:
+                - in: path
+                  name: conversation_id
+                  type: integer
+                  required: true
+                  description: The ID of the conversation to export.
+                - in: query
+                  name: format
+                  type: string
+                  enum: [ndjson, csv]
+                  required: false
+                  default: ndjson
+                  description: Output format.
+                - in: query
+                  name: since
+                  type: string
+                  format: date-time
+                  required: false
+                  description: Only export messages sent after this ISO 8601 timestamp (incremental export).
+            responses:
+                200:
+                    description: Streamed export.
+                400:
+                    description: Invalid format or since timestamp.
+                401:
+                    description: Unauthorized - Missing or invalid JWT token.
+                403:
+                    description: Access denied - User is not a participant in this conversation.
+            """
+            user_id = get_jwt_identity()
+
+            if not self.service.is_user_in_conversation(user_id, conversation_id):
+                return jsonify({"error": "Access denied"}), 403
+
+            export_format = request.args.get("format", "ndjson")
+            if export_format not in ("ndjson", "csv"):
+                return jsonify({"error": "format must be ndjson or csv"}), 400
+
+            since = request.args.get("since")
+            try:
+                # Stored timestamps are naive UTC
+                since = utc(datetime.datetime.fromisoformat(since)).replace(tzinfo=None) if since else None
+            except ValueError:
+                return jsonify({"error": "since must be an ISO 8601 timestamp"}), 400
+
+            def generate_ndjson():
+                for row in self.service.export_messages(conversation_id, since):
+                    yield json_provider.dumps(MessageDTO(row.id, row.content, row.timestamp, row.conversation_id, row.sender_name).to_dict()) + "\n"
+
+            def generate_csv():
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerow(("id", "timestamp", "sender_name", "content"))
+                rows = self.service.export_messages(conversation_id, since)
+                while True:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+
+                    row = next(rows, None)
+                    if row is None:
+                        break
+                    writer.writerow((row.id, utc(row.timestamp).isoformat(), row.sender_name, row.content))
+
+            if export_format == "csv":
+                body, mimetype = generate_csv(), "text/csv"
+            else:
+                body, mimetype = generate_ndjson(), "application/x-ndjson"
+
+            filename = f"conversation-{conversation_id}.{export_format}"
+            return Response(
+                stream_with_context(body),
+                mimetype=mimetype,
+                headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+            )
+
+        @self.blueprint.route("/conversations/<int:conversation_id>/read", methods=["POST"])
+        @jwt_required()
+        def mark_read(conversation_id):
+            """
+            Mark a conversation as read
+            ---
+            tags:
+            - Conversation
+            summary: Move the user's read cursor forward and reset their unread count. Updates are coalesced and persisted shortly after.
+            security:
+            - jwt: []
+            parameters:
+            - in: path
+              name: conversation_id
+              type: integer
+              required: true
+              description: The ID of the conversation that was read.
+            - in: body
+              name: body
+              required: false
+              schema:
+                type: object
+                properties:
+                    message_id:
+                        type: integer
+                        description: ID of the newest message read. The whole conversation is marked read when omitted.
+            responses:
+                202:
+                    description: Read cursor accepted.
+                400:
+                    description: Bad request - Body is not an object or message_id is not an integer.
+                401:
+                    description: Unauthorized - Missing or invalid JWT token.
+                403:
+                    description: Access denied - User is not a participant in this conversation.
+            """
+            user_id = get_jwt_identity()
+            data = request.get_json(silent=True) or {}
+            if not isinstance(data, dict):
+                return jsonify({"error": "Body must be a JSON object!"}), 400
+
+            if not self.service.is_user_in_conversation(user_id, conversation_id):
+                return jsonify({"error": "Access denied"}), 403
+
+            try:
+                self.service.mark_read(user_id, conversation_id, data.get("message_id"))
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            return jsonify({"message": "Read cursor accepted"}), 202
 
         @self.blueprint.route("/conversations/<int:conversation_id>/add_user", methods=["POST"])
         @jwt_required()
@@ -179,10 +516,9 @@ class ConversationController:
 
             try:
                 conversation = self.service.add_user_to_conversation(conversation_id, new_user_id)
-                conversation_dto = ConversationDTO.from_conversation(conversation).__dict__
-                sid = connected_sessions.get(new_user_id)
-                if sid:
-                    self.socketio.emit("new_conversation", conversation_dto, room=sid)
+                self._move_sockets(new_user_id, conversation.id, joined=True)
+                conversation_dto = ConversationDTO.from_conversation(conversation, True).to_dict()
+                self.socketio.emit("new_conversation", conversation_dto, room=user_room(new_user_id))
                 return jsonify({"message": "User added successfully"}), 200
             except ValueError as e:
                 return jsonify({"error": str(e)}), 400
@@ -237,16 +573,11 @@ class ConversationController:
 
 
             conversation = self.service.create_conversation(chat_name, participant_ids)
-            try:
-                last_message = self.service.get_messages(conversation.id, 1, 0)[0]
-                conversation_dto = ConversationDTO(conversation.id, conversation.chat_name, last_message.content, last_message.sender.username, last_message.timestamp.isoformat(), True)
-            except IndexError:
-                conversation_dto = ConversationDTO(conversation.id, conversation.chat_name, "", "", "", True)
+            conversation_dto = ConversationDTO.from_conversation(conversation, True)
             for participant in participant_ids:
-                sid = connected_sessions.get(str(participant), None)
-                if sid:
-                    self.socketio.emit("new_conversation", conversation_dto.__dict__, room=sid)
-            return jsonify(conversation_dto), 201
+                self._move_sockets(participant, conversation.id, joined=True)
+                self.socketio.emit("new_conversation", conversation_dto.to_dict(), room=user_room(participant))
+            return jsonify(conversation_dto.to_dict()), 201
         
         # TODO add these endpoints
         def rename_conversation():
@@ -302,21 +633,33 @@ class ConversationController:
 
             try:
                 conversation = self.service.remove_user_from_conversation(conversation_id, user_id)
-                sid = connected_sessions.get(user_id)
-                if current_user_id == user_id:
-                    leave_room(conversation.id)
+                self._move_sockets(user_id, conversation.id, joined=False)
                 return jsonify({"message": "User added successfully"}), 200
             except ValueError as e:
                 return jsonify({"error": str(e)}), 400
 
 
+    def _move_sockets(self, user_id, room, joined):
+        """Enters every socket of a user into a room, or removes them, whichever worker owns them.
+
+        With a message queue, sockets of other workers are relayed through it.
+        """
+        server = self.socketio.server
+        for sid in session_registry.get_sessions(user_id):
+            if joined:
+                server.enter_room(sid, room, namespace="/")
+            else:
+                server.leave_room(sid, room, namespace="/")
+
     def _register_events(self):
         """Events for real-time updates"""
 
         @self.socketio.on("join_conversation")
+        @metrics.track_event("join_conversation")
+        @rate_limiter.limit("join_conversation")
         def join_conversation(data):
             """Client joins a conversation room"""
-            user_id = connected_users.get(request.sid)
+            user_id = session_registry.get_user(request.sid)
             if not user_id:
                 emit("auth_error", {"error": "User not authenticated!"}, room=request.sid)
                 return
@@ -332,6 +675,8 @@ class ConversationController:
             join_room(conversation_id)
 
         @self.socketio.on("leave_conversation")
+        @metrics.track_event("leave_conversation")
+        @rate_limiter.limit("leave_conversation")
         def leave_conversation(data):
             """Client leaves a conversation room"""
             conversation_id = data.get("conversation_id")
@@ -340,10 +685,40 @@ class ConversationController:
                 return
             leave_room(conversation_id)
 
+        @self.socketio.on("mark_read")
+        @metrics.track_event("mark_read")
+        @rate_limiter.limit("mark_read")
+        def mark_read_event(data):
+            """Client read a conversation up to a message, or entirely when message_id is omitted"""
+            user_id = session_registry.get_user(request.sid)
+            if not user_id:
+                emit("auth_error", {"error": "User not authenticated!"}, room=request.sid)
+                return
+
+            if not isinstance(data, dict):
+                emit("error", {"error": "Payload must be an object!"}, room=request.sid)
+                return
+
+            conversation_id = data.get("conversation_id")
+            if not conversation_id:
+                emit("error", {"error": "Missing conversation id!"}, room=request.sid)
+                return
+
+            if not self.service.is_user_in_conversation(user_id, conversation_id):
+                emit("error", {"error": "User is not part of conversation!"}, room=request.sid)
+                return
+
+            try:
+                self.service.mark_read(user_id, conversation_id, data.get("message_id"))
+            except ValueError as e:
+                emit("error", {"error": str(e)}, room=request.sid)
+
         @self.socketio.on("send_message")
+        @metrics.track_event("send_message")
+        @rate_limiter.limit("send_message")
         def send_message(data):
             """Client sends a message to a conversation"""
-            user_id = connected_users.get(request.sid)
+            user_id = session_registry.get_user(request.sid)
             conversation_id = data.get("conversation_id")
             message = data.get("message")
 
@@ -361,18 +736,37 @@ class ConversationController:
 
             try:
                 message = self.service.add_message(conversation_id, user_id, message)
-                message_dto = MessageDTO.from_message(message).__dict__
-                emit("new_message", message_dto, room=conversation_id)
+                message_dto = MessageDTO.from_message(message, self.user_service.get_username(user_id)).to_dict()
+                if not room_emitter.emit("new_message", message_dto, room=conversation_id):
+                    emit("error", {"error": "Conversation is busy, message saved but not broadcast"}, room=request.sid)
+                typing_indicators.stop(user_id, conversation_id)
             except ValueError as e:
                 emit("error", {"error": str(e)}, room=request.sid)
             except Exception as e:
                 print(f"[Socket Error] send message: {e}")
                 emit("error", {"error": "Internal server error"}, room=request.sid)
 
-        # @self.socketio.on("typing")
-        # def typing(data):
-        #     """Typing indicator"""
-        #     conversation_id = data["conversation_id"]
-        #     # emit("typing", ..., room=conversation_id, include_self=False)
-        #     pass
+        @self.socketio.on("typing")
+        @metrics.track_event("typing")
+        @rate_limiter.limit("typing")
+        def typing(data):
+            """Typing indicator, coalesced and throttled in memory before it reaches the room"""
+            user_id = session_registry.get_user(request.sid)
+            if not user_id:
+                emit("auth_error", {"error": "User not authenticated!"}, room=request.sid)
+                return
+
+            conversation_id = data.get("conversation_id")
+            if not conversation_id:
+                emit("error", {"error": "Missing conversation id!"}, room=request.sid)
+                return
+
+            if not self.service.is_user_in_conversation(user_id, conversation_id):
+                emit("error", {"error": "User is not part of conversation!"}, room=request.sid)
+                return
+
+            if data.get("typing", True):
+                typing_indicators.start(request.sid, user_id, self.user_service.get_username(user_id), conversation_id)
+            else:
+                typing_indicators.stop(user_id, conversation_id)
 
@@ -0,0 +1,26 @@
+from flask import Blueprint, Response
+from app.extensions import metrics
+
+class MetricsController:
+    def __init__(self):
+        self.blueprint = Blueprint("metrics", __name__)
+        self._register_routes()
+
+    def _register_routes(self):
+        """Contains the Prometheus scrape endpoint"""
+
+        @self.blueprint.route("/metrics", methods=["GET"])
+        def get_metrics():
+            """
+            Prometheus metrics
+            ---
+            tags:
+                - Metrics
+            summary: Per-route and per-socket-event counts, latency histograms and SQL usage of this process.
+            produces:
+                - text/plain
+            responses:
+                200:
+                    description: Metrics in the Prometheus text exposition format
+            """
+            return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,15 +1,21 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, current_app
 from flask_jwt_extended import jwt_required, set_access_cookies, decode_token
 from app.services.user_service import UserService
+from app.services.conversation_service import ConversationService
+from app.services.typing_indicators import typing_indicators
 from app.dtos.user_dto import UserDTO
+from app.utils.hashing import HashingBusyError
 from flask_socketio import join_room, leave_room, disconnect, emit
-from app.controllers import connected_users, connected_sessions
+from app.extensions import session_registry, metrics, replicas
+from app.utils.session_registry import user_room
 import jwt
+import time
 
 
 class UserController:
     def __init__(self, socketio):
         self.service = UserService()
+        self.conversation_service = ConversationService()
         self.socketio = socketio
         self.blueprint = Blueprint("user", __name__)
         self._register_routes()
@@ -53,6 +59,8 @@ class UserController:
                     description: User created successfully
                 400:
                     description: User creation failed (e.g., email/username taken)
+                503:
+                    description: Password hashing is saturated, retry later
                 500:
                     description: Internal server error
             """
@@ -67,6 +75,8 @@ class UserController:
                 return jsonify({"message": "User created successfully"}), 201
             except ValueError as e:
                 return jsonify({"error": str(e)}), 400
+            except HashingBusyError as e:
+                return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
             except Exception as e:
                 return jsonify({"error": "Internal server error"}), 500
 
@@ -108,6 +118,8 @@ class UserController:
                                     username: {type: string}
                 401:
                     description: Invalid email or password
+                503:
+                    description: Password hashing is saturated, retry later
             """
             data = request.get_json(silent=True) or {}
             email = data.get("email")
@@ -117,9 +129,11 @@ class UserController:
                 token, user = self.service.login_user(email, password)
             except ValueError as e:
                 return jsonify({"error": str(e)}), 401
+            except HashingBusyError as e:
+                return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
 
             user_dto = UserDTO.from_user(user)
-            response = jsonify({"message": "Login successful", "user": user_dto.__dict__})
+            response = jsonify({"message": "Login successful", "user": user_dto.to_dict()})
 
             set_access_cookies(response, token)
 
@@ -127,6 +141,7 @@ class UserController:
 
         @self.blueprint.route("/search", methods=["GET"])
         @jwt_required()
+        @replicas.read_only
         def search_profiles():
             """
             Search for users by username
@@ -141,9 +156,21 @@ class UserController:
                   name: username
                   required: true
                   description: Desired unique username.
+                - in: query
+                  name: limit
+                  type: integer
+                  required: false
+                  default: 5
+                  description: Maximum number of profiles to return.
+                - in: query
+                  name: offset
+                  type: integer
+                  required: false
+                  default: 0
+                  description: Number of ranked profiles to skip.
             responses:
                 200:
-                    description: List of matching users
+                    description: List of matching users ranked by exact, prefix and infix match
                     schema:
                     type: object
                     properties:
@@ -177,9 +204,12 @@ class UserController:
             if not username:
                 return jsonify({"error": "Username is required"}), 400
             
-            profiles = self.service.get_profiles(username)
+            limit = min(request.args.get("limit", 5, type=int), 50)
+            offset = request.args.get("offset", 0, type=int)
+
+            profiles = self.service.get_profiles(username, limit, offset)
 
-            profiles_dto = [UserDTO.from_user(profile).__dict__ for profile in profiles]
+            profiles_dto = [UserDTO.from_user(profile).to_dict() for profile in profiles]
 
             return jsonify({"profiles": profiles_dto}), 200
         
@@ -187,8 +217,10 @@ class UserController:
     def _register_events(self):
         """Contains endpoints for user authentication and profile management using Websockets"""
         @self.socketio.on("connect")
-        def handle_connect():
+        @metrics.track_event("connect")
+        def handle_connect(auth=None):
             """Client connects via websocket"""
+            started = time.perf_counter()
             try:
                 token = request.cookies.get("access_token_cookie") or request.args.get("access_token_cookie")
                 if not token:
@@ -201,15 +233,23 @@ class UserController:
                     emit("auth_error", {"message": "Invalid token: missing user ID"})
                     return disconnect()
 
-                # Store connection
-                connected_users[request.sid] = user_id
-                connected_sessions[user_id] = request.sid
+                # Store connection, every socket of a user shares their personal room
+                session_registry.add(request.sid, user_id)
+                join_room(user_room(user_id))
 
-                # # Join rooms
-                user = self.service.get_user(user_id)
+                # Join rooms by id only, without loading the user or their conversations
+                authenticated = time.perf_counter()
+                conversation_ids = self.conversation_service.get_conversation_ids(user_id)
+                loaded = time.perf_counter()
 
-                for conversation in user.conversations:
-                    join_room(conversation.id)
+                self._join_rooms(request.sid, conversation_ids)
+                joined = time.perf_counter()
+
+                current_app.logger.info(
+                    f"Connect {request.sid} user={user_id} rooms={len(conversation_ids)} "
+                    f"auth={(authenticated - started) * 1000:.1f}ms db={(loaded - authenticated) * 1000:.1f}ms "
+                    f"join={(joined - loaded) * 1000:.1f}ms total={(joined - started) * 1000:.1f}ms"
+                )
 
             except jwt.ExpiredSignatureError:
                 emit("auth_error", {"message": "Token expired"})
@@ -219,8 +259,17 @@ class UserController:
                 return disconnect()
 
         @self.socketio.on("disconnect")
-        def handle_disconnect():
+        @metrics.track_event("disconnect")
+        def handle_disconnect(reason=None):
             """Client disconnects from websocket"""
-            user_id = connected_users.pop(request.sid, None)
-            session_id = connected_sessions.pop(user_id, None)
-            print("Session disconnected: " + request.sid)
\ No newline at end of file
+            session_registry.remove(request.sid)
+            typing_indicators.disconnect(request.sid)
+            current_app.logger.debug(f"Session disconnected: {request.sid}")
+
+    def _join_rooms(self, sid, rooms):
+        """Enters a socket into many rooms directly through the Socket.IO server"""
+        server = self.socketio.server
+        namespace = request.namespace
+
+        for room in rooms:
+            server.enter_room(sid, room, namespace=namespace)
@@ -0,0 +1,37 @@
+from dataclasses import dataclass, fields
+import datetime
+import typing
+
+def utc(value):
+    """Returns datetimes as aware UTC, naive ones being UTC as stored; other values pass through"""
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is None:
+            return value.replace(tzinfo=datetime.timezone.utc)
+        return value.astimezone(datetime.timezone.utc)
+    return value
+
+def _is_datetime(annotation) -> bool:
+    return annotation is datetime.datetime or datetime.datetime in typing.get_args(annotation)
+
+def dto(cls):
+    """Turns a class into a slotted dataclass with a generated to_dict method.
+
+    to_dict is compiled once per class into a plain dict literal, avoiding the
+    per-call field introspection of dataclasses.asdict. Datetime fields are serialized
+    as aware UTC, whether they were read back naive or created aware in this process.
+    """
+    cls = dataclass(slots=True)(cls)
+
+    items = ", ".join(
+        f"{field.name!r}: utc(self.{field.name})" if _is_datetime(field.type) else f"{field.name!r}: self.{field.name}"
+        for field in fields(cls)
+    )
+    namespace = {"utc": utc}
+    exec(f"def to_dict(self):\n    return {{{items}}}\n", namespace)
+
+    to_dict = namespace["to_dict"]
+    to_dict.__doc__ = f"Serialize a {cls.__name__} into a plain dict"
+    to_dict.__qualname__ = f"{cls.__qualname__}.to_dict"
+    cls.to_dict = to_dict
+
+    return cls
@@ -1,28 +1,28 @@
-from dataclasses import dataclass
+from app.dtos.base import dto
 from app.models.conversation import Conversation
+import datetime
 
-@dataclass
+@dto
 class ConversationDTO:
     id: int
     chat_name: str
     last_message: str
     last_message_username: str
-    last_message_time: str
+    last_message_time: datetime.datetime | str
     can_access: bool
+    unread_count: int = 0
 
     @classmethod
-    def from_conversation(cls, conversation: Conversation):
-        """Create a ConversationDTO from a Conversation ORM instance"""
-        last_message = ""
-        last_message_username = ""
-        last_message_time = ""
-        can_access = False
+    def from_conversation(cls, conversation: Conversation, can_access: bool = False, unread_count: int = 0):
+        """Create a ConversationDTO from a Conversation ORM instance and its last message summary"""
+        has_message = conversation.last_message_id is not None
         
         return cls(
             id=conversation.id,
             chat_name=conversation.chat_name,
-            last_message=last_message,
-            last_message_username=last_message_username,
-            last_message_time=last_message_time,
-            can_access = can_access
+            last_message=conversation.last_message_snippet if has_message else "",
+            last_message_username=conversation.last_message_username if has_message else "",
+            last_message_time=conversation.last_message_at if has_message else "",
+            can_access = can_access,
+            unread_count = unread_count
         )
\ No newline at end of file
@@ -0,0 +1,15 @@
+from app.dtos.base import dto
+from app.models.membership_event import MembershipEvent
+import datetime
+
+@dto
+class MembershipEventDTO:
+    id: int
+    conversation_id: int
+    kind: str
+    timestamp: datetime.datetime
+
+    @classmethod
+    def from_event(cls, event: MembershipEvent):
+        """Create a MembershipEventDTO from a MembershipEvent ORM instance"""
+        return cls(id=event.id, conversation_id=event.conversation_id, kind=event.kind, timestamp=event.timestamp)
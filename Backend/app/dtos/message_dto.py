@@ -1,15 +1,18 @@
-from dataclasses import dataclass
+from app.dtos.base import dto
 from app.models.message import Message
+import datetime
 
-@dataclass
+@dto
 class MessageDTO:
     id: int
     content: str
-    timestamp: str
+    timestamp: datetime.datetime
     conversation_id: int
     sender_name: str
 
     @classmethod
-    def from_message(cls, message: Message):
-        """Create a MessageDTO from a Message ORM instance"""
-        return cls(id=message.id, content=message.content, timestamp=message.timestamp.isoformat(), conversation_id=message.conversation_id, sender_name=message.sender.username)
\ No newline at end of file
+    def from_message(cls, message: Message, sender_name: str | None = None):
+        """Create a MessageDTO from a Message ORM instance, sender_name spares loading the sender"""
+        if sender_name is None:
+            sender_name = message.sender.username
+        return cls(id=message.id, content=message.content, timestamp=message.timestamp, conversation_id=message.conversation_id, sender_name=sender_name)
\ No newline at end of file
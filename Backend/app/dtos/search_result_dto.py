@@ -0,0 +1,16 @@
+from app.dtos.base import dto
+import datetime
+
+@dto
+class SearchResultDTO:
+    id: int
+    conversation_id: int
+    chat_name: str
+    sender_name: str
+    timestamp: datetime.datetime
+    snippet: str
+
+    @classmethod
+    def from_row(cls, row):
+        """Create a SearchResultDTO from a message search row"""
+        return cls(id=row.id, conversation_id=row.conversation_id, chat_name=row.chat_name, sender_name=row.sender_name, timestamp=row.timestamp, snippet=row.snippet)
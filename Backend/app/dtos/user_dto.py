@@ -1,7 +1,7 @@
-from dataclasses import dataclass
+from app.dtos.base import dto
 from app.models.user import User
 
-@dataclass
+@dto
 class UserDTO:
     id: int
     username: str
@@ -10,4 +10,4 @@ class UserDTO:
     @classmethod
     def from_user(cls, user: User):
         """Create a UserDTO from a User ORM instance"""
-        return cls(id=user.id, username=user.username, email=user.email)
\ No newline at end of file
+        return cls(id=user.id, username=user.username, email=user.email)
@@ -2,8 +2,27 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from flask_socketio import SocketIO
+from app.utils.cache import LRUCache
+from app.utils.invalidation import InvalidationBus
+from app.utils.session_registry import SessionRegistry
+from app.utils.metrics import Metrics
+from app.utils.replicas import RoutingSession, ReplicaRouter
+from app.utils.rate_limit import RateLimiter
+from app.utils.room_emitter import RoomEmitter
+from app.utils.compression import Compressor
+from app.utils import json_provider
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"expire_on_commit": False, "class_": RoutingSession})
 migrate = Migrate()
 jwt = JWTManager()
-socketio = SocketIO(path="socket.io" ,cors_allowed_origins="*")
+socketio = SocketIO(path="socket.io" ,cors_allowed_origins="*", json=json_provider)
+membership_cache = LRUCache(maxsize=100_000, ttl=300) # (user_id, conversation_id) -> bool
+session_registry = SessionRegistry()
+username_cache = LRUCache(maxsize=100_000, ttl=600) # user_id -> username
+username_search_cache = LRUCache(maxsize=10_000, ttl=30) # (term, limit, offset) -> List[Row]
+invalidation_bus = InvalidationBus()
+metrics = Metrics()
+replicas = ReplicaRouter()
+rate_limiter = RateLimiter(session_registry)
+room_emitter = RoomEmitter(socketio)
+compressor = Compressor()
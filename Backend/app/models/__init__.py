@@ -3,9 +3,15 @@ from app import db
 conversation_participant = db.Table(
     'conversation_participant',
     db.Column('user_id', db.Integer, db.ForeignKey('user.id'), primary_key=True),
-    db.Column('conversation_id', db.Integer, db.ForeignKey('conversation.id'), primary_key=True)
+    db.Column('conversation_id', db.Integer, db.ForeignKey('conversation.id'), primary_key=True),
+    # Read cursor and unread counter, maintained by add_messages and mark_read
+    db.Column('last_read_message_id', db.Integer, nullable=True),
+    db.Column('unread_count', db.Integer, nullable=False, default=0, server_default='0')
 )
 
 from .conversation import Conversation
 from .message import Message
 from .user import User
+from .username_trigram import UsernameTrigram
+from .archived_message import ArchivedMessage
+from .membership_event import MembershipEvent
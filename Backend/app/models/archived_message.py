@@ -0,0 +1,18 @@
+from app import db
+from sqlalchemy.orm import relationship
+import datetime
+
+class ArchivedMessage(db.Model):
+    # Cold tier of message, filled by `flask archive messages` with rows older than every hot message
+    __tablename__ = 'message_archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    content = db.Column(db.String, nullable=False)
+    timestamp: datetime.datetime = db.Column(db.DateTime, nullable=False)
+    conversation_id = db.Column(db.Integer, db.ForeignKey('conversation.id'), nullable=False)
+    sender_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+
+    sender = relationship("User", viewonly=True)
+
+    __table_args__ = (
+        db.Index("ix_message_archive_conversation_timestamp_id", "conversation_id", "timestamp", "id"),
+    )
@@ -1,11 +1,22 @@
 from app import db
 from sqlalchemy.orm import relationship
 from . import conversation_participant
+import datetime
 
 class Conversation(db.Model):
     __tablename__ = 'conversation'
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     chat_name = db.Column(db.String, nullable=False)
 
+    # Denormalized summary of the latest message, maintained by add_message
+    last_message_id = db.Column(db.Integer, nullable=True)
+    last_message_at: datetime.datetime = db.Column(db.DateTime, nullable=False, default=lambda: datetime.datetime.now(datetime.timezone.utc))
+    last_message_username = db.Column(db.String, nullable=True)
+    last_message_snippet = db.Column(db.String, nullable=True)
+
     messages = relationship("Message", back_populates="conversation")
-    users = relationship("User", secondary=conversation_participant, back_populates="conversations")
\ No newline at end of file
+    users = relationship("User", secondary=conversation_participant, back_populates="conversations")
+
+    __table_args__ = (
+        db.Index("ix_conversation_last_message_at_id", "last_message_at", "id"),
+    )
@@ -0,0 +1,15 @@
+from app import db
+import datetime
+
+class MembershipEvent(db.Model):
+    # Append-only log of membership changes read by /conversations/sync, rows outlive their conversation
+    __tablename__ = 'membership_event'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    conversation_id = db.Column(db.Integer, nullable=False)
+    kind = db.Column(db.String(16), nullable=False) # "added" | "removed"
+    timestamp: datetime.datetime = db.Column(db.DateTime, nullable=False, default=lambda: datetime.datetime.now(datetime.timezone.utc))
+
+    __table_args__ = (
+        db.Index("ix_membership_event_user_id_id", "user_id", "id"),
+    )
@@ -12,3 +12,8 @@ class Message(db.Model):
 
     conversation = relationship("Conversation", back_populates="messages")
     sender = relationship("User", back_populates="messages")
+
+    __table_args__ = (
+        db.Index("ix_message_conversation_timestamp_id", "conversation_id", "timestamp", "id"),
+        db.Index("ix_message_conversation_id_id", "conversation_id", "id"),
+    )
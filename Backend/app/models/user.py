@@ -8,6 +8,12 @@ class User(db.Model):
     email = db.Column(db.String, unique=True, nullable=False)
     username = db.Column(db.String, unique=True, nullable=False)
     password = db.Column(db.String, nullable=False)
+    # Bumped whenever the user joins or leaves a conversation, used as a cache validator
+    membership_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
     messages = relationship("Message", back_populates="sender")
-    conversations = relationship("Conversation", secondary=conversation_participant, back_populates="users")
\ No newline at end of file
+    conversations = relationship("Conversation", secondary=conversation_participant, back_populates="users")
+
+    __table_args__ = (
+        db.Index("ix_user_username_lower", db.func.lower(username)),
+    )
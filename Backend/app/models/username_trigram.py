@@ -0,0 +1,6 @@
+from app import db
+
+class UsernameTrigram(db.Model):
+    __tablename__ = 'username_trigram'
+    trigram = db.Column(db.String(3), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True, index=True)
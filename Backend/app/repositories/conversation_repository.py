@@ -1,10 +1,58 @@
-from app.extensions import db
-from sqlalchemy import desc
+from app.extensions import db, membership_cache, invalidation_bus, replicas
+from sqlalchemy import desc, or_, and_, func, tuple_
+from sqlalchemy.orm import joinedload
+from sqlalchemy.exc import IntegrityError
 from app.models.conversation import Conversation
 from app.models.user import User
 from app.models.message import Message
+from app.models.archived_message import ArchivedMessage
+from app.models.membership_event import MembershipEvent
+from app.models import conversation_participant
+from app.repositories.user_repository import UserRepository
+import datetime
+
+SNIPPET_LENGTH = 100
+FOREIGN_KEY_VIOLATION = "23503"
+READ_CURSOR_ATTEMPTS = 3
+SEARCH_HIGHLIGHT = "**"
+TS_CONFIG = "simple"
+
+SQLITE_SEARCH = f"""
+    SELECT m.id, m.conversation_id, c.chat_name, u.username AS sender_name, m.timestamp,
+           snippet(message_fts, 0, '{SEARCH_HIGHLIGHT}', '{SEARCH_HIGHLIGHT}', '…', 16) AS snippet,
+           -message_fts.rank AS score
+    FROM message_fts
+    JOIN message m ON m.id = message_fts.rowid
+    JOIN conversation_participant cp ON cp.conversation_id = m.conversation_id AND cp.user_id = :user_id
+    JOIN conversation c ON c.id = m.conversation_id
+    JOIN "user" u ON u.id = m.sender_id
+    WHERE message_fts MATCH :query
+      AND (:after_score IS NULL OR (-message_fts.rank, m.id) < (:after_score, :after_id))
+    ORDER BY score DESC, m.id DESC
+    LIMIT :limit
+"""
+
+POSTGRES_SEARCH = f"""
+    SELECT * FROM (
+        SELECT m.id, m.conversation_id, c.chat_name, u.username AS sender_name, m.timestamp,
+               ts_headline('{TS_CONFIG}', m.content, q, 'StartSel={SEARCH_HIGHLIGHT}, StopSel={SEARCH_HIGHLIGHT}, MaxWords=24, MinWords=8') AS snippet,
+               CAST(ts_rank(m.search_vector, q) AS double precision) AS score
+        FROM message m
+        CROSS JOIN websearch_to_tsquery('{TS_CONFIG}', :query) q
+        JOIN conversation_participant cp ON cp.conversation_id = m.conversation_id AND cp.user_id = :user_id
+        JOIN conversation c ON c.id = m.conversation_id
+        JOIN "user" u ON u.id = m.sender_id
+        WHERE m.search_vector @@ q
+    ) results
+    WHERE CAST(:after_score AS double precision) IS NULL
+       OR (score, id) < (CAST(:after_score AS double precision), CAST(:after_id AS integer))
+    ORDER BY score DESC, id DESC
+    LIMIT :limit
+"""
 
 class ConversationRepository:
+    def __init__(self):
+        self.user_repository = UserRepository()
     
     def get_all(self):
         """Retrieves all conversations.
@@ -13,6 +61,49 @@ class ConversationRepository:
         """
         return db.session.execute(db.select(Conversation)).scalars().all()
     
+    def get_page_with_access(self, user_id, limit, after_id=None, name=None):
+        """Retrieves a page of conversations ordered by ID, flagged with whether the user participates in each.
+        
+        :returns: List[Row(id, chat_name, can_access)]
+        """
+        is_participant = (
+            db.select(conversation_participant.c.conversation_id)
+            .where(
+                conversation_participant.c.conversation_id == Conversation.id,
+                conversation_participant.c.user_id == user_id
+            )
+            .exists()
+        )
+
+        query = db.select(Conversation.id, Conversation.chat_name, is_participant.label("can_access"))
+
+        if after_id is not None:
+            query = query.filter(Conversation.id > after_id)
+
+        if name:
+            query = query.filter(Conversation.chat_name.ilike(f"%{name}%"))
+
+        query = query.order_by(Conversation.id).limit(limit)
+
+        return db.session.execute(query).all()
+    
+    def get_ids_by_user_id(self, user_id):
+        """Retrieves the IDs of all conversations of a user and primes the membership cache with them.
+        
+        :returns: List[int]
+        """
+        query = (
+            db.select(conversation_participant.c.conversation_id)
+            .where(conversation_participant.c.user_id == int(user_id))
+        )
+        generation = membership_cache.generation
+        conversation_ids = db.session.execute(query).scalars().all()
+
+        for conversation_id in conversation_ids:
+            membership_cache.set((int(user_id), conversation_id), True, generation)
+
+        return conversation_ids
+
     def get_by_user_id(self, user_id):
         """Retrieves all conversations for user
         
@@ -22,12 +113,127 @@ class ConversationRepository:
         
         return user.conversations
 
+    def get_inbox(self, user_id, limit=None, before=None):
+        """Retrieves user conversations with their unread counters ordered by latest activity, older than the (last_message_at, id) keyset.
+        
+        :returns: List[Row(Conversation, unread_count)]
+        """
+        query = (
+            db.select(Conversation, conversation_participant.c.unread_count)
+            .join(conversation_participant, conversation_participant.c.conversation_id == Conversation.id)
+            .filter(conversation_participant.c.user_id == user_id)
+        )
+
+        if before is not None:
+            query = query.filter(tuple_(Conversation.last_message_at, Conversation.id) < tuple_(*before))
+
+        query = query.order_by(desc(Conversation.last_message_at), desc(Conversation.id))
+
+        if limit is not None:
+            query = query.limit(limit)
+
+        return db.session.execute(query).all()
+
+    def is_participant(self, conversation_id, user_id):
+        """Checks conversation membership through the membership cache, falling back to the participant table.
+        
+        :returns: Boolean
+        """
+        key = (int(user_id), int(conversation_id))
+        is_member = membership_cache.get(key)
+
+        if is_member is None:
+            generation = membership_cache.generation
+            query = (
+                db.select(conversation_participant.c.user_id)
+                .where(
+                    conversation_participant.c.user_id == key[0],
+                    conversation_participant.c.conversation_id == key[1]
+                )
+            )
+            is_member = db.session.execute(query).first() is not None
+            membership_cache.set(key, is_member, generation)
+
+        return is_member
+
+    def get_history_version(self, conversation_id):
+        """Retrieves the latest message ID of a conversation as its history version.
+        
+        :returns: int | None
+        """
+        return db.session.execute(
+            db.select(Conversation.last_message_id).where(Conversation.id == conversation_id)
+        ).scalar_one_or_none()
+
+    def get_inbox_version(self, user_id):
+        """Retrieves the user's membership version, the newest message ID across their conversations and their read progress.
+        
+        :returns: Row(membership_version, last_message_id, read_position, unread_total)
+        """
+        query = (
+            db.select(
+                User.membership_version,
+                func.max(Conversation.last_message_id).label("last_message_id"),
+                func.sum(func.coalesce(conversation_participant.c.last_read_message_id, 0)).label("read_position"),
+                func.sum(conversation_participant.c.unread_count).label("unread_total")
+            )
+            .select_from(User)
+            .outerjoin(conversation_participant, conversation_participant.c.user_id == User.id)
+            .outerjoin(Conversation, Conversation.id == conversation_participant.c.conversation_id)
+            .where(User.id == user_id)
+            .group_by(User.id, User.membership_version)
+        )
+        return db.session.execute(query).one()
+
+    def get_membership_version(self, user_id):
+        """Retrieves the user's membership version.
+        
+        :returns: int | None
+        """
+        return db.session.execute(
+            db.select(User.membership_version).where(User.id == user_id)
+        ).scalar_one_or_none()
+
+    def get_directory_version(self):
+        """Retrieves the newest conversation ID and conversation count.
+        
+        :returns: Row(last_id, total)
+        """
+        return db.session.execute(
+            db.select(func.max(Conversation.id).label("last_id"), func.count(Conversation.id).label("total"))
+        ).one()
+
+    def _bump_membership_versions(self, user_ids):
+        """Invalidates cache validators of users whose memberships changed, committed together with the caller"""
+        db.session.execute(
+            db.update(User)
+            .where(User.id.in_(user_ids))
+            .values(membership_version=User.membership_version + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+    def _record_membership_events(self, user_ids, conversation_id, kind):
+        """Appends membership changes to the sync log, committed together with the caller"""
+        db.session.execute(
+            db.insert(MembershipEvent),
+            [{"user_id": user_id, "conversation_id": conversation_id, "kind": kind} for user_id in user_ids]
+        )
+
     def get_by_id(self, conversation_id):
         """Retrieves a single conversation by its ID.
         
         :returns: Conversation
         """
         return db.session.get(Conversation, conversation_id)
+
+    def get_by_ids(self, conversation_ids):
+        """Retrieves conversations by their IDs, skipping deleted ones.
+        
+        :returns: List[Conversation]
+        """
+        return db.session.execute(
+            db.select(Conversation).where(Conversation.id.in_(conversation_ids))
+        ).scalars().all()
     
 
     def create(self, chat_name, initial_user_id):
@@ -44,8 +250,13 @@ class ConversationRepository:
         new_conversation.users.append(initial_user)
         
         db.session.add(new_conversation)
+        db.session.flush()
+        self._bump_membership_versions([initial_user.id])
+        self._record_membership_events([initial_user.id], new_conversation.id, "added")
 
         db.session.commit() 
+        invalidation_bus.invalidate("membership", (int(initial_user_id), new_conversation.id))
+        replicas.mark_write(initial_user.id)
         return new_conversation
 
     def add_user(self, conversation_id, user_id):
@@ -64,7 +275,11 @@ class ConversationRepository:
         
         if user not in conversation.users:
             conversation.users.append(user)
+            self._bump_membership_versions([user.id])
+            self._record_membership_events([user.id], conversation.id, "added")
             db.session.commit()
+            invalidation_bus.invalidate("membership", (user.id, conversation.id))
+            replicas.mark_write(user.id)
             return conversation
         return None
     
@@ -84,7 +299,11 @@ class ConversationRepository:
         
         if user in conversation.users:
             conversation.users.remove(user)
+            self._bump_membership_versions([user.id])
+            self._record_membership_events([user.id], conversation.id, "removed")
             db.session.commit()
+            invalidation_bus.invalidate("membership", (user.id, conversation.id))
+            replicas.mark_write(user.id)
             return conversation
         return None
     
@@ -110,8 +329,14 @@ class ConversationRepository:
         if not conversation:
             raise ValueError("Conversation does not exist!")
 
+        user_ids = [user.id for user in conversation.users]
+        self._bump_membership_versions(user_ids)
+        if user_ids:
+            self._record_membership_events(user_ids, conversation.id, "removed")
         db.session.delete(conversation)
         db.session.commit()
+        invalidation_bus.invalidate_matching("membership", 1, int(conversation_id))
+        replicas.mark_write(*user_ids)
 
         return True
     
@@ -122,37 +347,335 @@ class ConversationRepository:
         
         :returns: Message
         """
+        timestamp = datetime.datetime.now(datetime.timezone.utc)
 
-        conversation = self.get_by_id(conversation_id)
-        sender = db.session.get(User, sender_id)
+        return self.add_messages([(conversation_id, sender_id, content, timestamp)])[0]
+    
+    @staticmethod
+    def _violates_sender_key(error: IntegrityError) -> bool:
+        """Tells a message.sender_id foreign key violation apart from other integrity errors"""
+        code = getattr(error.orig, "sqlstate", None) or getattr(error.orig, "pgcode", None)
+        if code is not None:
+            return code == FOREIGN_KEY_VIOLATION and "sender_id" in str(getattr(error.orig.diag, "constraint_name", ""))
 
-        if not conversation:
+        # SQLite names neither the constraint nor the column, conversations are locked by then so only the sender is left
+        return "FOREIGN KEY constraint failed" in str(error.orig)
+
+    def add_messages(self, entries):
+        """Creates messages from (conversation_id, sender_id, content, timestamp) entries and persists them in one transaction.
+
+        Neither conversations nor senders are loaded, sender usernames come from the username cache.
+        Conversations are checked before anything is inserted, so a missing one is a ValueError rather
+        than a foreign key violation at flush.
+        
+        :returns: List[Message]
+        """
+        if any(not isinstance(content, str) or not content.strip() for _, _, content, _ in entries):
+            raise ValueError("Message cannot be empty!")
+
+        conversation_ids = {int(conversation_id) for conversation_id, _, _, _ in entries}
+        # FOR KEY SHARE keeps the conversations from being deleted until commit without blocking their summary updates
+        existing = db.session.execute(
+            db.select(Conversation.id)
+            .where(Conversation.id.in_(conversation_ids))
+            .with_for_update(read=True, key_share=True)
+        ).scalars().all()
+        if len(existing) != len(conversation_ids):
+            db.session.rollback()
             raise ValueError("Conversation does not exist!")
 
-        if not sender:
-            raise ValueError("User does not exist!")
+        new_messages = []
+        sender_names = {}
+        for conversation_id, sender_id, content, timestamp in entries:
+            sender_name = self.user_repository.get_username(sender_id)
+            if sender_name is None:
+                raise ValueError("User does not exist!")
 
-        new_message = Message(
-            content = content,
-            sender = sender
-        )
+            new_message = Message(
+                content = content,
+                conversation_id = int(conversation_id),
+                sender_id = int(sender_id),
+                timestamp = timestamp
+            )
+            new_messages.append(new_message)
+            sender_names[new_message.sender_id] = sender_name
+
+        db.session.add_all(new_messages)
+        try:
+            db.session.flush()
+        except IntegrityError as e:
+            db.session.rollback()
+            # A sender deleted after its username was cached, anything else is not the client's doing
+            if self._violates_sender_key(e):
+                raise ValueError("User does not exist!")
+            raise
+
+        latest_messages = {message.conversation_id: message for message in new_messages}
+        for conversation_id, message in latest_messages.items():
+            db.session.execute(
+                db.update(Conversation)
+                .where(Conversation.id == conversation_id)
+                .values(
+                    last_message_id = message.id,
+                    last_message_at = message.timestamp,
+                    last_message_username = sender_names[message.sender_id],
+                    last_message_snippet = message.content[:SNIPPET_LENGTH]
+                )
+                .execution_options(synchronize_session=False)
+            )
+
+        self._bump_unread_counts(new_messages)
 
-        conversation.messages.append(new_message)
-        db.session.add(conversation)
         db.session.commit()
-        return new_message
-    
+        replicas.mark_write(*sender_names)
+        return new_messages
+
+    def _bump_unread_counts(self, new_messages):
+        """Adds new messages to participants' unread counters, committed together with the caller.
+
+        Senders have read everything up to their own latest message.
+        """
+        participant = conversation_participant.c
+        by_conversation = {}
+        for message in new_messages:
+            by_conversation.setdefault(message.conversation_id, []).append(message)
+
+        for conversation_id, messages in by_conversation.items():
+            db.session.execute(
+                db.update(conversation_participant)
+                .where(participant.conversation_id == conversation_id)
+                .values(unread_count=participant.unread_count + len(messages))
+            )
+
+            last_sent = {message.sender_id: position for position, message in enumerate(messages)}
+            for sender_id, position in last_sent.items():
+                db.session.execute(
+                    db.update(conversation_participant)
+                    .where(participant.conversation_id == conversation_id, participant.user_id == sender_id)
+                    .values(last_read_message_id=messages[position].id, unread_count=len(messages) - position - 1)
+                )
+
+    def update_read_cursors(self, entries):
+        """Moves (user_id, conversation_id, message_id) read cursors forward and resets their unread counters in one transaction.
+
+        A message_id of None marks the whole conversation read. Counters drop to 0 when the cursor
+        reaches the latest message. Partial reads count the messages left between the cursor and the
+        latest message, never more than the current counter, so the count is bounded by the unread backlog.
+        A cursor that keeps losing to concurrent messages is given back to the caller instead of overwriting their counts.
+
+        :returns: List[(user_id, conversation_id, message_id)] of entries not applied
+        """
+        conflicted = []
+        for user_id, conversation_id, message_id in entries:
+            for _ in range(READ_CURSOR_ATTEMPTS):
+                if self._advance_read_cursor(int(user_id), int(conversation_id), message_id):
+                    break
+            else:
+                conflicted.append((user_id, conversation_id, message_id))
+
+        db.session.commit()
+        replicas.mark_write(*{user_id for user_id, _, _ in entries})
+        return conflicted
+
+    def _advance_read_cursor(self, user_id, conversation_id, message_id) -> bool:
+        """Computes a participant's new cursor and counter and writes them only if no message arrived in between.
+
+        :returns: bool (False when a concurrent message changed the counter first)
+        """
+        participant = conversation_participant.c
+        latest = self.get_history_version(conversation_id)
+        if latest is None:
+            return True
+        message_id = latest if message_id is None else min(int(message_id), latest)
+
+        current = db.session.execute(
+            db.select(participant.last_read_message_id, participant.unread_count)
+            .where(participant.user_id == user_id, participant.conversation_id == conversation_id)
+        ).one_or_none()
+        if current is None or (current.last_read_message_id is not None and current.last_read_message_id >= message_id):
+            return True
+
+        if message_id == latest or current.unread_count == 0:
+            unread_count = 0
+        else:
+            remaining = (
+                db.select(Message.id)
+                .where(Message.conversation_id == conversation_id, Message.id > message_id, Message.id <= latest)
+                .order_by(Message.id)
+                .limit(current.unread_count)
+                .subquery()
+            )
+            unread_count = db.session.execute(db.select(func.count()).select_from(remaining)).scalar_one()
+
+        # Every new message bumps the counter in the same transaction that moves last_message_id,
+        # so an unchanged pair means the count above is still accurate
+        updated = db.session.execute(
+            db.update(conversation_participant)
+            .where(
+                participant.user_id == user_id,
+                participant.conversation_id == conversation_id,
+                participant.unread_count == current.unread_count,
+                or_(participant.last_read_message_id.is_(None), participant.last_read_message_id < message_id),
+                db.select(Conversation.last_message_id).where(Conversation.id == conversation_id).scalar_subquery() == latest
+            )
+            .values(last_read_message_id=message_id, unread_count=unread_count)
+        )
+        return updated.rowcount == 1
+
+    def search_messages(self, user_id, query, limit, after=None):
+        """Full-text searches messages of the user's conversations, best matches first, after the (score, id) keyset.
+        
+        :returns: List[Row(id, conversation_id, chat_name, sender_name, timestamp, snippet, score)]
+        """
+        after_score, after_id = after if after is not None else (None, None)
+        params = {"user_id": user_id, "limit": limit, "after_score": after_score, "after_id": after_id}
+
+        if db.session.get_bind().dialect.name == "postgresql":
+            statement = db.text(POSTGRES_SEARCH)
+            params["query"] = query
+        else:
+            statement = db.text(SQLITE_SEARCH).columns(timestamp=db.DateTime)
+            # Quote every term so user input is never parsed as FTS5 query syntax
+            params["query"] = " ".join('"' + term.replace('"', '""') + '"' for term in query.split())
+
+        return db.session.execute(statement, params).all()
+
+    def iter_messages(self, conversation_id, since=None, batch_size=1000):
+        """Streams all messages of a conversation in date order through server-side cursors, archive first.
+        
+        :returns: Iterator[Row(id, content, timestamp, conversation_id, sender_name)]
+        """
+        for model in (ArchivedMessage, Message):
+            query = (
+                db.select(model.id, model.content, model.timestamp, model.conversation_id, User.username.label("sender_name"))
+                .join(User, User.id == model.sender_id)
+                .filter(model.conversation_id == conversation_id)
+            )
+
+            if since is not None:
+                query = query.filter(model.timestamp > since)
+
+            query = (
+                query
+                .order_by(model.timestamp, model.id)
+                .execution_options(yield_per=batch_size)
+            )
+
+            yield from db.session.execute(query)
+
+    def _history_query(self, model, conversation_id, before=None):
+        """Builds the newest-first history query of a conversation over the hot or archive table"""
+        query = (
+            db.select(model)
+            .options(joinedload(model.sender, innerjoin=True).load_only(User.username))
+            .filter(model.conversation_id == conversation_id)
+        )
+
+        if before is not None:
+            # Row-value comparison so the keyset is a single range of the (conversation_id, timestamp, id) index
+            query = query.filter(tuple_(model.timestamp, model.id) < tuple_(*before))
+
+        return query.order_by(desc(model.timestamp), desc(model.id))
+
     def get_message_slice(self, conversation_id, limit, offset):
         """Fetches paginated slice of date ordered messages from a conversation.
+
+        Slices running past the hot table continue into the archive.
+        
+        :returns: List[Message | ArchivedMessage]
+        """
+        messages = db.session.execute(
+            self._history_query(Message, conversation_id).offset(offset).limit(limit)
+        ).scalars().all()
+
+        if len(messages) == limit:
+            return messages
+
+        archive_offset = 0
+        if not messages and offset > 0:
+            hot_count = db.session.execute(
+                db.select(func.count(Message.id)).where(Message.conversation_id == conversation_id)
+            ).scalar_one()
+            archive_offset = max(offset - hot_count, 0)
+
+        archived = db.session.execute(
+            self._history_query(ArchivedMessage, conversation_id).offset(archive_offset).limit(limit - len(messages))
+        ).scalars().all()
+
+        return messages + archived
+
+    def get_message_page(self, conversation_id, limit, before=None):
+        """Fetches a page of date ordered messages older than the (timestamp, id) keyset.
+
+        Pages running past the hot table continue into the archive.
+        
+        :returns: List[Message | ArchivedMessage]
+        """
+        messages = db.session.execute(
+            self._history_query(Message, conversation_id, before).limit(limit)
+        ).scalars().all()
+
+        if len(messages) == limit:
+            return messages
+
+        if messages:
+            before = (messages[-1].timestamp, messages[-1].id)
+
+        archived = db.session.execute(
+            self._history_query(ArchivedMessage, conversation_id, before).limit(limit - len(messages))
+        ).scalars().all()
+
+        return messages + archived
+
+    # Sync
+    def get_sync_position(self, user_id, horizon):
+        """Retrieves the newest message ID and the user's newest membership event ID among those written up to horizon.
+
+        Both walk their ID index backwards, past the few rows written after horizon.
+        
+        :returns: Tuple[int, int]
+        """
+        last_message_id = db.session.execute(
+            db.select(Message.id).where(Message.timestamp <= horizon).order_by(Message.id.desc()).limit(1)
+        ).scalar()
+        last_event_id = db.session.execute(
+            db.select(MembershipEvent.id)
+            .where(MembershipEvent.user_id == int(user_id), MembershipEvent.timestamp <= horizon)
+            .order_by(MembershipEvent.id.desc())
+            .limit(1)
+        ).scalar()
+
+        return last_message_id or 0, last_event_id or 0
+
+    def get_messages_since(self, user_id, after_id, limit):
+        """Fetches messages newer than after_id across the user's conversations in ID order, one (conversation_id, id) range scan per conversation.
         
         :returns: List[Message]
         """
         query = (
             db.select(Message)
-            .filter(Message.conversation_id == conversation_id)
-            .order_by(desc(Message.timestamp))
-            .offset(offset)
+            .options(joinedload(Message.sender, innerjoin=True).load_only(User.username))
+            .join(conversation_participant, and_(
+                conversation_participant.c.conversation_id == Message.conversation_id,
+                conversation_participant.c.user_id == int(user_id)
+            ))
+            .where(Message.id > after_id)
+            .order_by(Message.id)
+            .limit(limit)
+        )
+
+        return db.session.execute(query).scalars().all()
+
+    def get_membership_events_since(self, user_id, after_id, limit):
+        """Fetches the user's membership events newer than after_id in ID order.
+        
+        :returns: List[MembershipEvent]
+        """
+        query = (
+            db.select(MembershipEvent)
+            .where(MembershipEvent.user_id == int(user_id), MembershipEvent.id > after_id)
+            .order_by(MembershipEvent.id)
             .limit(limit)
         )
 
-        return db.session.execute(query).scalars().all()
\ No newline at end of file
+        return db.session.execute(query).scalars().all()
@@ -1,6 +1,8 @@
-from app.extensions import db
+from app.extensions import db, username_cache, invalidation_bus, replicas
 from app.models.user import User
-from sqlalchemy import select
+from app.models.username_trigram import UsernameTrigram
+from app.utils.trigrams import trigrams
+from sqlalchemy import select, case, func
 from sqlalchemy.exc import IntegrityError
 
 class UserRepository:
@@ -19,6 +21,24 @@ class UserRepository:
         """
         return db.session.get(User, user_id)
     
+    def get_username(self, user_id):
+        """Retrieves a user's username through the username cache.
+        
+        :returns: str | None
+        """
+        user_id = int(user_id)
+        username = username_cache.get(user_id)
+
+        if username is None:
+            generation = username_cache.generation
+            username = db.session.execute(
+                db.select(User.username).where(User.id == user_id)
+            ).scalar_one_or_none()
+            if username is not None:
+                username_cache.set(user_id, username, generation)
+
+        return username
+    
     def get_by_email(self, email) -> User | None:
         """Retrieves a single user by their email
         
@@ -42,6 +62,49 @@ class UserRepository:
 
         return db.session.execute(query).scalars().all()
     
+    def search_by_username(self, username, limit=5, offset=0):
+        """Searches users ranked by exact, prefix and then infix username matches.
+        
+        Terms of 3+ characters are resolved through the trigram index, shorter ones
+        fall back to an indexed prefix range on the lowercased username.
+
+        :returns: List[Row(id, username, email)]
+        """
+        term = username.lower()
+        lowered = func.lower(User.username)
+
+        query = db.select(User.id, User.username, User.email)
+
+        grams = trigrams(term)
+        if grams:
+            candidates = (
+                db.select(UsernameTrigram.user_id)
+                .where(UsernameTrigram.trigram.in_(grams))
+                .group_by(UsernameTrigram.user_id)
+                .having(func.count() == len(grams))
+            )
+            query = query.where(User.id.in_(candidates), lowered.contains(term, autoescape=True))
+        else:
+            query = query.where(lowered >= term, lowered < term + "\uffff")
+
+        rank = case((lowered == term, 0), (lowered.startswith(term, autoescape=True), 1), else_=2)
+        query = (
+            query
+            .order_by(rank, func.length(User.username), User.username)
+            .offset(offset)
+            .limit(limit)
+        )
+
+        return db.session.execute(query).all()
+
+    def _index_username(self, user_id, username):
+        """Replaces the search trigrams of a user, committed together with the caller"""
+        db.session.execute(db.delete(UsernameTrigram).where(UsernameTrigram.user_id == user_id))
+
+        entries = [{"trigram": gram, "user_id": user_id} for gram in trigrams(username)]
+        if entries:
+            db.session.execute(db.insert(UsernameTrigram), entries)
+    
     def add(self, new_user: User):
         """Persists a new user.
         
@@ -49,8 +112,11 @@ class UserRepository:
         """
         
         db.session.add(new_user)
+        db.session.flush()
+        self._index_username(new_user.id, new_user.username)
 
         db.session.commit() 
+        replicas.mark_write(new_user.id)
         return new_user
 
     def create(self, email, username, hashed_password):
@@ -66,8 +132,11 @@ class UserRepository:
             )
             
             db.session.add(new_user)
+            db.session.flush()
+            self._index_username(new_user.id, username)
 
             db.session.commit() 
+            replicas.mark_write(new_user.id)
             return new_user
         except IntegrityError as e:
             db.session.rollback()
@@ -84,6 +153,25 @@ class UserRepository:
             raise ValueError("User not found!")
         
         user.username = new_username
+        self._index_username(user.id, new_username)
+        db.session.commit()
+        invalidation_bus.invalidate("username", user.id)
+        invalidation_bus.clear("username_search")
+        replicas.mark_write(user.id)
+
+        return user
+
+    def update_password(self, user_id, hashed_password):
+        """Updates a user's password hash.
+        
+        :returns: User
+        """
+        user = self.get_by_id(user_id)
+
+        if not user:
+            raise ValueError("User not found!")
+        
+        user.password = hashed_password
         db.session.commit()
 
         return user
@@ -98,7 +186,10 @@ class UserRepository:
         if not user:
             raise ValueError("User not found!")
 
+        db.session.execute(db.delete(UsernameTrigram).where(UsernameTrigram.user_id == user.id))
         db.session.delete(user)
         db.session.commit()
+        invalidation_bus.invalidate("username", user.id)
+        invalidation_bus.clear("username_search")
 
         return True
\ No newline at end of file
@@ -1,6 +1,12 @@
 from app.repositories.conversation_repository import ConversationRepository
 from app.models.conversation import Conversation
 from app.models.message import Message
+from app.utils.cursor import encode_cursor, decode_cursor
+from app.utils.http_cache import make_etag
+from app.services.message_writer import message_writer
+from app.services.read_cursor_writer import read_cursor_writer
+from flask import current_app
+import datetime
 
 class ConversationService:
     def __init__(self):
@@ -12,6 +18,33 @@ class ConversationService:
         :returns: List[Conversation]
         """
         return self.repository.get_by_user_id(user_id)
+
+    def get_conversation_ids(self, user_id) -> list[int]:
+        """Retrieves IDs of all user conversations without loading them
+        
+        :returns: List[int]
+        """
+        return self.repository.get_ids_by_user_id(user_id)
+
+    def get_inbox(self, user_id, limit=None, before=None) -> list:
+        """Retrieves user conversations with unread counts sorted by recency, older than an opaque cursor
+        
+        :returns: List[Row(Conversation, unread_count)]
+        """
+        keyset = decode_cursor(before, datetime.datetime, int) if before else None
+
+        return self.repository.get_inbox(user_id, limit, keyset)
+
+    def get_inbox_cursor(self, rows: list, limit) -> str | None:
+        """Builds the cursor pointing past the last conversation of a full inbox page
+        
+        :returns: str | None
+        """
+        if limit is None or not rows or len(rows) < limit:
+            return None
+
+        last_conversation = rows[-1].Conversation
+        return encode_cursor(last_conversation.last_message_at, last_conversation.id)
     
     def get_all_conversations(self) -> list[Conversation]:
         """Retrieves all conversations
@@ -19,23 +52,97 @@ class ConversationService:
         :returns: List[Conversation]
         """
         return self.repository.get_all()
+
+    def get_conversation_directory(self, user_id, limit, after=None, name=None) -> list:
+        """Retrieves a page of all conversations with the user's access computed in the same query
+        
+        :returns: List[Row(id, chat_name, can_access)]
+        """
+        after_id = decode_cursor(after, int)[0] if after else None
+
+        return self.repository.get_page_with_access(int(user_id), limit, after_id, name)
+
+    def get_directory_cursor(self, rows: list, limit) -> str | None:
+        """Builds the cursor pointing past the last conversation of a full directory page
+        
+        :returns: str | None
+        """
+        if not rows or len(rows) < limit:
+            return None
+
+        return encode_cursor(rows[-1].id)
     
+    def get_history_etag(self, conversation_id, *params) -> str:
+        """Builds the history validator from the conversation's latest message ID
+        
+        :returns: str
+        """
+        return make_etag("history", conversation_id, self.repository.get_history_version(conversation_id), *params)
+
+    def get_inbox_etag(self, user_id, *params) -> str:
+        """Builds the inbox validator from the user's membership version, newest message ID and read progress
+        
+        :returns: str
+        """
+        version = self.repository.get_inbox_version(int(user_id))
+        return make_etag("inbox", user_id, version.membership_version, version.last_message_id, version.read_position, version.unread_total, *params)
+
+    def get_directory_etag(self, user_id, *params) -> str:
+        """Builds the all-conversations validator from conversation churn and the user's membership version
+        
+        :returns: str
+        """
+        version = self.repository.get_directory_version()
+        membership_version = self.repository.get_membership_version(int(user_id))
+        return make_etag("directory", user_id, version.last_id, version.total, membership_version, *params)
+
     def is_user_in_conversation(self, user_id, conversation_id) -> bool:
         """Checks if a user is part of conversation
         
         :returns: bool
         """
-        conversation = self.repository.get_by_id(conversation_id)
-
-        return any(user.id == int(user_id) for user in conversation.users)
+        return self.repository.is_participant(conversation_id, user_id)
 
     def add_message(self, conversation_id, user_id, message) -> Message:
         """Add a message to conversation
         
         :returns: Message
         """
+        # Rejected before queuing so a bad message never costs its batch a one-by-one retry
+        if not isinstance(message, str) or not message.strip():
+            raise ValueError("Message cannot be empty!")
+
+        if message_writer.enabled:
+            return message_writer.submit(conversation_id, user_id, message)
+
         return self.repository.add_message(conversation_id, user_id, message)
 
+    def search_messages(self, user_id, query, limit, after=None) -> list:
+        """Full-text searches messages in the user's conversations, continuing from an opaque cursor
+        
+        :returns: List[Row]
+        """
+        keyset = decode_cursor(after, float, int) if after else None
+
+        return self.repository.search_messages(int(user_id), query, limit, keyset)
+
+    def get_search_cursor(self, rows: list, limit) -> str | None:
+        """Builds the cursor pointing past the last result of a full search page
+        
+        :returns: str | None
+        """
+        if not rows or len(rows) < limit:
+            return None
+
+        return encode_cursor(rows[-1].score, rows[-1].id)
+
+    def export_messages(self, conversation_id, since=None):
+        """Streams all conversation messages oldest first, optionally only those newer than since
+        
+        :returns: Iterator[Row]
+        """
+        return self.repository.iter_messages(conversation_id, since)
+
     def get_messages(self, conversation_id, limit, offset) -> list[Message]:
         """Retrieves conversation message in a range
         
@@ -43,6 +150,77 @@ class ConversationService:
         """
         return self.repository.get_message_slice(conversation_id, limit, offset)
 
+    def get_messages_before(self, conversation_id, limit, before=None) -> list[Message]:
+        """Retrieves conversation messages older than an opaque cursor
+        
+        :returns: List[Message]
+        """
+        keyset = decode_cursor(before, datetime.datetime, int) if before else None
+
+        return self.repository.get_message_page(conversation_id, limit, keyset)
+
+    def mark_read(self, user_id, conversation_id, message_id=None):
+        """Queues a read cursor update, coalesced with other updates of the same user and conversation"""
+        read_cursor_writer.submit(user_id, conversation_id, message_id)
+
+    def get_next_cursor(self, messages: list[Message], limit) -> str | None:
+        """Builds the cursor pointing past the last message of a full page
+        
+        :returns: str | None
+        """
+        if not messages or len(messages) < limit:
+            return None
+
+        last_message = messages[-1]
+        return encode_cursor(last_message.timestamp, last_message.id)
+
+    def get_changes(self, user_id, since, limit) -> tuple:
+        """Retrieves messages, membership events and newly joined conversations after an opaque sync cursor, each capped at limit.
+
+        IDs are assigned at insert but become visible at commit, so a row with a lower ID can appear
+        after a higher one was served. The cursor therefore only moves past rows older than
+        SYNC_SAFETY_MARGIN_MS, newer ones are returned again by the next sync.
+        
+        :returns: Tuple[List[Message], List[MembershipEvent], List[Conversation], str (next_cursor), bool (has_more)]
+        """
+        after_message_id, after_event_id = decode_cursor(since, int, int)
+
+        messages = self.repository.get_messages_since(user_id, after_message_id, limit + 1)
+        events = self.repository.get_membership_events_since(user_id, after_event_id, limit + 1)
+        has_more = len(messages) > limit or len(events) > limit
+        messages, events = messages[:limit], events[:limit]
+
+        joined_ids = {event.conversation_id for event in events if event.kind == "added"}
+        conversations = self.repository.get_by_ids(joined_ids) if joined_ids else []
+
+        horizon = self._sync_horizon()
+        position = (self._settled_id(messages, horizon, after_message_id), self._settled_id(events, horizon, after_event_id))
+        # A full page of rows too recent to pass is not worth calling again for right away
+        has_more = has_more and position != (after_message_id, after_event_id)
+
+        return messages, events, conversations, encode_cursor(*position), has_more
+
+    def get_sync_cursor(self, user_id) -> str:
+        """Builds the cursor of the user's current position, short of the rows still within the safety margin
+        
+        :returns: str
+        """
+        return encode_cursor(*self.repository.get_sync_position(user_id, self._sync_horizon()))
+
+    def _sync_horizon(self) -> datetime.datetime:
+        """Moment up to which every write is assumed committed, naive UTC like the stored timestamps"""
+        margin = datetime.timedelta(milliseconds=current_app.config.get("SYNC_SAFETY_MARGIN_MS", 5000))
+        return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None) - margin
+
+    @staticmethod
+    def _settled_id(rows, horizon, after_id) -> int:
+        """Highest ID of the leading rows written up to horizon, the cursor never passes a newer row"""
+        for row in rows:
+            if row.timestamp > horizon:
+                break
+            after_id = row.id
+        return after_id
+
     def add_user_to_conversation(self, conversation_id, new_user_id) -> Conversation:
         """Adds a user to conversation
         
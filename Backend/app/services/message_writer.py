@@ -0,0 +1,80 @@
+import datetime
+import time
+import gevent
+from gevent.event import AsyncResult
+from gevent.queue import Queue, Empty
+from app.extensions import db
+from app.repositories.conversation_repository import ConversationRepository
+from app.models.message import Message
+
+class BatchMessageWriter:
+    """Group-commit writer collecting messages for a few milliseconds and persisting them in one transaction"""
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.max_batch_size = 100
+        self.max_delay = 0.005
+        self.repository = ConversationRepository()
+        self._queue = Queue()
+        self._worker = None
+
+    def init_app(self, app):
+        """Reads MESSAGE_BATCHING, MESSAGE_BATCH_SIZE and MESSAGE_BATCH_DELAY_MS from the app config"""
+        self.app = app
+        self.enabled = app.config.get("MESSAGE_BATCHING", False)
+        self.max_batch_size = app.config.get("MESSAGE_BATCH_SIZE", self.max_batch_size)
+        self.max_delay = app.config.get("MESSAGE_BATCH_DELAY_MS", self.max_delay * 1000) / 1000
+
+    def submit(self, conversation_id, sender_id, content) -> Message:
+        """Queues a message and blocks the calling greenlet until its batch is committed
+        
+        :returns: Message
+        """
+        if self._worker is None or self._worker.dead:
+            # Spawned lazily so that forked workers each get their own writer
+            self._worker = gevent.spawn(self._run)
+
+        result = AsyncResult()
+        timestamp = datetime.datetime.now(datetime.timezone.utc)
+        self._queue.put(((conversation_id, sender_id, content, timestamp), result))
+
+        return result.get()
+
+    def _run(self):
+        """Drains the queue in batches bounded by size and delay"""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_delay
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except Empty:
+                    break
+
+            self._flush(batch)
+
+    def _flush(self, batch):
+        """Persists a batch and releases its waiting senders"""
+        with self.app.app_context():
+            try:
+                messages = self.repository.add_messages([entry for entry, _ in batch])
+            except Exception:
+                db.session.rollback()
+                # Retry one by one so a single bad message does not fail the whole batch
+                for entry, result in batch:
+                    try:
+                        result.set(self.repository.add_messages([entry])[0])
+                    except Exception as e:
+                        db.session.rollback()
+                        result.set_exception(e)
+                return
+
+            for (_, result), message in zip(batch, messages):
+                result.set(message)
+
+message_writer = BatchMessageWriter()
@@ -0,0 +1,61 @@
+import gevent
+from app.extensions import db
+from app.repositories.conversation_repository import ConversationRepository
+
+class ReadCursorWriter:
+    """Coalesces read cursor updates per (user, conversation) and persists the latest of each periodically"""
+
+    def __init__(self):
+        self.app = None
+        self.delay = 0.5
+        self.repository = ConversationRepository()
+        self._pending = {} # (user_id, conversation_id) -> message_id | None (everything read)
+        self._worker = None
+
+    def init_app(self, app):
+        """Reads READ_CURSOR_FLUSH_MS from the app config"""
+        self.app = app
+        self.delay = app.config.get("READ_CURSOR_FLUSH_MS", self.delay * 1000) / 1000
+
+    def submit(self, user_id, conversation_id, message_id=None):
+        """Records a read cursor without touching the database
+
+        :raises ValueError: when message_id is neither an integer nor None
+        """
+        if message_id is not None and (not isinstance(message_id, int) or isinstance(message_id, bool)):
+            raise ValueError("message_id must be an integer!")
+
+        key = (int(user_id), int(conversation_id))
+        if message_id is None or (key in self._pending and self._pending[key] is None):
+            self._pending[key] = None
+        else:
+            self._pending[key] = max(message_id, self._pending.get(key, 0))
+
+        if self._worker is None or self._worker.dead:
+            self._worker = gevent.spawn(self._run)
+
+    def _run(self):
+        """Flushes every delay until nothing is pending"""
+        while self._pending:
+            gevent.sleep(self.delay)
+            self._flush()
+
+    def _flush(self):
+        """Persists and clears the pending cursors"""
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        with self.app.app_context():
+            try:
+                conflicted = self.repository.update_read_cursors([(user_id, conversation_id, message_id) for (user_id, conversation_id), message_id in pending.items()])
+            except Exception as e:
+                db.session.rollback()
+                self.app.logger.error(f"Failed to persist {len(pending)} read cursors: {e}")
+                return
+
+        # Cursors outraced by new messages go again with the next flush
+        for user_id, conversation_id, message_id in conflicted:
+            self.submit(user_id, conversation_id, message_id)
+
+read_cursor_writer = ReadCursorWriter()
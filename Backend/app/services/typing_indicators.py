@@ -0,0 +1,149 @@
+import math
+import time
+import gevent
+from app.extensions import socketio
+
+class TypingIndicators:
+    """Ephemeral typing state kept in memory and broadcast as coalesced, throttled deltas.
+
+    Keystrokes only refresh an expiry timestamp. Rooms hear about a typist when they start and when
+    they stop (explicitly or after TYPING_TIMEOUT_MS of silence), at most once per TYPING_BROADCAST_INTERVAL_MS
+    per conversation. Expiry runs on a timer wheel advanced every TYPING_TICK_MS by a single greenlet.
+    """
+
+    def __init__(self):
+        self.emit = socketio.emit
+        self.timeout = 5.0
+        self.interval = 0.5
+        self.tick = 0.1
+        self._typing = {} # (conversation_id, user_id) -> [expires_at, username, sids]
+        self._by_sid = {} # sid -> {(conversation_id, user_id)}
+        self._changes = {} # conversation_id -> {user_id: (username, is_typing, sids)}
+        self._last_broadcast = {} # conversation_id -> monotonic time
+        self._wheel = []
+        self._tick_done = 0
+        self._worker = None
+        self._reset_wheel()
+
+    def init_app(self, app):
+        """Reads TYPING_TIMEOUT_MS, TYPING_BROADCAST_INTERVAL_MS and TYPING_TICK_MS from the app config"""
+        self.timeout = app.config.get("TYPING_TIMEOUT_MS", self.timeout * 1000) / 1000
+        self.interval = app.config.get("TYPING_BROADCAST_INTERVAL_MS", self.interval * 1000) / 1000
+        self.tick = app.config.get("TYPING_TICK_MS", self.tick * 1000) / 1000
+        self._reset_wheel()
+
+    def _reset_wheel(self):
+        # Every expiry lies within timeout of now, so this many slots never wrap onto a live entry
+        self._wheel = [set() for _ in range(math.ceil(self.timeout / self.tick) + 2)]
+        self._tick_done = math.floor(time.monotonic() / self.tick)
+
+    def start(self, sid, user_id, username, conversation_id):
+        """Marks a user as typing, broadcasting only when they were not typing already"""
+        # Session ids carry the JWT subject as a string, deltas carry user ids as integers like every other payload
+        user_id = int(user_id)
+        key = (conversation_id, user_id)
+        expires_at = time.monotonic() + self.timeout
+        entry = self._typing.get(key)
+
+        if entry is not None:
+            entry[0] = expires_at
+            entry[2].add(sid)
+        else:
+            self._typing[key] = [expires_at, username, {sid}]
+            self._schedule(key, expires_at)
+            self._change(conversation_id, user_id, username, True, {sid})
+
+        self._by_sid.setdefault(sid, set()).add(key)
+        if self._worker is None or self._worker.dead:
+            # The wheel is empty whenever the worker is not running, so idle ticks need no replay
+            self._tick_done = math.floor(time.monotonic() / self.tick) - 1
+            self._worker = gevent.spawn(self._run)
+
+    def stop(self, user_id, conversation_id):
+        """Marks a user as no longer typing"""
+        user_id = int(user_id)
+        entry = self._typing.pop((conversation_id, user_id), None)
+        if entry is None:
+            return
+
+        for sid in entry[2]:
+            keys = self._by_sid.get(sid)
+            if keys is not None:
+                keys.discard((conversation_id, user_id))
+                if not keys:
+                    del self._by_sid[sid]
+
+        self._change(conversation_id, user_id, entry[1], False, entry[2])
+
+    def disconnect(self, sid):
+        """Stops everything a socket was typing"""
+        for conversation_id, user_id in list(self._by_sid.get(sid, ())):
+            self.stop(user_id, conversation_id)
+
+    def _schedule(self, key, expires_at):
+        self._wheel[math.ceil(expires_at / self.tick) % len(self._wheel)].add(key)
+
+    def _change(self, conversation_id, user_id, username, is_typing, sids):
+        """Queues a state change, cancelling a pending opposite change nobody has heard yet"""
+        pending = self._changes.setdefault(conversation_id, {})
+        previous = pending.get(user_id)
+
+        if previous is not None and previous[1] != is_typing:
+            del pending[user_id]
+        else:
+            pending[user_id] = (username, is_typing, sids)
+
+    def _run(self):
+        """Advances the wheel and flushes due broadcasts until nobody is typing"""
+        while self._typing or self._changes:
+            gevent.sleep(self.tick)
+            now = time.monotonic()
+            self._expire(now)
+            self._broadcast(now)
+
+    def _expire(self, now):
+        """Stops typists whose expiry passed, re-slotting those refreshed since they were scheduled"""
+        current = math.floor(now / self.tick)
+        for tick in range(max(self._tick_done + 1, current - len(self._wheel) + 1), current + 1):
+            bucket = self._wheel[tick % len(self._wheel)]
+            if not bucket:
+                continue
+
+            due = list(bucket)
+            bucket.clear()
+            for key in due:
+                entry = self._typing.get(key)
+                if entry is None:
+                    continue
+
+                if entry[0] > now:
+                    self._schedule(key, entry[0])
+                else:
+                    self.stop(key[1], key[0])
+
+        self._tick_done = current
+
+    def _broadcast(self, now):
+        """Emits one delta per conversation whose throttle window has passed"""
+        for conversation_id in list(self._changes):
+            if now - self._last_broadcast.get(conversation_id, 0) < self.interval:
+                continue
+
+            pending = self._changes.pop(conversation_id)
+            if not pending:
+                continue
+
+            payload = {
+                "conversation_id": conversation_id,
+                "started": [{"user_id": user_id, "username": username} for user_id, (username, is_typing, _) in pending.items() if is_typing],
+                "stopped": [user_id for user_id, (_, is_typing, _) in pending.items() if not is_typing]
+            }
+            # A typist never hears about themselves, coalesced deltas of several typists carry user_id for clients to filter
+            skip_sid = list(next(iter(pending.values()))[2]) if len(pending) == 1 else None
+            self.emit("typing", payload, room=conversation_id, skip_sid=skip_sid)
+            self._last_broadcast[conversation_id] = now
+
+        for conversation_id in [cid for cid, at in self._last_broadcast.items() if now - at >= self.interval and cid not in self._changes]:
+            del self._last_broadcast[conversation_id]
+
+typing_indicators = TypingIndicators()
@@ -1,6 +1,7 @@
 from flask_jwt_extended import create_access_token, create_refresh_token
 from app.repositories.user_repository import UserRepository
-from app.utils.hashing import hash_password, check_pw
+from app.utils.hashing import hash_password, check_pw, hasher, HashingBusyError
+from app.extensions import username_search_cache
 
 class UserService:
     def __init__(self):
@@ -35,21 +36,43 @@ class UserService:
 
         if not check_pw(user.password, password):
             raise ValueError("Invalid password!")
+
+        if hasher.needs_rehash(user.password):
+            # Upgrade to the configured work factor while the plain password is at hand
+            try:
+                self.repository.update_password(user.id, hash_password(password))
+            except HashingBusyError:
+                pass
         
         access_token = create_access_token(identity=str(user.id))
         return access_token, user
 
 
-    def get_profiles(self, username):
-        """Retrieves 5 profiles contain username
+    def get_profiles(self, username, limit=5, offset=0):
+        """Retrieves ranked profiles matching username, served from the search cache when hot
         
-        :returns: List[User]
+        :returns: List[Row(id, username, email)]
         """
-        return self.repository.get_by_username(username, 5)
+        key = (username.lower(), limit, offset)
+        profiles = username_search_cache.get(key)
+
+        if profiles is None:
+            generation = username_search_cache.generation
+            profiles = self.repository.search_by_username(username, limit, offset)
+            username_search_cache.set(key, profiles, generation)
+
+        return profiles
     
     def get_user(self, user_id):
         """Retrieves user by user_id
         
         :returns: User
         """
-        return self.repository.get_by_id(user_id)
\ No newline at end of file
+        return self.repository.get_by_id(user_id)
+
+    def get_username(self, user_id):
+        """Retrieves username by user_id from the username cache
+        
+        :returns: str | None
+        """
+        return self.repository.get_username(user_id)
@@ -0,0 +1,73 @@
+import threading
+import time
+from collections import OrderedDict
+
+class LRUCache:
+    """Bounded least-recently-used cache with an optional time to live per entry"""
+
+    def __init__(self, maxsize=10_000, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0 # bumped by every invalidation
+        self._entries = OrderedDict() # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def init_app(self, app, prefix):
+        """Reads <prefix>_SIZE and <prefix>_TTL from the app config"""
+        self.maxsize = app.config.get(f"{prefix}_SIZE", self.maxsize)
+        self.ttl = app.config.get(f"{prefix}_TTL", self.ttl)
+        self.clear()
+
+    def get(self, key, default=None):
+        """Returns the cached value or default when missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (entry[0] is not None and entry[0] < time.monotonic()):
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, generation=None):
+        """Stores a value, evicting the least recently used entry when full.
+
+        Passing the generation read before loading the value skips storing it when an invalidation
+        happened meanwhile, so a load racing a write cannot put the stale value back.
+        """
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        """Drops a single entry"""
+        with self._lock:
+            self.generation += 1
+            self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate):
+        """Drops every entry whose key matches the predicate"""
+        with self._lock:
+            self.generation += 1
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def clear(self):
+        """Drops all entries"""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters and current size"""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "maxsize": self.maxsize}
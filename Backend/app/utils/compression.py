@@ -0,0 +1,97 @@
+import zlib
+from flask import request
+
+try:
+    import brotli
+except ImportError: # pragma: no cover - gzip only
+    brotli = None
+
+class Compressor:
+    """Compresses responses with brotli or gzip, whichever the client prefers and is available.
+
+    Buffered responses are compressed once they reach COMPRESSION_MIN_SIZE bytes, streamed ones
+    (exports) are compressed chunk by chunk without buffering the whole body.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.min_size = 1024
+        self.mimetypes = {"application/json", "application/x-ndjson", "text/csv"}
+        self.gzip_level = 6
+        self.brotli_quality = 4
+
+    def init_app(self, app):
+        """Reads COMPRESSION_ENABLED, COMPRESSION_MIN_SIZE, COMPRESSION_MIMETYPES, COMPRESSION_GZIP_LEVEL and COMPRESSION_BROTLI_QUALITY"""
+        self.enabled = app.config.get("COMPRESSION_ENABLED", self.enabled)
+        self.min_size = app.config.get("COMPRESSION_MIN_SIZE", self.min_size)
+        self.mimetypes = set(app.config.get("COMPRESSION_MIMETYPES", self.mimetypes))
+        self.gzip_level = app.config.get("COMPRESSION_GZIP_LEVEL", self.gzip_level)
+        self.brotli_quality = app.config.get("COMPRESSION_BROTLI_QUALITY", self.brotli_quality)
+        app.after_request(self.compress_response)
+
+    def encodings(self) -> list:
+        """Supported content codings in order of preference"""
+        return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+    def compress_response(self, response):
+        if not self.enabled or request.method == "HEAD":
+            return response
+
+        if response.status_code < 200 or response.status_code in (204, 206, 304):
+            return response
+
+        if response.mimetype not in self.mimetypes or "Content-Encoding" in response.headers:
+            return response
+
+        response.vary.add("Accept-Encoding")
+        encoding = request.accept_encodings.best_match(self.encodings())
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = self._compress_stream(response.response, encoding)
+            response.headers.pop("Content-Length", None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            response.set_data(self.compress(data, encoding))
+
+        response.headers["Content-Encoding"] = encoding
+
+        # The representation changed, so a strong validator would claim byte equality it no longer has
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+
+        return response
+
+    def compress(self, data: bytes, encoding) -> bytes:
+        """Compresses a complete body"""
+        if encoding == "br":
+            return brotli.compress(data, quality=self.brotli_quality)
+
+        compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)
+        return compressor.compress(data) + compressor.flush()
+
+    def _compress_stream(self, chunks, encoding):
+        """Compresses an iterable body incrementally, yielding whatever the compressor releases"""
+        if encoding == "br":
+            compressor = brotli.Compressor(quality=self.brotli_quality)
+            compress, finish = compressor.process, compressor.finish
+        else:
+            compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)
+            compress, finish = compressor.compress, compressor.flush
+
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode("utf-8")
+                compressed = compress(chunk)
+                if compressed:
+                    yield compressed
+
+            yield finish()
+        finally:
+            if hasattr(chunks, "close"):
+                chunks.close()
@@ -0,0 +1,26 @@
+import base64
+import datetime
+import json
+
+def encode_cursor(*values) -> str:
+    """Encodes keyset values into an opaque url-safe cursor"""
+    payload = [value.isoformat() if isinstance(value, datetime.datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, *types) -> tuple:
+    """Decodes an opaque cursor back into keyset values of the given types"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+
+        if not isinstance(payload, list) or len(payload) != len(types):
+            raise ValueError
+
+        return tuple(
+            datetime.datetime.fromisoformat(value) if value_type is datetime.datetime else value_type(value)
+            for value, value_type in zip(payload, types)
+        )
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor!")
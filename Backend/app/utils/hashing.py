@@ -1,17 +1,63 @@
+import os
 import bcrypt
+from gevent.threadpool import ThreadPool
 
-def hash_password(password: str) -> str:
-    """Hashes the password"""
-    bytes_pw = password.encode("utf-8")
+class HashingBusyError(Exception):
+    """Raised when too many password operations are already waiting for the hashing pool"""
+
+class PasswordHasher:
+    """Runs bcrypt on a dedicated thread pool so hashing never blocks the gevent hub"""
+
+    def __init__(self, rounds=12, workers=None, max_pending=64):
+        self.rounds = rounds
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.pending = 0
+        self._pool = None
+
+    def init_app(self, app):
+        """Reads BCRYPT_ROUNDS, BCRYPT_WORKERS and BCRYPT_MAX_PENDING from the app config"""
+        self.rounds = app.config.get("BCRYPT_ROUNDS", self.rounds)
+        self.workers = app.config.get("BCRYPT_WORKERS", self.workers)
+        self.max_pending = app.config.get("BCRYPT_MAX_PENDING", self.max_pending)
+        self._pool = None
+
+    def _run(self, fn, *args):
+        """Runs fn on the pool, rejecting work once max_pending operations are queued"""
+        if self.pending >= self.max_pending:
+            raise HashingBusyError("Too many concurrent password operations, try again later!")
+
+        if self._pool is None:
+            # Created lazily so that forked workers each get their own threads
+            self._pool = ThreadPool(self.workers)
+
+        self.pending += 1
+        try:
+            return self._pool.apply(fn, args)
+        finally:
+            self.pending -= 1
 
-    salt = bcrypt.gensalt()
-    h = bcrypt.hashpw(bytes_pw, salt)
+    def hash(self, password: str) -> str:
+        """Hashes the password with the configured work factor"""
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        h = self._run(bcrypt.hashpw, password.encode("utf-8"), salt)
 
-    return h.decode("utf-8")
+        return h.decode("utf-8")
+
+    def check(self, hashed: str, password: str) -> bool:
+        """Checks password against a hashed one"""
+        return self._run(bcrypt.checkpw, password.encode("utf-8"), hashed.encode("utf-8"))
+
+    def needs_rehash(self, hashed: str) -> bool:
+        """Checks whether a hash was made with a different work factor than configured"""
+        return int(hashed.split("$")[2]) != self.rounds
+
+hasher = PasswordHasher()
+
+def hash_password(password: str) -> str:
+    """Hashes the password"""
+    return hasher.hash(password)
 
 def check_pw(hashed: str, password: str) -> bool:
     """Checks password against a hashed one"""
-    bytes_pw = password.encode("utf-8")
-    bytes_hashed = hashed.encode("utf-8")
-
-    return bcrypt.checkpw(bytes_pw, bytes_hashed)
\ No newline at end of file
+    return hasher.check(hashed, password)
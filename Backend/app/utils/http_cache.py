@@ -0,0 +1,20 @@
+import hashlib
+from flask import request, current_app
+
+def make_etag(*parts) -> str:
+    """Builds a strong ETag from cheap version markers"""
+    return hashlib.sha1(":".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+def not_modified(etag):
+    """Returns a 304 response when the client already holds etag, None otherwise"""
+    # Weak comparison, compressed responses carry the weak form of the same validator
+    if not request.if_none_match.contains_weak(etag):
+        return None
+
+    return tag(current_app.response_class(status=304), etag)
+
+def tag(response, etag):
+    """Attaches etag to a response and asks clients to revalidate before reuse"""
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
@@ -0,0 +1,97 @@
+import json
+import uuid
+import gevent
+
+class InvalidationBus:
+    """Applies cache invalidations in this process and relays them to every other worker through Redis pub/sub.
+
+    Without CACHE_INVALIDATION_URL there is a single process and invalidations stay local. A worker
+    (re)subscribing clears its caches, since it cannot know which invalidations it missed meanwhile.
+    """
+
+    def __init__(self, channel="chatster:invalidate"):
+        self.channel = channel
+        self.origin = uuid.uuid4().hex
+        self.caches = {} # name -> LRUCache
+        self.client = None
+        self.app = None
+        self._listener = None
+
+    def init_app(self, app):
+        """Reads CACHE_INVALIDATION_URL from the app config"""
+        self.app = app
+        url = app.config.get("CACHE_INVALIDATION_URL")
+        if url:
+            import redis
+            self.start(redis.Redis.from_url(url, decode_responses=True))
+        else:
+            self.stop()
+
+    def register(self, name, cache):
+        """Makes a cache addressable by name"""
+        self.caches[name] = cache
+
+    def start(self, client):
+        """Relays invalidations through a Redis client and starts listening for those of other workers"""
+        self.stop()
+        self.client = client
+        self._listener = gevent.spawn(self._listen)
+
+    def stop(self):
+        """Goes back to process-local invalidation"""
+        if self._listener is not None:
+            self._listener.kill()
+        self.client = None
+        self._listener = None
+
+    def invalidate(self, name, *keys):
+        """Drops keys of a cache in every worker"""
+        self._publish({"cache": name, "keys": list(keys)})
+
+    def invalidate_matching(self, name, position, value):
+        """Drops every key of a cache whose element at position equals value, in every worker"""
+        self._publish({"cache": name, "position": position, "value": value})
+
+    def clear(self, name):
+        """Drops a whole cache in every worker"""
+        self._publish({"cache": name})
+
+    def _publish(self, message):
+        self._apply(message)
+        if self.client is not None:
+            self.client.publish(self.channel, json.dumps({**message, "origin": self.origin}))
+
+    def _apply(self, message):
+        cache = self.caches.get(message["cache"])
+        if cache is None:
+            return
+
+        if "keys" in message:
+            for key in message["keys"]:
+                # JSON turns tuple keys into lists
+                cache.invalidate(tuple(key) if isinstance(key, list) else key)
+        elif "position" in message:
+            position, value = message["position"], message["value"]
+            cache.invalidate_where(lambda key: key[position] == value)
+        else:
+            cache.clear()
+
+    def _listen(self):
+        """Applies invalidations published by other workers, resubscribing after connection loss"""
+        while True:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self.channel)
+                for cache in self.caches.values():
+                    cache.clear()
+
+                for message in pubsub.listen():
+                    payload = json.loads(message["data"])
+                    if payload.get("origin") != self.origin:
+                        self._apply(payload)
+            except Exception as e:
+                if self.app is not None:
+                    self.app.logger.warning(f"Cache invalidation channel lost, resubscribing: {e}")
+                gevent.sleep(1)
+            finally:
+                pubsub.close()
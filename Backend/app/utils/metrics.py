@@ -0,0 +1,175 @@
+import threading
+import time
+from functools import wraps
+from flask import g, request, has_app_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class OperationStats:
+    """Counters of a single route or socket event"""
+    __slots__ = ("count", "latency_sum", "buckets", "sql_count", "sql_seconds")
+
+    def __init__(self, bucket_count):
+        self.count = 0
+        self.latency_sum = 0.0
+        self.buckets = [0] * bucket_count
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+
+class Metrics:
+    """In-process request/socket event metrics rendered in the Prometheus text format.
+
+    SQL statements are attributed to the route or event whose app context executes them,
+    so an endpoint issuing one query per row shows up as a high statement count per request.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.operations = {} # (kind, labels) -> OperationStats
+        self.responses = {} # (method, route, status) -> count
+        self.caches = {} # name -> LRUCache
+        self.gauges = [] # (name, help, fn)
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+
+        if not event.contains(Engine, "before_cursor_execute", self._before_cursor_execute):
+            event.listen(Engine, "before_cursor_execute", self._before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def register_cache(self, name, cache):
+        """Exposes hit/miss/size counters of an LRUCache"""
+        self.caches[name] = cache
+
+    def gauge(self, name, help, fn):
+        """Exposes a value computed at scrape time"""
+        self.gauges.append((name, help, fn))
+
+    def track_event(self, name):
+        """Decorates a Socket.IO handler to record its latency and SQL usage"""
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                previous = g.get("metrics_sql")
+                g.metrics_sql = scope = [0, 0.0]
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    g.metrics_sql = previous
+                    self._record(("socket", (name,)), time.perf_counter() - started, scope)
+            return wrapper
+        return decorator
+
+    def _start_request(self):
+        g.metrics_started = time.perf_counter()
+        g.metrics_sql = [0, 0.0]
+
+    def _finish_request(self, response):
+        started = g.pop("metrics_started", None)
+        if started is None:
+            return response
+
+        route = request.url_rule.rule if request.url_rule else "<unmatched>"
+        self._record(("http", (request.method, route)), time.perf_counter() - started, g.metrics_sql)
+
+        key = (request.method, route, str(response.status_code))
+        with self._lock:
+            self.responses[key] = self.responses.get(key, 0) + 1
+
+        return response
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["metrics_started"].pop()
+        scope = g.get("metrics_sql") if has_app_context() else None
+        if scope is not None:
+            scope[0] += 1
+            scope[1] += elapsed
+
+    def _record(self, key, seconds, sql):
+        with self._lock:
+            stats = self.operations.get(key)
+            if stats is None:
+                stats = self.operations[key] = OperationStats(len(self.buckets))
+
+            stats.count += 1
+            stats.latency_sum += seconds
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    stats.buckets[i] += 1
+                    break
+            stats.sql_count += sql[0]
+            stats.sql_seconds += sql[1]
+
+    def render(self) -> str:
+        """Renders all metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            operations = {key: self._snapshot(stats) for key, stats in self.operations.items()}
+            responses = dict(self.responses)
+
+        for kind, label_names, prefix in (("http", ("method", "route"), "chatster_http_request"), ("socket", ("event",), "chatster_socket_event")):
+            selected = [(dict(zip(label_names, labels)), stats) for (k, labels), stats in operations.items() if k == kind]
+
+            lines.append(f"# HELP {prefix}_duration_seconds Handler latency")
+            lines.append(f"# TYPE {prefix}_duration_seconds histogram")
+            for labels, stats in selected:
+                cumulative = 0
+                for bound, count in zip(self.buckets, stats.buckets):
+                    cumulative += count
+                    lines.append(f"{prefix}_duration_seconds_bucket{_labels(labels, le=repr(bound))} {cumulative}")
+                lines.append(f"{prefix}_duration_seconds_bucket{_labels(labels, le='+Inf')} {stats.count}")
+                lines.append(f"{prefix}_duration_seconds_sum{_labels(labels)} {stats.latency_sum}")
+                lines.append(f"{prefix}_duration_seconds_count{_labels(labels)} {stats.count}")
+
+            lines.append(f"# HELP {prefix}_sql_statements_total SQL statements executed by the handler")
+            lines.append(f"# TYPE {prefix}_sql_statements_total counter")
+            for labels, stats in selected:
+                lines.append(f"{prefix}_sql_statements_total{_labels(labels)} {stats.sql_count}")
+
+            lines.append(f"# HELP {prefix}_sql_duration_seconds_total Time spent in SQL by the handler")
+            lines.append(f"# TYPE {prefix}_sql_duration_seconds_total counter")
+            for labels, stats in selected:
+                lines.append(f"{prefix}_sql_duration_seconds_total{_labels(labels)} {stats.sql_seconds}")
+
+        lines.append("# HELP chatster_http_responses_total HTTP responses by status code")
+        lines.append("# TYPE chatster_http_responses_total counter")
+        for (method, route, status), count in responses.items():
+            lines.append(f"chatster_http_responses_total{_labels({'method': method, 'route': route, 'status': status})} {count}")
+
+        for field, type in (("hits", "counter"), ("misses", "counter"), ("size", "gauge")):
+            name = f"chatster_cache_{field}" + ("_total" if type == "counter" else "")
+            lines.append(f"# HELP {name} Cache {field}")
+            lines.append(f"# TYPE {name} {type}")
+            for cache_name, cache in self.caches.items():
+                lines.append(f"{name}{_labels({'cache': cache_name})} {cache.stats()[field]}")
+
+        for name, help, fn in self.gauges:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {fn()}")
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _snapshot(stats):
+        copy = OperationStats(len(stats.buckets))
+        copy.count, copy.latency_sum, copy.buckets = stats.count, stats.latency_sum, list(stats.buckets)
+        copy.sql_count, copy.sql_seconds = stats.sql_count, stats.sql_seconds
+        return copy
+
+def _labels(labels, **extra) -> str:
+    """Formats a Prometheus label set"""
+    labels = {**labels, **extra}
+    if not labels:
+        return ""
+
+    escape = lambda value: str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels.items()) + "}"
@@ -0,0 +1,97 @@
+import time
+from functools import wraps
+from flask import request
+from flask_socketio import emit
+from app.utils.cache import LRUCache
+
+REDIS_TOKEN_BUCKET = """
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+return allowed
+"""
+
+class InMemoryTokenBuckets:
+    """Token buckets for a single process, evicted buckets simply start full again"""
+
+    def __init__(self, maxsize=100_000):
+        self.buckets = LRUCache(maxsize=maxsize) # key -> (tokens, updated_at)
+
+    def take(self, key, rate, burst) -> bool:
+        """Takes one token from the bucket refilling at rate per second up to burst"""
+        now = time.monotonic()
+        tokens, updated_at = self.buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated_at) * rate)
+
+        allowed = tokens >= 1
+        self.buckets.set(key, (tokens - 1 if allowed else tokens, now))
+        return allowed
+
+class RedisTokenBuckets:
+    """Token buckets shared between processes, updated atomically by a Lua script"""
+
+    def __init__(self, url=None, client=None, prefix="chatster:ratelimit"):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url, decode_responses=True)
+
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(REDIS_TOKEN_BUCKET)
+
+    def take(self, key, rate, burst) -> bool:
+        return bool(self._script(keys=[f"{self.prefix}:{key}"], args=[rate, burst, time.time()]))
+
+class RateLimiter:
+    """Per-socket and per-user token buckets for Socket.IO events, configured by RATE_LIMITS.
+
+    Socket buckets always live in process since a socket only ever talks to one worker,
+    user buckets go to Redis when RATE_LIMIT_URL is set so a user cannot multiply their budget across workers.
+    """
+
+    def __init__(self, session_registry):
+        self.session_registry = session_registry
+        self.limits = {} # event -> {"sid": (rate, burst), "user": (rate, burst)}
+        self.local = InMemoryTokenBuckets()
+        self.shared = self.local
+
+    def init_app(self, app):
+        self.limits = app.config.get("RATE_LIMITS") or {}
+        url = app.config.get("RATE_LIMIT_URL")
+        self.local = InMemoryTokenBuckets()
+        self.shared = RedisTokenBuckets(url) if url else self.local
+
+    def allow(self, event, sid, user_id=None) -> bool:
+        """Spends a token of the socket's and the user's bucket for event, unlimited events always pass"""
+        limits = self.limits.get(event)
+        if not limits:
+            return True
+
+        if "sid" in limits and not self.local.take(f"sid:{sid}:{event}", *limits["sid"]):
+            return False
+
+        if user_id is not None and "user" in limits and not self.shared.take(f"user:{user_id}:{event}", *limits["user"]):
+            return False
+
+        return True
+
+    def limit(self, event):
+        """Decorates a Socket.IO handler to answer over-limit events with a rate_limited error before any work is done"""
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.allow(event, request.sid, self.session_registry.get_user(request.sid)):
+                    emit("error", {"error": "rate_limited", "event": event}, room=request.sid)
+                    return
+                return fn(*args, **kwargs)
+            return wrapper
+        return decorator
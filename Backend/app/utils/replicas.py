@@ -0,0 +1,155 @@
+import itertools
+import time
+from contextlib import contextmanager
+from functools import wraps
+from flask import current_app
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+from sqlalchemy import text
+from app.utils.cache import LRUCache
+
+POSTGRES_REPLICA_LAG = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+def replica_binds(urls) -> dict:
+    """Builds SQLALCHEMY_BINDS entries from a comma separated list of replica URLs"""
+    return {f"replica_{i}": url.strip() for i, url in enumerate((urls or "").split(",")) if url.strip()}
+
+class RoutingSession(Session):
+    """Session sending reads to the replica selected by ReplicaRouter.reads, everything else to the primary"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        replica = self.info.get("replica")
+        if replica is not None and bind is None and not self._flushing and not getattr(clause, "is_dml", False):
+            return self._db.engines[replica]
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+class InMemoryWriteMarks:
+    """Recent writers of a single process"""
+
+    def __init__(self, maxsize=100_000, ttl=5):
+        self.writers = LRUCache(maxsize=maxsize, ttl=ttl) # user_id -> True
+
+    def mark(self, user_id):
+        """Remembers a user's write for the stickiness window"""
+        self.writers.set(str(user_id), True)
+
+    def is_marked(self, user_id) -> bool:
+        """Checks whether a user wrote within the stickiness window"""
+        return bool(self.writers.get(str(user_id)))
+
+class RedisWriteMarks:
+    """Recent writers shared between processes as expiring Redis keys"""
+
+    def __init__(self, ttl=5, url=None, client=None, prefix="chatster:wrote"):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url, decode_responses=True)
+
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def mark(self, user_id):
+        self.client.set(f"{self.prefix}:{user_id}", 1, px=max(1, int(self.ttl * 1000)))
+
+    def is_marked(self, user_id) -> bool:
+        return self.client.exists(f"{self.prefix}:{user_id}") > 0
+
+class ReplicaRouter:
+    """Picks a read replica per block of reads.
+
+    Users who wrote recently stay on the primary for REPLICA_STICKY_TTL seconds so they read
+    their own writes, and replicas lagging more than REPLICA_MAX_LAG seconds (or unreachable) are skipped.
+    Recent writes are marked in Redis when REPLICA_STICKY_URL is set, so a write handled by one
+    worker pins the user's reads on every worker; without it they stay per process.
+    """
+
+    def __init__(self):
+        self.bind_keys = []
+        self.recent_writers = InMemoryWriteMarks()
+        self.max_lag = 2.0
+        self.lag_check_interval = 1.0
+        self._health = {} # bind_key -> (checked_at, healthy)
+        self._next = itertools.count()
+
+    def init_app(self, app):
+        self.bind_keys = [key for key in app.config.get("SQLALCHEMY_BINDS") or {} if key.startswith("replica_")]
+        ttl = app.config.get("REPLICA_STICKY_TTL", 5)
+        url = app.config.get("REPLICA_STICKY_URL")
+        if url:
+            self.recent_writers = RedisWriteMarks(ttl, url)
+        else:
+            self.recent_writers = InMemoryWriteMarks(app.config.get("REPLICA_STICKY_SIZE", 100_000), ttl)
+        self.max_lag = app.config.get("REPLICA_MAX_LAG", self.max_lag)
+        self.lag_check_interval = app.config.get("REPLICA_LAG_CHECK_INTERVAL", self.lag_check_interval)
+        self._health.clear()
+
+    def mark_write(self, *user_ids):
+        """Pins users to the primary for the stickiness window"""
+        for user_id in user_ids:
+            self.recent_writers.mark(user_id)
+
+    @contextmanager
+    def reads(self, user_id=None):
+        """Runs the enclosed queries against a healthy replica, or the primary when none qualifies"""
+        session = current_app.extensions["sqlalchemy"].session
+        previous = session.info.get("replica")
+        session.info["replica"] = self._pick(user_id)
+        try:
+            yield
+        finally:
+            session.info["replica"] = previous
+
+    def read_only(self, fn):
+        """Decorates a read-only route (below jwt_required) to read from a replica on behalf of the JWT identity"""
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with self.reads(get_jwt_identity()):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    def _pick(self, user_id):
+        if not self.bind_keys:
+            return None
+
+        if user_id is not None and self.recent_writers.is_marked(user_id):
+            return None
+
+        start = next(self._next)
+        for i in range(len(self.bind_keys)):
+            key = self.bind_keys[(start + i) % len(self.bind_keys)]
+            if self._is_healthy(key):
+                return key
+
+        return None
+
+    def _is_healthy(self, key) -> bool:
+        """Checks replica lag, caching the verdict for REPLICA_LAG_CHECK_INTERVAL seconds"""
+        now = time.monotonic()
+        checked = self._health.get(key)
+        if checked is not None and now - checked[0] < self.lag_check_interval:
+            return checked[1]
+
+        try:
+            healthy = self.get_lag(key) <= self.max_lag
+        except Exception as e:
+            current_app.logger.warning(f"Replica {key} unavailable: {e}")
+            healthy = False
+
+        self._health[key] = (now, healthy)
+        return healthy
+
+    def get_lag(self, key) -> float:
+        """Replication delay of a replica in seconds, 0 for engines without a replication notion (e.g. SQLite)"""
+        engine = current_app.extensions["sqlalchemy"].engines[key]
+        if engine.dialect.name != "postgresql":
+            return 0.0
+
+        with engine.connect() as connection:
+            return float(connection.execute(text(POSTGRES_REPLICA_LAG)).scalar() or 0)
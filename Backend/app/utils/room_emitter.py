@@ -0,0 +1,79 @@
+import gevent
+from gevent.queue import Queue, Empty, Full
+
+class RoomEmitter:
+    """Bounded per-room broadcast queues, each drained in order by its own greenlet.
+
+    Senders wait up to EMIT_QUEUE_TIMEOUT_MS when a room's queue is full and are told the room is busy
+    after that. Sockets whose outgoing backlog passes SOCKET_BACKLOG_LIMIT packets are skipped and
+    disconnected instead of buffering without bound, they catch up through /conversations/sync.
+    """
+
+    def __init__(self, socketio):
+        self.socketio = socketio
+        self.app = None
+        self.maxsize = 1000
+        self.timeout = 1.0
+        self.backlog_limit = 1000
+        self.idle = 5.0
+        self._queues = {} # room -> Queue[(event, data, skip_sid)]
+
+    def init_app(self, app):
+        """Reads EMIT_QUEUE_SIZE, EMIT_QUEUE_TIMEOUT_MS and SOCKET_BACKLOG_LIMIT from the app config"""
+        self.app = app
+        self.maxsize = app.config.get("EMIT_QUEUE_SIZE", self.maxsize)
+        self.timeout = app.config.get("EMIT_QUEUE_TIMEOUT_MS", self.timeout * 1000) / 1000
+        self.backlog_limit = app.config.get("SOCKET_BACKLOG_LIMIT", self.backlog_limit)
+
+    def emit(self, event, data, room, skip_sid=None) -> bool:
+        """Queues a broadcast to a room
+        
+        :returns: bool (False when the room stayed full for the whole timeout)
+        """
+        queue = self._queues.get(room)
+        if queue is None:
+            queue = self._queues[room] = Queue(maxsize=self.maxsize)
+            gevent.spawn(self._drain, room, queue)
+
+        try:
+            queue.put((event, data, skip_sid), timeout=self.timeout)
+            return True
+        except Full:
+            return False
+
+    def backlog(self) -> int:
+        """Number of broadcasts waiting across all rooms"""
+        return sum(queue.qsize() for queue in self._queues.values())
+
+    def _drain(self, room, queue):
+        """Emits a room's broadcasts in order, retiring the queue once it has been idle"""
+        while True:
+            try:
+                event, data, skip_sid = queue.get(timeout=self.idle)
+            except Empty:
+                del self._queues[room]
+                return
+
+            if skip_sid is None:
+                skip_sid = []
+            elif isinstance(skip_sid, str):
+                skip_sid = [skip_sid]
+
+            try:
+                self.socketio.emit(event, data, room=room, skip_sid=list(skip_sid) + self._slow_sids(room))
+            except Exception as e:
+                self.app.logger.error(f"Broadcast of {event} to room {room} failed: {e}")
+
+    def _slow_sids(self, room) -> list:
+        """Finds local sockets of a room that stopped reading and schedules their disconnect"""
+        server = self.socketio.server
+        slow = []
+        for sid, eio_sid in server.manager.get_participants("/", room):
+            socket = server.eio.sockets.get(eio_sid)
+            if socket is not None and socket.queue.qsize() > self.backlog_limit:
+                slow.append(sid)
+
+        for sid in slow:
+            gevent.spawn(server.disconnect, sid, namespace="/")
+
+        return slow
@@ -0,0 +1,164 @@
+import atexit
+import uuid
+import gevent
+
+def user_room(user_id) -> str:
+    """Personal room joined by every socket of a user"""
+    return f"user:{user_id}"
+
+class InMemorySessionRegistry:
+    """Socket session registry for a single process"""
+
+    def __init__(self):
+        self.users = {} # sid -> user_id
+        self.sessions = {} # user_id -> {sid}
+
+    def add(self, sid, user_id):
+        """Registers a connected socket for a user"""
+        self.users[sid] = str(user_id)
+        self.sessions.setdefault(str(user_id), set()).add(sid)
+
+    def remove(self, sid):
+        """Unregisters a socket, dropping the user once their last socket is gone
+        
+        :returns: str | None (user_id)
+        """
+        user_id = self.users.pop(sid, None)
+        sids = self.sessions.get(user_id)
+        if sids is not None:
+            sids.discard(sid)
+            if not sids:
+                del self.sessions[user_id]
+        return user_id
+
+    def get_user(self, sid):
+        """Retrieves the user owning a socket
+        
+        :returns: str | None
+        """
+        return self.users.get(sid)
+
+    def get_sessions(self, user_id) -> set:
+        """Retrieves all sockets of a user
+        
+        :returns: Set[str]
+        """
+        return set(self.sessions.get(str(user_id), ()))
+
+    def is_connected(self, user_id) -> bool:
+        """Checks whether a user has at least one live socket"""
+        return str(user_id) in self.sessions
+
+    def count(self) -> int:
+        """Number of sockets connected to this process"""
+        return len(self.users)
+
+class RedisSessionRegistry(InMemorySessionRegistry):
+    """Socket session registry shared between processes through Redis.
+
+    Sockets only ever deliver events to the process that owns them, so sid -> user
+    lookups stay local. Per-user socket sets are shared so any process can address a user.
+    Each sid is recorded with the worker owning it, and a worker keeps a heartbeat key alive
+    while it has sockets. Sids of a worker whose heartbeat expired (crashed or killed) are ignored
+    and pruned on read, a worker shutting down removes its own.
+    """
+
+    def __init__(self, url=None, client=None, prefix="chatster", ttl=30.0):
+        super().__init__()
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url, decode_responses=True)
+
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+        self.worker = uuid.uuid4().hex
+        self._heartbeat = None
+
+    def _sessions_key(self, user_id):
+        return f"{self.prefix}:sessions:{user_id}"
+
+    def _worker_key(self, worker):
+        return f"{self.prefix}:worker:{worker}"
+
+    def add(self, sid, user_id):
+        super().add(sid, user_id)
+        ttl_ms = int(self.ttl * 1000)
+        pipeline = self.client.pipeline()
+        pipeline.set(self._worker_key(self.worker), 1, px=ttl_ms)
+        pipeline.hset(self._sessions_key(user_id), sid, self.worker)
+        pipeline.pexpire(self._sessions_key(user_id), ttl_ms)
+        pipeline.execute()
+
+        if self._heartbeat is None or self._heartbeat.dead:
+            self._heartbeat = gevent.spawn(self._beat)
+
+    def remove(self, sid):
+        user_id = super().remove(sid)
+        if user_id is not None:
+            self.client.hdel(self._sessions_key(user_id), sid)
+        return user_id
+
+    def get_sessions(self, user_id):
+        owners = self.client.hgetall(self._sessions_key(user_id)) # sid -> worker
+        if not owners:
+            return set()
+
+        workers = list(set(owners.values()))
+        beats = self.client.mget([self._worker_key(worker) for worker in workers])
+        alive = {worker for worker, beat in zip(workers, beats) if beat is not None}
+
+        dead = [sid for sid, worker in owners.items() if worker not in alive]
+        if dead:
+            self.client.hdel(self._sessions_key(user_id), *dead)
+        return {sid for sid, worker in owners.items() if worker in alive}
+
+    def is_connected(self, user_id):
+        return bool(self.get_sessions(user_id))
+
+    def _beat(self):
+        """Refreshes this worker's heartbeat and its users' socket sets until it has no sockets left"""
+        while self.users:
+            ttl_ms = int(self.ttl * 1000)
+            pipeline = self.client.pipeline(transaction=False)
+            pipeline.set(self._worker_key(self.worker), 1, px=ttl_ms)
+            for user_id in self.sessions:
+                pipeline.pexpire(self._sessions_key(user_id), ttl_ms)
+            try:
+                pipeline.execute()
+            except Exception:
+                # Redis being briefly unreachable must not end the heartbeat, the next beat retries
+                pass
+            gevent.sleep(self.ttl / 3)
+
+    def close(self):
+        """Removes this worker's sockets and heartbeat from Redis, called on shutdown"""
+        if self._heartbeat is not None:
+            self._heartbeat.kill()
+
+        pipeline = self.client.pipeline()
+        for sid, user_id in self.users.items():
+            pipeline.hdel(self._sessions_key(user_id), sid)
+        pipeline.delete(self._worker_key(self.worker))
+        pipeline.execute()
+
+        self.users.clear()
+        self.sessions.clear()
+
+class SessionRegistry:
+    """Delegates to the registry backend selected by SESSION_REGISTRY_URL"""
+
+    def __init__(self):
+        self.backend = InMemorySessionRegistry()
+
+    def init_app(self, app):
+        """Reads SESSION_REGISTRY_URL and SESSION_HEARTBEAT_TTL_MS from the app config"""
+        url = app.config.get("SESSION_REGISTRY_URL")
+        if url:
+            self.backend = RedisSessionRegistry(url, ttl=app.config.get("SESSION_HEARTBEAT_TTL_MS", 30000) / 1000)
+            atexit.register(self.backend.close)
+        else:
+            self.backend = InMemorySessionRegistry()
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
@@ -0,0 +1,5 @@
+def trigrams(text: str) -> set[str]:
+    """Splits lowercased text into its set of 3 character substrings"""
+    text = text.lower()
+
+    return {text[i:i + 3] for i in range(len(text) - 2)}
@@ -0,0 +1,42 @@
+import os
+import statistics
+import tempfile
+import time
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+
+def create_benchmark_app(database_url=None):
+    """Creates the Flask app against a throwaway database migrated to head"""
+    if database_url is None:
+        database_url = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="chatster-bench-"), "bench.sqlite")
+
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret")
+
+    from flask_migrate import upgrade
+    from app import app
+
+    with app.app_context():
+        upgrade(directory=MIGRATIONS_DIR)
+
+    return app
+
+def measure(fn, repeat=5):
+    """Runs fn repeat times and returns the median wall time in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    return statistics.median(samples)
+
+def percentiles(samples):
+    """Summarizes latency samples (ms) as p50/p95/p99"""
+    if not samples:
+        return {"p50": None, "p95": None, "p99": None}
+
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {"p50": round(pick(0.50), 3), "p95": round(pick(0.95), 3), "p99": round(pick(0.99), 3)}
@@ -0,0 +1,125 @@
+"""Measures response compression ratio and CPU cost per endpoint and encoding, plus a payload size sweep for tuning COMPRESSION_MIN_SIZE.
+
+Usage: python -m benchmarks.compression [--messages 5000] [--conversations 500] [--repeat 20]
+"""
+import argparse
+import datetime
+import json
+import statistics
+import time
+
+from benchmarks.common import create_benchmark_app
+
+def seed(app, message_count, conversation_count):
+    """Creates one busy conversation and many empty ones"""
+    from app.extensions import db
+    from app.repositories.conversation_repository import ConversationRepository
+    from app.models.conversation import Conversation
+    from app.models.user import User
+
+    with app.app_context():
+        user_ids = db.session.execute(
+            db.insert(User).returning(User.id),
+            [{"email": f"zip{i}@example.com", "username": f"zip{i}", "password": "x"} for i in range(10)]
+        ).scalars().all()
+        db.session.execute(db.insert(Conversation), [{"chat_name": f"room {i}"} for i in range(conversation_count)])
+        db.session.commit()
+
+        repository = ConversationRepository()
+        conversation = repository.create("busy room", user_ids[0])
+        for user_id in user_ids[1:]:
+            repository.add_user(conversation.id, user_id)
+
+        start = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=message_count)
+        entries = [
+            (conversation.id, user_ids[i % len(user_ids)], f"message {i}: see you at the standup about ticket {i * 7 % 997}", start + datetime.timedelta(seconds=i))
+            for i in range(message_count)
+        ]
+        for i in range(0, len(entries), 1000):
+            repository.add_messages(entries[i:i + 1000])
+
+    return user_ids[0], conversation.id
+
+def measure_requests(client, path, encoding, repeat):
+    """Returns median bytes on the wire, wall ms and CPU ms of repeated GETs"""
+    sizes, wall, cpu = [], [], []
+    for _ in range(repeat):
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        response = client.get(path, headers={"Accept-Encoding": encoding})
+        body = response.get_data()
+        wall.append((time.perf_counter() - wall_start) * 1000)
+        cpu.append((time.process_time() - cpu_start) * 1000)
+        sizes.append(len(body))
+
+    return {
+        "bytes": int(statistics.median(sizes)),
+        "content_encoding": response.headers.get("Content-Encoding", "identity"),
+        "wall_ms": round(statistics.median(wall), 3),
+        "cpu_ms": round(statistics.median(cpu), 3),
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--conversations", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    app = create_benchmark_app(args.database_url)
+
+    from flask_jwt_extended import create_access_token
+    from app.extensions import compressor
+    from app.utils import json_provider
+
+    user_id, conversation_id = seed(app, args.messages, args.conversations)
+    with app.app_context():
+        token = create_access_token(identity=str(user_id))
+
+    client = app.test_client()
+    client.set_cookie("access_token_cookie", token)
+
+    paths = {
+        "history_page": f"/conversations/conversations/{conversation_id}/messages?limit=100",
+        "all_conversations": "/conversations/all_conversations?limit=500",
+        "export_ndjson": f"/conversations/conversations/{conversation_id}/export?format=ndjson",
+    }
+
+    endpoints = {}
+    for name, path in paths.items():
+        identity = measure_requests(client, path, "identity", args.repeat)
+        results = {"identity": identity}
+        for encoding in compressor.encodings():
+            encoded = measure_requests(client, path, encoding, args.repeat)
+            encoded["ratio"] = round(identity["bytes"] / encoded["bytes"], 2) if encoded["bytes"] else None
+            encoded["extra_cpu_ms"] = round(encoded["cpu_ms"] - identity["cpu_ms"], 3)
+            results[encoding] = encoded
+        endpoints[name] = results
+
+    # Compression cost by payload size, for picking COMPRESSION_MIN_SIZE
+    messages = client.get(f"/conversations/conversations/{conversation_id}/messages?limit=100").get_json()["messages"]
+
+    sweep = []
+    for count in (1, 2, 5, 10, 25, 50, 100):
+        payload = json_provider.dumps({"messages": messages[:count], "next_cursor": None}).encode("utf-8")
+        row = {"messages": count, "bytes": len(payload)}
+        for encoding in compressor.encodings():
+            start = time.process_time()
+            for _ in range(args.repeat):
+                compressed = compressor.compress(payload, encoding)
+            row[encoding] = {
+                "bytes": len(compressed),
+                "ratio": round(len(payload) / len(compressed), 2),
+                "cpu_us": round((time.process_time() - start) / args.repeat * 1_000_000, 1),
+            }
+        sweep.append(row)
+
+    print(json.dumps({
+        "min_size": compressor.min_size,
+        "encodings": compressor.encodings(),
+        "endpoints": endpoints,
+        "size_sweep": sweep,
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
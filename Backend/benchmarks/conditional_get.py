@@ -0,0 +1,115 @@
+"""Measures bytes and SQL time saved by ETag revalidation during a reconnect storm.
+
+Each simulated client fetches its inbox and first history page once cold, then
+reconnects and revalidates both with If-None-Match.
+
+Usage: python -m benchmarks.conditional_get [--clients 200] [--conversations 50] [--messages 30]
+"""
+import argparse
+import json
+import time
+
+from sqlalchemy import event
+
+from benchmarks.common import create_benchmark_app
+
+class SQLTimer:
+    """Accumulates statement count and time spent in the database"""
+
+    def __init__(self, engine):
+        self.statements = 0
+        self.seconds = 0.0
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_started"] = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements += 1
+        self.seconds += time.perf_counter() - conn.info.pop("query_started")
+
+    def snapshot(self):
+        return self.statements, self.seconds
+
+def seed(app, client_count, conversation_count, message_count):
+    """Creates clients sharing conversations that each hold message_count messages"""
+    from app.extensions import db
+    from app.repositories.conversation_repository import ConversationRepository
+    from app.models.user import User
+
+    with app.app_context():
+        user_ids = db.session.execute(
+            db.insert(User).returning(User.id),
+            [{"email": f"storm{i}@example.com", "username": f"storm{i}", "password": "x"} for i in range(client_count)]
+        ).scalars().all()
+        db.session.commit()
+
+        repository = ConversationRepository()
+        conversation_ids = []
+        for i in range(conversation_count):
+            conversation = repository.create(f"room {i}", user_ids[0])
+            for user_id in user_ids[1:]:
+                repository.add_user(conversation.id, user_id)
+            for j in range(message_count):
+                repository.add_message(conversation.id, user_ids[j % len(user_ids)], f"message {j} in room {i}")
+            conversation_ids.append(conversation.id)
+
+    return user_ids, conversation_ids
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--conversations", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=30)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    app = create_benchmark_app(args.database_url)
+
+    from flask_jwt_extended import create_access_token
+    from app.extensions import db
+
+    user_ids, conversation_ids = seed(app, args.clients, args.conversations, args.messages)
+    with app.app_context():
+        tokens = [create_access_token(identity=str(user_id)) for user_id in user_ids]
+        timer = SQLTimer(db.engine)
+
+    paths = ["/conversations/conversations", f"/conversations/conversations/{conversation_ids[0]}/messages"]
+    etags = {}
+
+    def storm(revalidate):
+        statements, seconds = timer.snapshot()
+        transferred = 0
+        statuses = {}
+        for token in tokens:
+            client = app.test_client()
+            client.set_cookie("access_token_cookie", token)
+            for path in paths:
+                headers = {"If-None-Match": etags[(token, path)]} if revalidate else {}
+                response = client.get(path, headers=headers)
+                etags[(token, path)] = response.headers.get("ETag", "").strip('"')
+                transferred += len(response.get_data())
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        after_statements, after_seconds = timer.snapshot()
+
+        return {
+            "bytes": transferred,
+            "sql_statements": after_statements - statements,
+            "sql_ms": round((after_seconds - seconds) * 1000, 3),
+            "statuses": statuses,
+        }
+
+    cold = storm(False)
+    warm = storm(True)
+    results = {
+        "clients": args.clients,
+        "cold": cold,
+        "revalidated": warm,
+        "bytes_saved": cold["bytes"] - warm["bytes"],
+        "sql_ms_saved": round(cold["sql_ms"] - warm["sql_ms"], 3),
+    }
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""End-to-end load test of the REST and Socket.IO paths against a locally started server.
+
+Simulated clients log in over REST, connect over Socket.IO, join a shared conversation,
+send messages and page through history. Results are printed as JSON for comparing runs in CI.
+
+Usage: python -m benchmarks.load [--clients 50] [--messages 20] [--interval 0.25] [--database-url URL]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+import socketio
+
+from benchmarks.common import percentiles
+
+def wait_for_server(base_url, process, timeout=60):
+    """Polls until the server answers HTTP"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Benchmark server exited during startup")
+        try:
+            requests.get(f"{base_url}/apidocs/", timeout=1)
+            return
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    raise RuntimeError("Benchmark server did not start in time")
+
+class Recorder:
+    """Thread-safe collection of latency samples"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+
+    def add(self, name, milliseconds):
+        with self.lock:
+            self.samples.setdefault(name, []).append(milliseconds)
+
+    def summary(self, name, elapsed):
+        samples = self.samples.get(name, [])
+        return {"count": len(samples), "per_sec": round(len(samples) / elapsed, 1), **percentiles(samples)}
+
+def timed_request(recorder, name, fn, *args, **kwargs):
+    start = time.perf_counter()
+    response = fn(*args, **kwargs)
+    recorder.add(name, (time.perf_counter() - start) * 1000)
+    response.raise_for_status()
+    return response
+
+class SimulatedClient:
+    """One user driving the REST API and a Socket.IO connection"""
+
+    def __init__(self, base_url, index, recorder):
+        self.base_url = base_url
+        self.index = index
+        self.recorder = recorder
+        self.http = requests.Session()
+        self.sio = socketio.Client(reconnection=False)
+        self.sio.on("new_message", self._on_new_message)
+        self.email = f"load{index}@example.com"
+        self.user_id = None
+
+    def _on_new_message(self, data):
+        sent_at = float(data["content"].rsplit(":", 1)[1])
+        self.recorder.add("delivery", (time.perf_counter() - sent_at) * 1000)
+
+    def register(self):
+        self.http.post(f"{self.base_url}/users/register", json={"username": f"load{self.index}", "email": self.email, "password": "password"})
+
+    def login(self):
+        response = timed_request(self.recorder, "rest", self.http.post, f"{self.base_url}/users/login", json={"email": self.email, "password": "password"})
+        self.user_id = response.json()["user"]["id"]
+
+    def connect(self, conversation_id):
+        token = self.http.cookies.get("access_token_cookie")
+        self.sio.connect(f"{self.base_url}?access_token_cookie={token}", transports=["websocket"], socketio_path="socket.io")
+        self.sio.emit("join_conversation", {"conversation_id": conversation_id})
+
+    def run(self, conversation_id, message_count, interval):
+        history_url = f"{self.base_url}/conversations/conversations/{conversation_id}/messages"
+        for i in range(message_count):
+            self.sio.emit("send_message", {"conversation_id": conversation_id, "message": f"load {self.index}/{i}:{time.perf_counter()}"})
+            if i % 5 == 0:
+                timed_request(self.recorder, "rest", self.http.get, history_url, params={"limit": 30})
+            time.sleep(interval)
+
+    def close(self):
+        self.sio.disconnect()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=20, help="Messages sent by each client.")
+    parser.add_argument("--interval", type=float, default=0.25, help="Pause between a client's messages in seconds, keep it within the send_message rate limit.")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--drain", type=float, default=2.0, help="Seconds to wait for in-flight deliveries.")
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    command = [sys.executable, "-m", "benchmarks.server", "--port", str(args.port)]
+    if args.database_url:
+        command += ["--database-url", args.database_url]
+    env = {**os.environ, "BCRYPT_ROUNDS": os.environ.get("BCRYPT_ROUNDS", "4")}
+    # The results go to stdout, keep the server's request and connect logs out of them
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    try:
+        wait_for_server(base_url, server)
+        recorder = Recorder()
+        clients = [SimulatedClient(base_url, i, recorder) for i in range(args.clients)]
+
+        for client in clients:
+            client.register()
+            client.login()
+
+        response = clients[0].http.post(
+            f"{base_url}/conversations/conversations",
+            json={"chat_name": "load test", "participant_ids": [client.user_id for client in clients]}
+        )
+        response.raise_for_status()
+        conversation_id = response.json()["id"]
+
+        for client in clients:
+            client.connect(conversation_id)
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=client.run, args=(conversation_id, args.messages, args.interval)) for client in clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        time.sleep(args.drain)
+        elapsed = time.perf_counter() - start
+
+        for client in clients:
+            client.close()
+
+        sent = args.clients * args.messages
+        results = {
+            "clients": args.clients,
+            "messages_sent": sent,
+            "elapsed_sec": round(elapsed, 3),
+            "send_throughput_per_sec": round(sent / elapsed, 1),
+            "delivery_ms": recorder.summary("delivery", elapsed),
+            "expected_deliveries": sent * args.clients,
+            "rest_ms": recorder.summary("rest", elapsed),
+        }
+        print(json.dumps(results, indent=2))
+    finally:
+        server.terminate()
+        server.wait()
+
+if __name__ == "__main__":
+    main()
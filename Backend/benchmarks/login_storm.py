@@ -0,0 +1,166 @@
+"""Measures what a login storm costs websocket traffic, with inline bcrypt versus the hashing pool.
+
+In process, a ticker greenlet measures how long the gevent hub stalls while logins are
+checked. Every socket of a worker is served by that hub, so this lag is the floor of their latency.
+
+End to end, a server started with BCRYPT_MAX_PENDING below the number of concurrent logins
+is flooded with logins while a connected client measures send_message -> new_message round
+trips. Logins the saturated pool rejects are counted as 503s.
+
+Usage: python -m benchmarks.login_storm [--logins 200] [--rounds 12] [--workers 4] [--max-pending 50] [--port 5056]
+"""
+from gevent import monkey
+monkey.patch_all()
+
+import argparse
+import collections
+import json
+import os
+import subprocess
+import sys
+import time
+
+import bcrypt
+import gevent
+
+from benchmarks.common import create_benchmark_app, percentiles
+
+TICK = 0.005
+PING_INTERVAL = 0.02
+
+def storm(check, logins):
+    """Runs concurrent password checks while sampling hub latency"""
+    from app.utils.hashing import HashingBusyError
+
+    lags = []
+    rejected = 0
+    running = True
+
+    def ticker():
+        while running:
+            start = time.perf_counter()
+            gevent.sleep(TICK)
+            lags.append((time.perf_counter() - start - TICK) * 1000)
+
+    def login():
+        nonlocal rejected
+        try:
+            check()
+        except HashingBusyError:
+            rejected += 1
+
+    ticker_greenlet = gevent.spawn(ticker)
+    start = time.perf_counter()
+    gevent.joinall([gevent.spawn(login) for _ in range(logins)], raise_error=True)
+    elapsed = time.perf_counter() - start
+    running = False
+    ticker_greenlet.join()
+
+    return {
+        "checks_per_sec": round((logins - rejected) / elapsed, 1),
+        "rejected": rejected,
+        "hub_lag_ms": percentiles(lags),
+        "max_hub_lag_ms": round(max(lags, default=0), 3),
+    }
+
+def server_storm(args):
+    """Floods a separately started server with logins while timing socket round trips"""
+    import requests
+
+    from benchmarks.load import Recorder, SimulatedClient, wait_for_server
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    env = {
+        **os.environ,
+        "BCRYPT_ROUNDS": str(args.rounds),
+        "BCRYPT_WORKERS": str(args.workers),
+        "BCRYPT_MAX_PENDING": str(args.max_pending),
+        # Pings must not be throttled by the send_message rate limit
+        "RATE_LIMITS": "{}",
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.server", "--port", str(args.port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+    try:
+        wait_for_server(base_url, server)
+        client = SimulatedClient(base_url, 0, Recorder())
+        client.register()
+        client.login()
+        response = client.http.post(f"{base_url}/conversations/conversations", json={"chat_name": "login storm", "participant_ids": []})
+        response.raise_for_status()
+        conversation_id = response.json()["id"]
+        client.connect(conversation_id)
+
+        def ping(running):
+            """Sends timestamped messages that come back as new_message while running() holds"""
+            while running():
+                client.sio.emit("send_message", {"conversation_id": conversation_id, "message": f"ping:{time.perf_counter()}"})
+                time.sleep(PING_INTERVAL)
+
+        idle = client.recorder = Recorder()
+        deadline = time.monotonic() + 1.0
+        ping(lambda: time.monotonic() < deadline)
+        time.sleep(0.5)
+
+        statuses = collections.Counter()
+
+        def login():
+            response = requests.post(f"{base_url}/users/login", json={"email": client.email, "password": "password"})
+            statuses[response.status_code] += 1
+
+        during = client.recorder = Recorder()
+        start = time.perf_counter()
+        logins = [gevent.spawn(login) for _ in range(args.logins)]
+        ping(lambda: not all(greenlet.ready() for greenlet in logins))
+        elapsed = time.perf_counter() - start
+        time.sleep(0.5)
+        client.close()
+
+        return {
+            "max_pending": args.max_pending,
+            "elapsed_sec": round(elapsed, 3),
+            "status_counts": {str(status): count for status, count in sorted(statuses.items())},
+            "rejected_503": statuses[503],
+            "idle_round_trip_ms": idle.summary("delivery", 1.0),
+            "storm_round_trip_ms": during.summary("delivery", elapsed),
+        }
+    finally:
+        server.terminate()
+        server.wait()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-pending", type=int, default=50, help="Pool queue limit, below --logins so that the storm is partly rejected.")
+    parser.add_argument("--port", type=int, default=5056)
+    args = parser.parse_args()
+
+    # Importing the app package configures it, so a database has to be in place first
+    create_benchmark_app()
+
+    from app.utils.hashing import PasswordHasher
+
+    unbounded = PasswordHasher(rounds=args.rounds, workers=args.workers, max_pending=args.logins)
+    bounded = PasswordHasher(rounds=args.rounds, workers=args.workers, max_pending=args.max_pending)
+    hashed = bcrypt.hashpw(b"benchmark", bcrypt.gensalt(rounds=args.rounds)).decode("utf-8")
+
+    results = {
+        "logins": args.logins,
+        "rounds": args.rounds,
+        "workers": args.workers,
+        "in_process": {
+            "inline": storm(lambda: bcrypt.checkpw(b"benchmark", hashed.encode("utf-8")), args.logins),
+            "pool": storm(lambda: unbounded.check(hashed, "benchmark"), args.logins),
+            "pool_bounded": storm(lambda: bounded.check(hashed, "benchmark"), args.logins),
+        },
+        "server": server_storm(args),
+    }
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
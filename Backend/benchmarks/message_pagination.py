@@ -0,0 +1,78 @@
+"""Compares OFFSET paging with keyset (cursor) paging over one large conversation.
+
+Usage: python -m benchmarks.message_pagination [--messages 1000000] [--limit 30] [--database-url URL]
+"""
+import argparse
+import datetime
+import json
+
+from benchmarks.common import create_benchmark_app, measure
+
+PAGES = (1, 10, 100, 1000)
+
+def seed(db, message_count, chunk_size=50_000):
+    """Bulk inserts one user and one conversation holding message_count messages"""
+    from app.models import conversation_participant
+    from app.models.conversation import Conversation
+    from app.models.message import Message
+    from app.models.user import User
+
+    user_id = db.session.execute(db.insert(User).values(email="bench@example.com", username="bench", password="x").returning(User.id)).scalar_one()
+    conversation_id = db.session.execute(db.insert(Conversation).values(chat_name="bench").returning(Conversation.id)).scalar_one()
+    db.session.execute(db.insert(conversation_participant).values(user_id=user_id, conversation_id=conversation_id))
+
+    start = datetime.datetime(2025, 1, 1)
+    for chunk_start in range(0, message_count, chunk_size):
+        rows = [
+            {
+                "content": f"message {i}",
+                "timestamp": start + datetime.timedelta(seconds=i // 3),
+                "conversation_id": conversation_id,
+                "sender_id": user_id,
+            }
+            for i in range(chunk_start, min(chunk_start + chunk_size, message_count))
+        ]
+        db.session.execute(db.insert(Message), rows)
+        db.session.commit()
+
+    return conversation_id
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=30)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    app = create_benchmark_app(args.database_url)
+
+    from app.extensions import db
+    from app.services.conversation_service import ConversationService
+
+    with app.app_context():
+        conversation_id = seed(db, args.messages)
+        service = ConversationService()
+
+        results = {"messages": args.messages, "limit": args.limit, "offset_ms": {}, "keyset_ms": {}}
+
+        for page in PAGES:
+            offset = (page - 1) * args.limit
+            if offset >= args.messages:
+                break
+            results["offset_ms"][page] = round(measure(lambda: service.get_messages(conversation_id, args.limit, offset)), 3)
+
+        # Keyset pages can only be reached by walking the cursor chain
+        cursor = None
+        for page in range(1, max(PAGES) + 1):
+            if page in PAGES:
+                results["keyset_ms"][page] = round(measure(lambda: service.get_messages_before(conversation_id, args.limit, cursor)), 3)
+            messages = service.get_messages_before(conversation_id, args.limit, cursor)
+            cursor = service.get_next_cursor(messages, args.limit)
+            db.session.expunge_all()
+            if cursor is None:
+                break
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
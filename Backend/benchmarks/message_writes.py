@@ -0,0 +1,81 @@
+"""Compares socket message throughput with one commit per message against group commit.
+
+Usage: python -m benchmarks.message_writes [--senders 50] [--messages 200] [--database-url URL]
+"""
+from gevent import monkey
+monkey.patch_all()
+
+import argparse
+import json
+import time
+
+import gevent
+
+from benchmarks.common import create_benchmark_app
+
+def seed(db, sender_count):
+    """Creates one conversation with sender_count participants"""
+    from app.models import conversation_participant
+    from app.models.conversation import Conversation
+    from app.models.user import User
+
+    conversation_id = db.session.execute(db.insert(Conversation).values(chat_name="bench").returning(Conversation.id)).scalar_one()
+    user_ids = db.session.execute(
+        db.insert(User).returning(User.id),
+        [{"email": f"writer{i}@example.com", "username": f"writer{i}", "password": "x"} for i in range(sender_count)]
+    ).scalars().all()
+    db.session.execute(
+        db.insert(conversation_participant),
+        [{"user_id": user_id, "conversation_id": conversation_id} for user_id in user_ids]
+    )
+    db.session.commit()
+
+    return conversation_id, user_ids
+
+def run(app, conversation_id, user_ids, messages_per_sender):
+    """Sends messages from every sender concurrently and returns messages per second"""
+    from app.services.conversation_service import ConversationService
+
+    service = ConversationService()
+
+    def sender(user_id):
+        with app.app_context():
+            for i in range(messages_per_sender):
+                service.add_message(conversation_id, user_id, f"message {i} from {user_id}")
+
+    start = time.perf_counter()
+    gevent.joinall([gevent.spawn(sender, user_id) for user_id in user_ids], raise_error=True)
+    elapsed = time.perf_counter() - start
+
+    return round(len(user_ids) * messages_per_sender / elapsed, 1)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--senders", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--batch-delay-ms", type=float, default=5)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    app = create_benchmark_app(args.database_url)
+
+    from app.extensions import db
+    from app.services.message_writer import message_writer
+
+    with app.app_context():
+        conversation_id, user_ids = seed(db, args.senders)
+
+    results = {"database": app.config["SQLALCHEMY_DATABASE_URI"].split(":")[0], "senders": args.senders, "messages_per_sender": args.messages}
+
+    message_writer.enabled = False
+    results["single_commit_msgs_per_sec"] = run(app, conversation_id, user_ids, args.messages)
+
+    app.config.update(MESSAGE_BATCHING=True, MESSAGE_BATCH_SIZE=args.batch_size, MESSAGE_BATCH_DELAY_MS=args.batch_delay_ms)
+    message_writer.init_app(app)
+    results["batched_msgs_per_sec"] = run(app, conversation_id, user_ids, args.messages)
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
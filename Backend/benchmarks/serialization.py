@@ -0,0 +1,58 @@
+"""Compares the old dataclass + __dict__ + stdlib json path with slotted DTOs and the fast JSON provider.
+
+Usage: python -m benchmarks.serialization [--messages 10000]
+"""
+import argparse
+import datetime
+import json
+from dataclasses import dataclass
+from types import SimpleNamespace
+
+from benchmarks.common import create_benchmark_app, measure
+
+@dataclass
+class LegacyMessageDTO:
+    id: int
+    content: str
+    timestamp: str
+    conversation_id: int
+    sender_name: str
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=10_000)
+    args = parser.parse_args()
+
+    # Importing any app module configures the app, which needs a database
+    create_benchmark_app()
+
+    from app.dtos.message_dto import MessageDTO
+    from app.utils import json_provider
+
+    start = datetime.datetime(2025, 1, 1, 12, 0, 0, 123456)
+    messages = [
+        SimpleNamespace(id=i, content=f"message number {i} with some text", timestamp=start + datetime.timedelta(seconds=i), conversation_id=1, sender=SimpleNamespace(username=f"user{i % 50}"))
+        for i in range(args.messages)
+    ]
+
+    def legacy():
+        dtos = [
+            LegacyMessageDTO(m.id, m.content, m.timestamp.isoformat(), m.conversation_id, m.sender.username).__dict__
+            for m in messages
+        ]
+        return json.dumps({"messages": dtos}, sort_keys=True)
+
+    def fast():
+        return json_provider.dumps({"messages": [MessageDTO.from_message(m).to_dict() for m in messages]})
+
+    results = {
+        "messages": args.messages,
+        "encoder": "orjson" if json_provider.orjson is not None else "json",
+        "legacy_ms": round(measure(legacy, repeat=10), 3),
+        "fast_ms": round(measure(fast, repeat=10), 3),
+    }
+    results["speedup"] = round(results["legacy_ms"] / results["fast_ms"], 2)
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""Runs the app under gevent against a benchmark database.
+
+Usage: python -m benchmarks.server [--host 127.0.0.1] [--port 5055] [--database-url URL]
+"""
+from gevent import monkey
+monkey.patch_all()
+
+import argparse
+
+from benchmarks.common import create_benchmark_app
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    app = create_benchmark_app(args.database_url)
+
+    from app.extensions import socketio
+
+    socketio.run(app, host=args.host, port=args.port, log_output=False)
+
+if __name__ == "__main__":
+    main()
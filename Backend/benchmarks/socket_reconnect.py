@@ -0,0 +1,68 @@
+"""Measures websocket connect cost for users that belong to many conversations.
+
+Usage: python -m benchmarks.socket_reconnect [--users 20] [--conversations 500] [--reconnects 10000]
+"""
+import argparse
+import json
+import time
+
+from benchmarks.common import create_benchmark_app, percentiles
+
+def seed(db, user_count, conversation_count):
+    """Creates users that all share conversation_count conversations"""
+    from app.models import conversation_participant
+    from app.models.conversation import Conversation
+    from app.models.user import User
+
+    user_ids = db.session.execute(
+        db.insert(User).returning(User.id),
+        [{"email": f"socket{i}@example.com", "username": f"socket{i}", "password": "x"} for i in range(user_count)]
+    ).scalars().all()
+    conversation_ids = db.session.execute(
+        db.insert(Conversation).returning(Conversation.id),
+        [{"chat_name": f"room {i}"} for i in range(conversation_count)]
+    ).scalars().all()
+    db.session.execute(
+        db.insert(conversation_participant),
+        [{"user_id": user_id, "conversation_id": conversation_id} for user_id in user_ids for conversation_id in conversation_ids]
+    )
+    db.session.commit()
+
+    return user_ids
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--conversations", type=int, default=500)
+    parser.add_argument("--reconnects", type=int, default=10_000)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    app = create_benchmark_app(args.database_url)
+
+    from flask_jwt_extended import create_access_token
+    from app.extensions import db, socketio
+
+    with app.app_context():
+        user_ids = seed(db, args.users, args.conversations)
+        tokens = [create_access_token(identity=str(user_id)) for user_id in user_ids]
+
+    latencies = []
+    for i in range(args.reconnects):
+        start = time.perf_counter()
+        client = socketio.test_client(app, query_string=f"access_token_cookie={tokens[i % len(tokens)]}")
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert client.is_connected()
+        client.disconnect()
+
+    results = {
+        "users": args.users,
+        "conversations_per_user": args.conversations,
+        "reconnects": args.reconnects,
+        "connects_per_sec": round(len(latencies) / (sum(latencies) / 1000), 1),
+        "connect_ms": percentiles(latencies),
+    }
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
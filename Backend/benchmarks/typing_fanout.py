@@ -0,0 +1,85 @@
+"""Measures the typing indicator pipeline with many typists in one large room against per-keystroke broadcasts.
+
+Deliveries are counted at the emit boundary (room members minus skipped sids) instead of through
+thousands of real sockets, so the numbers isolate the coalescing and throttling.
+
+Usage: python -m benchmarks.typing_fanout [--members 5000] [--typists 1000] [--keystrokes-per-sec 5] [--seconds 5]
+"""
+from gevent import monkey
+monkey.patch_all()
+
+import argparse
+import json
+import random
+import time
+
+import gevent
+
+from benchmarks.common import create_benchmark_app, percentiles
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--members", type=int, default=5000)
+    parser.add_argument("--typists", type=int, default=1000)
+    parser.add_argument("--keystrokes-per-sec", type=float, default=5)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    create_benchmark_app()
+
+    from app.services.typing_indicators import typing_indicators
+    from app.utils import json_provider
+
+    conversation_id = 1
+    broadcasts = []
+
+    def count_deliveries(event, payload, room, skip_sid=None):
+        broadcasts.append((time.perf_counter(), args.members - len(skip_sid or ()), len(json_provider.dumps(payload))))
+
+    typing_indicators.emit = count_deliveries
+
+    handler_us = []
+    keystrokes = 0
+    deadline = time.perf_counter() + args.seconds
+
+    def typist(user_id):
+        nonlocal keystrokes
+        gevent.sleep(random.random() / args.keystrokes_per_sec)
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            typing_indicators.start(f"sid{user_id}", user_id, f"user{user_id}", conversation_id)
+            handler_us.append((time.perf_counter() - start) * 1_000_000)
+            keystrokes += 1
+            gevent.sleep(1 / args.keystrokes_per_sec)
+
+    started = time.perf_counter()
+    gevent.joinall([gevent.spawn(typist, user_id) for user_id in range(args.typists)])
+    typing_phase = time.perf_counter() - started
+
+    # Everyone goes silent, the wheel has to expire every typist on its own
+    silent_at = time.perf_counter()
+    while typing_indicators._typing or typing_indicators._changes:
+        gevent.sleep(typing_indicators.tick)
+    expired_after = time.perf_counter() - silent_at
+
+    deliveries = sum(delivered for _, delivered, _ in broadcasts)
+    naive_deliveries = keystrokes * (args.members - 1)
+    results = {
+        "members": args.members,
+        "typists": args.typists,
+        "keystrokes": keystrokes,
+        "typing_phase_sec": round(typing_phase, 3),
+        "handler_us": percentiles(handler_us),
+        "broadcasts": len(broadcasts),
+        "deliveries": deliveries,
+        "naive_broadcasts": keystrokes,
+        "naive_deliveries": naive_deliveries,
+        "delivery_reduction": round(naive_deliveries / deliveries, 1) if deliveries else None,
+        "max_payload_bytes": max((size for _, _, size in broadcasts), default=0),
+        "all_expired_after_sec": round(expired_after, 3),
+        "timeout_sec": typing_indicators.timeout,
+    }
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Measures /users/search latency over a large user table through the trigram index.
+
+Usage: python -m benchmarks.username_search [--users 5000000] [--queries 2000] [--database-url URL]
+"""
+import argparse
+import json
+import random
+import string
+import time
+
+from benchmarks.common import create_benchmark_app, percentiles
+
+def seed(db, user_count, chunk_size=20_000):
+    """Bulk inserts users with random usernames and their trigrams"""
+    from app.models.user import User
+    from app.models.username_trigram import UsernameTrigram
+    from app.utils.trigrams import trigrams
+
+    rng = random.Random(42)
+    usernames = []
+    for chunk_start in range(0, user_count, chunk_size):
+        rows = []
+        for i in range(chunk_start, min(chunk_start + chunk_size, user_count)):
+            username = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 12))) + str(i)
+            rows.append({"email": f"{username}@example.com", "username": username, "password": "x"})
+
+        user_ids = db.session.execute(db.insert(User).returning(User.id, sort_by_parameter_order=True), rows).scalars().all()
+        db.session.execute(
+            db.insert(UsernameTrigram),
+            [{"trigram": gram, "user_id": user_id} for user_id, row in zip(user_ids, rows) for gram in trigrams(row["username"])]
+        )
+        db.session.commit()
+        usernames.extend(row["username"] for row in rows[::100])
+
+    return usernames
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=5_000_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    app = create_benchmark_app(args.database_url)
+
+    from app.extensions import db
+    from app.services.user_service import UserService
+
+    with app.app_context():
+        samples = seed(db, args.users)
+        service = UserService()
+        rng = random.Random(7)
+
+        # Keystroke-like terms: prefixes and infixes of existing usernames
+        terms = []
+        for _ in range(args.queries):
+            username = rng.choice(samples)
+            start = rng.choice((0, 0, rng.randint(0, len(username) - 3)))
+            terms.append(username[start:start + rng.randint(1, 6)])
+
+        results = {"users": args.users, "queries": args.queries}
+        for label in ("uncached_ms", "cached_ms"):
+            latencies = []
+            for term in terms:
+                start = time.perf_counter()
+                service.get_profiles(term, 5, 0)
+                latencies.append((time.perf_counter() - start) * 1000)
+            results[label] = percentiles(latencies)
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -51,6 +51,24 @@ def get_metadata():
     return target_db.metadata
 
 
+# Full-text search lives outside the models: SQLite's message_fts* shadow tables and
+# PostgreSQL's tsvector column and index are maintained by migrations and triggers only
+SEARCH_TABLE_PREFIX = 'message_fts'
+SEARCH_COLUMNS = {('message', 'search_vector')}
+SEARCH_INDEXES = {'ix_message_search_vector'}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Keeps autogenerate and `flask db check` from dropping the search artifacts"""
+    if type_ == 'table' and name.startswith(SEARCH_TABLE_PREFIX):
+        return False
+    if type_ == 'column' and (object.table.name, name) in SEARCH_COLUMNS:
+        return False
+    if type_ == 'index' and name in SEARCH_INDEXES:
+        return False
+    return True
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -65,7 +83,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        include_object=include_object
     )
 
     with context.begin_transaction():
@@ -93,6 +112,8 @@ def run_migrations_online():
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    if conf_args.get("include_object") is None:
+        conf_args["include_object"] = include_object
 
     connectable = get_engine()
 
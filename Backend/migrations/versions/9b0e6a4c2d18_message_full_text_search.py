@@ -0,0 +1,113 @@
+"""Message full text search
+
+Revision ID: 9b0e6a4c2d18
+Revises: 5e27b9c3f610
+Create Date: 2025-11-24 11:42:10.377518
+
+SQLite gets an external content FTS5 table kept in sync by triggers. Postgres gets a
+tsvector column filled by a trigger and a GIN index built concurrently. Existing rows
+are backfilled in short id-range batches, so the message table is never locked as a whole.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '9b0e6a4c2d18'
+down_revision = '5e27b9c3f610'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 10_000
+TS_CONFIG = 'simple'
+
+
+def backfill(statement):
+    """Runs statement over consecutive id ranges of the message table"""
+    connection = op.get_bind()
+    max_id = connection.execute(sa.text("SELECT max(id) FROM message")).scalar() or 0
+
+    for lower in range(0, max_id, BATCH_SIZE):
+        connection.execute(sa.text(statement), {"lower": lower, "upper": lower + BATCH_SIZE})
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        op.execute("CREATE VIRTUAL TABLE message_fts USING fts5(content, content='message', content_rowid='id')")
+        op.execute(
+            """
+            CREATE TRIGGER message_fts_insert AFTER INSERT ON message BEGIN
+                INSERT INTO message_fts(rowid, content) VALUES (new.id, new.content);
+            END
+            """
+        )
+        op.execute(
+            """
+            CREATE TRIGGER message_fts_delete AFTER DELETE ON message BEGIN
+                INSERT INTO message_fts(message_fts, rowid, content) VALUES ('delete', old.id, old.content);
+            END
+            """
+        )
+        op.execute(
+            """
+            CREATE TRIGGER message_fts_update AFTER UPDATE OF content ON message BEGIN
+                INSERT INTO message_fts(message_fts, rowid, content) VALUES ('delete', old.id, old.content);
+                INSERT INTO message_fts(rowid, content) VALUES (new.id, new.content);
+            END
+            """
+        )
+        backfill(
+            """
+            INSERT INTO message_fts(rowid, content)
+            SELECT id, content FROM message WHERE id > :lower AND id <= :upper
+            """
+        )
+
+    elif dialect == 'postgresql':
+        op.add_column('message', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+        op.execute(
+            f"""
+            CREATE FUNCTION message_search_vector_update() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector := to_tsvector('{TS_CONFIG}', NEW.content);
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+            """
+        )
+        op.execute(
+            """
+            CREATE TRIGGER message_search_vector_trigger BEFORE INSERT OR UPDATE OF content ON message
+            FOR EACH ROW EXECUTE FUNCTION message_search_vector_update()
+            """
+        )
+
+        # Each batch commits on its own, only the rows of the current range are ever locked
+        with op.get_context().autocommit_block():
+            backfill(
+                f"""
+                UPDATE message SET search_vector = to_tsvector('{TS_CONFIG}', content)
+                WHERE id > :lower AND id <= :upper AND search_vector IS NULL
+                """
+            )
+            op.execute("CREATE INDEX CONCURRENTLY ix_message_search_vector ON message USING gin (search_vector)")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS message_fts_update")
+        op.execute("DROP TRIGGER IF EXISTS message_fts_delete")
+        op.execute("DROP TRIGGER IF EXISTS message_fts_insert")
+        op.execute("DROP TABLE IF EXISTS message_fts")
+
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_message_search_vector")
+        op.execute("DROP TRIGGER IF EXISTS message_search_vector_trigger ON message")
+        op.execute("DROP FUNCTION IF EXISTS message_search_vector_update()")
+        op.drop_column('message', 'search_vector')
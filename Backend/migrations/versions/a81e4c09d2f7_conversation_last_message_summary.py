@@ -0,0 +1,61 @@
+"""Conversation last message summary
+
+Revision ID: a81e4c09d2f7
+Revises: 3f9c2d7a1b44
+Create Date: 2025-11-05 16:48:09.530127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a81e4c09d2f7'
+down_revision = '3f9c2d7a1b44'
+branch_labels = None
+depends_on = None
+
+SNIPPET_LENGTH = 100
+
+
+def upgrade():
+    with op.batch_alter_table('conversation', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('last_message_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('last_message_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('last_message_username', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('last_message_snippet', sa.String(), nullable=True))
+
+    # Backfill the summary from the newest message of every conversation
+    op.execute(
+        """
+        UPDATE conversation SET
+            last_message_id = (
+                SELECT m.id FROM message m WHERE m.conversation_id = conversation.id
+                ORDER BY m.timestamp DESC, m.id DESC LIMIT 1
+            )
+        """
+    )
+    op.execute(
+        f"""
+        UPDATE conversation SET
+            last_message_at = (SELECT m.timestamp FROM message m WHERE m.id = conversation.last_message_id),
+            last_message_snippet = (SELECT substr(m.content, 1, {SNIPPET_LENGTH}) FROM message m WHERE m.id = conversation.last_message_id),
+            last_message_username = (
+                SELECT u.username FROM message m JOIN "user" u ON u.id = m.sender_id
+                WHERE m.id = conversation.last_message_id
+            )
+        WHERE last_message_id IS NOT NULL
+        """
+    )
+    op.execute("UPDATE conversation SET last_message_at = CURRENT_TIMESTAMP WHERE last_message_at IS NULL")
+
+    with op.batch_alter_table('conversation', schema=None) as batch_op:
+        batch_op.alter_column('last_message_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('conversation', schema=None) as batch_op:
+        batch_op.drop_column('last_message_snippet')
+        batch_op.drop_column('last_message_username')
+        batch_op.drop_column('last_message_at')
+        batch_op.drop_column('last_message_id')
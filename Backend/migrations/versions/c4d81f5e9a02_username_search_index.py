@@ -0,0 +1,66 @@
+"""Username search index
+
+Revision ID: c4d81f5e9a02
+Revises: a81e4c09d2f7
+Create Date: 2025-11-12 09:31:55.804113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d81f5e9a02'
+down_revision = 'a81e4c09d2f7'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 10_000
+
+
+def trigrams(text):
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def upgrade():
+    op.create_table('username_trigram',
+    sa.Column('trigram', sa.String(length=3), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('trigram', 'user_id')
+    )
+    with op.batch_alter_table('username_trigram', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_username_trigram_user_id'), ['user_id'], unique=False)
+
+    op.create_index('ix_user_username_lower', 'user', [sa.text('lower(username)')], unique=False)
+
+    # Backfill trigrams for existing users in id order
+    connection = op.get_bind()
+    user = sa.table('user', sa.column('id', sa.Integer), sa.column('username', sa.String))
+    username_trigram = sa.table('username_trigram', sa.column('trigram', sa.String), sa.column('user_id', sa.Integer))
+
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(user.c.id, user.c.username)
+            .where(user.c.id > last_id)
+            .order_by(user.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+
+        entries = [{"trigram": gram, "user_id": user_id} for user_id, username in rows for gram in trigrams(username)]
+        if entries:
+            connection.execute(username_trigram.insert(), entries)
+        last_id = rows[-1].id
+
+
+def downgrade():
+    op.drop_index('ix_user_username_lower', table_name='user')
+
+    with op.batch_alter_table('username_trigram', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_username_trigram_user_id'))
+
+    op.drop_table('username_trigram')
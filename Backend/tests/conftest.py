@@ -0,0 +1,148 @@
+from gevent import monkey
+monkey.patch_all()
+
+import datetime
+import os
+import tempfile
+
+import pytest
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+
+# The app configures itself from the environment on import, so point it at a throwaway database first
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="chatster-test-"), "test.sqlite")
+os.environ["JWT_SECRET_KEY"] = "chatster-test-secret-of-32-bytes"
+os.environ["BCRYPT_ROUNDS"] = "4"
+for name in ("DATABASE_REPLICA_URLS", "SOCKETIO_MESSAGE_QUEUE", "SESSION_REGISTRY_URL", "RATE_LIMIT_URL", "CACHE_INVALIDATION_URL", "REPLICA_STICKY_URL"):
+    os.environ[name] = ""
+
+@pytest.fixture(scope="session")
+def app():
+    from flask_migrate import upgrade
+    from app import app
+
+    with app.app_context():
+        upgrade(directory=MIGRATIONS_DIR)
+
+    return app
+
+@pytest.fixture(autouse=True)
+def app_context(app):
+    """Runs every test inside an app context and leaves empty tables and cold caches behind"""
+    from app.extensions import db, membership_cache, username_cache, username_search_cache, rate_limiter, replicas
+
+    config = dict(app.config)
+    with app.app_context():
+        yield
+
+        db.session.remove()
+        with db.engine.begin() as connection:
+            for table in reversed(db.metadata.sorted_tables):
+                connection.execute(table.delete())
+
+    app.config.clear()
+    app.config.update(config)
+    for cache in (membership_cache, username_cache, username_search_cache):
+        cache.clear()
+    rate_limiter.init_app(app)
+    replicas.init_app(app)
+
+@pytest.fixture
+def explain():
+    """Returns SQLite's query plan of a select, or of a raw statement and its parameters"""
+    from app.extensions import db
+
+    def plan(statement, params=()) -> str:
+        if not isinstance(statement, str):
+            compiled = statement.compile(dialect=db.engine.dialect)
+            statement, params = str(compiled), tuple(compiled.params[name] for name in compiled.positiontup)
+
+        with db.engine.connect() as connection:
+            return " | ".join(row[3] for row in connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, tuple(params)))
+
+    return plan
+
+@pytest.fixture
+def statements():
+    """Records the (statement, parameters) of every SQL statement executed during a test"""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    recorded = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        recorded.append((statement, parameters))
+
+    event.listen(Engine, "before_cursor_execute", record)
+    yield recorded
+    event.remove(Engine, "before_cursor_execute", record)
+
+@pytest.fixture
+def make_user():
+    """Creates users without paying for password hashing"""
+    from app.repositories.user_repository import UserRepository
+
+    repository = UserRepository()
+
+    def make(username):
+        return repository.create(f"{username}@example.com", username, "not-a-hash")
+
+    return make
+
+@pytest.fixture
+def make_conversation():
+    """Creates a conversation with the given users as participants"""
+    from app.services.conversation_service import ConversationService
+
+    service = ConversationService()
+
+    def make(*users, chat_name="chat"):
+        return service.create_conversation(chat_name, [user.id for user in users])
+
+    return make
+
+@pytest.fixture
+def add_messages():
+    """Bulk inserts count messages one second apart, bypassing the write path"""
+    from app.extensions import db
+    from app.models.message import Message
+
+    def add(conversation, sender, count, start=datetime.datetime(2025, 1, 1), step=datetime.timedelta(seconds=1)):
+        rows = [
+            {"content": f"message {i}", "timestamp": start + step * i, "conversation_id": conversation.id, "sender_id": sender.id}
+            for i in range(count)
+        ]
+        db.session.execute(db.insert(Message), rows)
+        db.session.commit()
+
+    return add
+
+@pytest.fixture
+def client_for(app):
+    """Builds a REST client authenticated as a user"""
+    from flask_jwt_extended import create_access_token
+
+    def make(user):
+        client = app.test_client()
+        client.set_cookie("access_token_cookie", create_access_token(identity=str(user.id)))
+        return client
+
+    return make
+
+@pytest.fixture
+def socket_for(app, client_for):
+    """Connects a Socket.IO test client authenticated as a user"""
+    from app.extensions import socketio
+
+    sockets = []
+
+    def make(user):
+        socket = socketio.test_client(app, flask_test_client=client_for(user))
+        sockets.append(socket)
+        return socket
+
+    yield make
+
+    for socket in sockets:
+        if socket.is_connected():
+            socket.disconnect()
@@ -0,0 +1,48 @@
+import datetime
+
+from app.commands import archive_message_batch
+from app.extensions import db
+from app.models.archived_message import ArchivedMessage
+from app.models.message import Message
+from app.repositories.conversation_repository import ConversationRepository
+
+def test_archive_keyset_is_an_index_range(explain):
+    query = ConversationRepository()._history_query(ArchivedMessage, 1, (datetime.datetime(2025, 1, 1), 5)).limit(30)
+
+    assert "ix_message_archive_conversation_timestamp_id (conversation_id=? AND timestamp<?)" in explain(query)
+
+def test_archiving_moves_old_messages_in_batches(make_user, make_conversation, add_messages):
+    alice = make_user("alice")
+    conversation = make_conversation(alice)
+    add_messages(conversation, alice, 5)
+    add_messages(conversation, alice, 2, start=datetime.datetime(2025, 3, 1))
+    cutoff = datetime.datetime(2025, 2, 1)
+
+    assert [archive_message_batch(cutoff, 2) for _ in range(4)] == [2, 2, 1, 0]
+
+    assert db.session.execute(db.select(Message.id).order_by(Message.id)).scalars().all() == [6, 7]
+    assert db.session.execute(db.select(ArchivedMessage.id).order_by(ArchivedMessage.id)).scalars().all() == [1, 2, 3, 4, 5]
+
+def test_history_continues_into_the_archive(make_user, make_conversation, add_messages, client_for):
+    alice = make_user("alice")
+    conversation = make_conversation(alice)
+    add_messages(conversation, alice, 5)
+    add_messages(conversation, alice, 4, start=datetime.datetime(2025, 3, 1))
+    archive_message_batch(datetime.datetime(2025, 2, 1), 100)
+    client = client_for(alice)
+    url = f"/conversations/conversations/{conversation.id}/messages"
+
+    seen, cursor = [], None
+    while True:
+        response = client.get(url, query_string={"limit": 3, **({"before": cursor} if cursor else {})})
+        seen += [message["id"] for message in response.json["messages"]]
+        cursor = response.json["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == list(range(9, 0, -1))
+
+    # Offset slices cross into the archive as well
+    sliced = client.get(url, query_string={"limit": 3, "offset": 3}).json["messages"]
+    assert [message["id"] for message in sliced] == [6, 5, 4]
+    sliced = client.get(url, query_string={"limit": 3, "offset": 6}).json["messages"]
+    assert [message["id"] for message in sliced] == [3, 2, 1]
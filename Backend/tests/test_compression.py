@@ -0,0 +1,79 @@
+import gzip
+import json
+
+import brotli
+import pytest
+
+from app.extensions import compressor
+
+def messages_url(conversation):
+    return f"/conversations/conversations/{conversation.id}/messages"
+
+@pytest.fixture
+def chat(make_user, make_conversation, add_messages, client_for):
+    alice = make_user("alice")
+    conversation = make_conversation(alice)
+    add_messages(conversation, alice, 50)
+    return conversation, client_for(alice)
+
+@pytest.mark.parametrize("encoding, decompress", [("br", brotli.decompress), ("gzip", gzip.decompress)])
+def test_json_is_compressed_with_the_preferred_encoding(chat, encoding, decompress):
+    conversation, client = chat
+    plain = client.get(messages_url(conversation))
+
+    response = client.get(messages_url(conversation), headers={"Accept-Encoding": f"{encoding}, identity;q=0.5"})
+
+    assert response.headers["Content-Encoding"] == encoding
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert len(response.data) < len(plain.data)
+    assert json.loads(decompress(response.data)) == plain.json
+
+def test_brotli_is_preferred_when_both_are_accepted(chat):
+    conversation, client = chat
+
+    response = client.get(messages_url(conversation), headers={"Accept-Encoding": "gzip, deflate, br"})
+
+    assert response.headers["Content-Encoding"] == "br"
+
+def test_identity_without_accept_encoding(chat):
+    conversation, client = chat
+
+    response = client.get(messages_url(conversation), headers={"Accept-Encoding": ""})
+
+    assert "Content-Encoding" not in response.headers
+    assert response.json["messages"]
+
+def test_small_bodies_stay_uncompressed(chat, monkeypatch):
+    conversation, client = chat
+    size = len(client.get(messages_url(conversation)).data)
+    monkeypatch.setattr(compressor, "min_size", size + 1)
+
+    response = client.get(messages_url(conversation), headers={"Accept-Encoding": "gzip"})
+
+    assert "Content-Encoding" not in response.headers
+    assert len(response.data) == size
+
+def test_compressed_etags_are_weak_and_still_revalidate(chat):
+    conversation, client = chat
+    headers = {"Accept-Encoding": "gzip"}
+
+    first = client.get(messages_url(conversation), headers=headers)
+    assert first.headers["ETag"].startswith("W/")
+
+    response = client.get(messages_url(conversation), headers={**headers, "If-None-Match": first.headers["ETag"]})
+    assert response.status_code == 304
+    assert "Content-Encoding" not in response.headers
+
+@pytest.mark.parametrize("export_format, mimetype", [("ndjson", "application/x-ndjson"), ("csv", "text/csv")])
+def test_exports_stream_compressed(chat, export_format, mimetype):
+    conversation, client = chat
+    url = f"/conversations/conversations/{conversation.id}/export"
+    plain = client.get(url, query_string={"format": export_format})
+
+    response = client.get(url, query_string={"format": export_format}, headers={"Accept-Encoding": "gzip"})
+
+    assert response.is_streamed
+    assert response.mimetype == mimetype
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+    assert gzip.decompress(response.data) == plain.data
@@ -0,0 +1,53 @@
+import pytest
+
+from app.repositories.conversation_repository import ConversationRepository
+
+def revalidate(client, url, etag):
+    return client.get(url, headers={"If-None-Match": etag})
+
+@pytest.fixture
+def chat(make_user, make_conversation, client_for):
+    alice, bob = make_user("alice"), make_user("bob")
+    conversation = make_conversation(alice, bob)
+    ConversationRepository().add_message(conversation.id, alice.id, "first")
+    return alice, bob, conversation, client_for(alice)
+
+@pytest.mark.parametrize("path", ["/conversations/conversations", "/conversations/all_conversations", "/conversations/conversations/{id}/messages"])
+def test_unchanged_resources_answer_304_without_loading_rows(chat, statements, path):
+    _, _, conversation, client = chat
+    url = path.format(id=conversation.id)
+    first = client.get(url)
+    assert first.status_code == 200
+    statements.clear()
+
+    response = revalidate(client, url, first.headers["ETag"])
+
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == first.headers["ETag"]
+    # Only version markers are read, never the message or conversation rows themselves
+    assert not [statement for statement, _ in statements if "message.content" in statement or "conversation.chat_name" in statement]
+
+def test_new_message_changes_history_and_inbox(chat):
+    alice, _, conversation, client = chat
+    urls = ["/conversations/conversations", f"/conversations/conversations/{conversation.id}/messages"]
+    etags = [client.get(url).headers["ETag"] for url in urls]
+
+    ConversationRepository().add_message(conversation.id, alice.id, "second")
+
+    assert [revalidate(client, url, etag).status_code for url, etag in zip(urls, etags)] == [200, 200]
+
+def test_membership_change_changes_inbox_and_directory(chat, make_conversation):
+    alice, bob, _, client = chat
+    urls = ["/conversations/conversations", "/conversations/all_conversations"]
+    etags = [client.get(url).headers["ETag"] for url in urls]
+
+    make_conversation(alice, bob, chat_name="another")
+
+    assert [revalidate(client, url, etag).status_code for url, etag in zip(urls, etags)] == [200, 200]
+
+def test_etags_differ_per_page(chat):
+    _, _, conversation, client = chat
+    url = f"/conversations/conversations/{conversation.id}/messages"
+
+    assert client.get(url, query_string={"limit": 1}).headers["ETag"] != client.get(url, query_string={"limit": 2}).headers["ETag"]
@@ -0,0 +1,35 @@
+import gevent
+
+from app.extensions import socketio, rate_limiter
+
+def test_connect_joins_every_conversation_room(app, make_user, make_conversation, socket_for):
+    app.config["RATE_LIMITS"] = {}
+    rate_limiter.init_app(app)
+    alice, bob = make_user("alice"), make_user("bob")
+    conversations = [make_conversation(alice, bob, chat_name=f"chat {i}") for i in range(20)]
+    alice_socket, bob_socket = socket_for(alice), socket_for(bob)
+
+    for conversation in conversations:
+        alice_socket.emit("send_message", {"conversation_id": conversation.id, "message": f"to {conversation.id}"})
+    gevent.sleep(0.1)
+
+    delivered = {packet["args"][0]["conversation_id"] for packet in bob_socket.get_received() if packet["name"] == "new_message"}
+    assert delivered == {conversation.id for conversation in conversations}
+
+def test_connect_loads_conversation_ids_only(make_user, make_conversation, socket_for, statements):
+    alice = make_user("alice")
+    for i in range(20):
+        make_conversation(alice, chat_name=f"chat {i}")
+    statements.clear()
+
+    socket = socket_for(alice)
+
+    assert socket.is_connected()
+    # One id-only membership query, neither the user nor their conversations are loaded
+    assert len(statements) == 1
+    assert statements[0][0].startswith("SELECT conversation_participant.conversation_id")
+
+def test_connect_without_token_is_refused(app):
+    socket = socketio.test_client(app)
+
+    assert not socket.is_connected()
@@ -0,0 +1,51 @@
+def test_directory_pages_flag_access(make_user, make_conversation, client_for):
+    alice, bob = make_user("alice"), make_user("bob")
+    conversations = [make_conversation(alice if i % 2 else bob, chat_name=f"room {i}") for i in range(5)]
+
+    client = client_for(alice)
+    seen, cursor = [], None
+    while True:
+        response = client.get("/conversations/all_conversations", query_string={"limit": 2, **({"after": cursor} if cursor else {})})
+        assert response.status_code == 200
+        seen += [(conversation["id"], conversation["can_access"]) for conversation in response.json["conversations"]]
+        cursor = response.json["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == [(conversation.id, i % 2 == 1) for i, conversation in enumerate(conversations)]
+
+def test_directory_filters_by_name(make_user, make_conversation, client_for):
+    alice = make_user("alice")
+    make_conversation(alice, chat_name="Book club")
+    wanted = make_conversation(alice, chat_name="Climbing crew")
+
+    response = client_for(alice).get("/conversations/all_conversations", query_string={"name": "climb"})
+
+    assert [conversation["id"] for conversation in response.json["conversations"]] == [wanted.id]
+
+def test_directory_query_count_does_not_grow_with_the_page(make_user, make_conversation, client_for, statements):
+    alice, bob = make_user("alice"), make_user("bob")
+    client = client_for(alice)
+
+    def count_statements():
+        statements.clear()
+        client.get("/conversations/all_conversations", query_string={"limit": 100})
+        return len(statements)
+
+    make_conversation(bob)
+    one = count_statements()
+    for i in range(10):
+        make_conversation(bob if i % 2 else alice)
+
+    assert count_statements() == one
+
+def test_directory_limit_is_clamped(make_user, make_conversation, client_for):
+    alice = make_user("alice")
+    for i in range(3):
+        make_conversation(alice, chat_name=f"room {i}")
+    client = client_for(alice)
+
+    for limit in (-1, 0):
+        response = client.get("/conversations/all_conversations", query_string={"limit": limit})
+        assert len(response.json["conversations"]) == 1
+        assert response.json["next_cursor"] is not None
@@ -0,0 +1,53 @@
+import datetime
+import json
+
+from app.commands import archive_message_batch
+
+def export(client, conversation, **params):
+    return client.get(f"/conversations/conversations/{conversation.id}/export", query_string=params)
+
+def test_export_streams_archive_then_hot_messages(make_user, make_conversation, add_messages, client_for):
+    alice = make_user("alice")
+    conversation = make_conversation(alice)
+    add_messages(conversation, alice, 3)
+    add_messages(conversation, alice, 2, start=datetime.datetime(2025, 2, 1))
+    assert archive_message_batch(datetime.datetime(2025, 1, 15), 100) == 3
+
+    response = export(client_for(alice), conversation)
+
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["content"] for row in rows] == ["message 0", "message 1", "message 2", "message 0", "message 1"]
+    assert {row["sender_name"] for row in rows} == {"alice"}
+
+def test_export_since_is_incremental(make_user, make_conversation, add_messages, client_for):
+    alice = make_user("alice")
+    conversation = make_conversation(alice)
+    add_messages(conversation, alice, 5)
+
+    response = export(client_for(alice), conversation, since="2025-01-01T00:00:02+00:00")
+
+    assert [json.loads(line)["content"] for line in response.text.splitlines()] == ["message 3", "message 4"]
+
+def test_export_as_csv(make_user, make_conversation, add_messages, client_for):
+    alice = make_user("alice")
+    conversation = make_conversation(alice)
+    add_messages(conversation, alice, 2)
+
+    response = export(client_for(alice), conversation, format="csv")
+
+    assert response.mimetype == "text/csv"
+    assert response.text.splitlines() == [
+        "id,timestamp,sender_name,content",
+        *[f"{i + 1},2025-01-01T00:00:0{i}+00:00,alice,message {i}" for i in range(2)],
+    ]
+
+def test_export_rejects_outsiders_and_bad_input(make_user, make_conversation, client_for):
+    alice, mallory = make_user("alice"), make_user("mallory")
+    conversation = make_conversation(alice)
+
+    assert export(client_for(mallory), conversation).status_code == 403
+    assert export(client_for(alice), conversation, format="xml").status_code == 400
+    assert export(client_for(alice), conversation, since="yesterday").status_code == 400
@@ -0,0 +1,50 @@
+import datetime
+
+from app.extensions import db
+from app.models.conversation import Conversation
+from app.repositories.conversation_repository import ConversationRepository
+
+def test_inbox_pages_follow_latest_activity(make_user, make_conversation, client_for):
+    alice = make_user("alice")
+    conversations = [make_conversation(alice, chat_name=f"chat {i}") for i in range(7)]
+    # Two conversations share their last activity, the cursor has to break the tie on id
+    moments = [datetime.datetime(2025, 1, 1, 12, minute) for minute in (5, 1, 3, 3, 0, 6, 2)]
+    for conversation, moment in zip(conversations, moments):
+        db.session.execute(db.update(Conversation).where(Conversation.id == conversation.id).values(last_message_at=moment))
+    db.session.commit()
+
+    client = client_for(alice)
+    seen, cursor = [], None
+    while True:
+        response = client.get("/conversations/conversations", query_string={"limit": 2, **({"before": cursor} if cursor else {})})
+        assert response.status_code == 200
+        seen += [conversation["id"] for conversation in response.json["conversations"]]
+        cursor = response.json["next_cursor"]
+        if cursor is None:
+            break
+
+    expected = [conversation.id for conversation, _ in sorted(zip(conversations, moments), key=lambda pair: (pair[1], pair[0].id), reverse=True)]
+    assert seen == expected
+
+def test_new_message_moves_conversation_to_the_top(make_user, make_conversation, client_for):
+    alice = make_user("alice")
+    older, newer = make_conversation(alice, chat_name="older"), make_conversation(alice, chat_name="newer")
+    ConversationRepository().add_message(older.id, alice.id, "bump")
+
+    conversations = client_for(alice).get("/conversations/conversations").json["conversations"]
+
+    assert [conversation["id"] for conversation in conversations] == [older.id, newer.id]
+    assert conversations[0]["last_message"] == "bump"
+    assert conversations[0]["last_message_username"] == "alice"
+
+def test_inbox_cursor_is_an_index_range(make_user, make_conversation, explain, statements):
+    alice = make_user("alice")
+    make_conversation(alice)
+
+    ConversationRepository().get_inbox(alice.id, 10, (datetime.datetime(2030, 1, 1), 10))
+    inbox = next(statement for statement, _ in statements if "JOIN conversation_participant" in statement)
+    assert "(conversation.last_message_at, conversation.id) < (?, ?)" in inbox
+
+    # For users in many conversations the planner can walk the composite index from the cursor on
+    keyset = db.select(Conversation.id).where(db.tuple_(Conversation.last_message_at, Conversation.id) < db.tuple_(datetime.datetime(2030, 1, 1), 10))
+    assert "ix_conversation_last_message_at_id (last_message_at<?)" in explain(keyset)
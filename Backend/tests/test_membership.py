@@ -0,0 +1,105 @@
+import fakeredis
+import gevent
+import pytest
+
+from app.extensions import db, membership_cache, invalidation_bus
+from app.models import conversation_participant
+from app.utils.cache import LRUCache
+from app.utils.invalidation import InvalidationBus
+
+def wait_for(condition, timeout=2.0):
+    """Yields to other greenlets until condition holds"""
+    with gevent.Timeout(timeout):
+        while not condition():
+            gevent.sleep(0.01)
+
+def errors(socket):
+    return [packet["args"][0]["error"] for packet in socket.get_received() if packet["name"] == "error"]
+
+@pytest.fixture
+def other_worker():
+    """Connects this process's invalidation bus and a second worker's bus to one fake Redis server"""
+    server = fakeredis.FakeServer()
+    worker = InvalidationBus()
+    worker.register("membership", LRUCache())
+
+    invalidation_bus.start(fakeredis.FakeRedis(server=server, decode_responses=True))
+    worker.start(fakeredis.FakeRedis(server=server, decode_responses=True))
+    # Both listeners have to be subscribed before anything is published
+    wait_for(lambda: worker.client.pubsub_numsub(worker.channel)[0][1] == 2)
+
+    yield worker
+
+    worker.stop()
+    invalidation_bus.stop()
+
+def test_removed_user_cannot_send(make_user, make_conversation, client_for, socket_for):
+    alice, bob = make_user("alice"), make_user("bob")
+    conversation = make_conversation(alice, bob)
+    alice_socket, bob_socket = socket_for(alice), socket_for(bob)
+    # Connecting primed the membership cache for both
+    assert membership_cache.get((bob.id, conversation.id)) is True
+
+    response = client_for(alice).post(f"/conversations/conversations/{conversation.id}/remove_user", json={"user_id": bob.id})
+    assert response.status_code == 200
+
+    bob_socket.emit("send_message", {"conversation_id": conversation.id, "message": "still here?"})
+    gevent.sleep(0.05)
+
+    assert errors(bob_socket) == ["User is not part of conversation!"]
+    assert not [packet for packet in alice_socket.get_received() if packet["name"] == "new_message"]
+
+def test_removal_on_another_worker_reaches_this_cache(make_user, make_conversation, socket_for, other_worker):
+    alice, bob = make_user("alice"), make_user("bob")
+    conversation = make_conversation(alice, bob)
+    bob_socket = socket_for(bob)
+    assert membership_cache.get((bob.id, conversation.id)) is True
+
+    # The other worker commits the removal and publishes its invalidation
+    db.session.execute(db.delete(conversation_participant).where(conversation_participant.c.user_id == bob.id))
+    db.session.commit()
+    other_worker.invalidate("membership", (bob.id, conversation.id))
+    wait_for(lambda: membership_cache.get((bob.id, conversation.id)) is None)
+
+    bob_socket.emit("send_message", {"conversation_id": conversation.id, "message": "still here?"})
+
+    assert errors(bob_socket) == ["User is not part of conversation!"]
+
+def test_addition_on_another_worker_reaches_this_cache(make_user, make_conversation, socket_for, other_worker):
+    alice, bob = make_user("alice"), make_user("bob")
+    conversation = make_conversation(alice)
+    bob_socket = socket_for(bob)
+    bob_socket.emit("send_message", {"conversation_id": conversation.id, "message": "let me in"})
+    assert errors(bob_socket) == ["User is not part of conversation!"]
+    assert membership_cache.get((bob.id, conversation.id)) is False
+
+    db.session.execute(db.insert(conversation_participant).values(user_id=bob.id, conversation_id=conversation.id))
+    db.session.commit()
+    other_worker.invalidate("membership", (bob.id, conversation.id))
+    wait_for(lambda: membership_cache.get((bob.id, conversation.id)) is None)
+
+    bob_socket.emit("send_message", {"conversation_id": conversation.id, "message": "hi"})
+    gevent.sleep(0.05)
+
+    assert errors(bob_socket) == []
+
+def test_deleting_a_conversation_reaches_other_workers(other_worker):
+    cache = other_worker.caches["membership"]
+    cache.set((1, 7), True)
+    cache.set((2, 7), True)
+    cache.set((1, 8), True)
+
+    invalidation_bus.invalidate_matching("membership", 1, 7)
+    wait_for(lambda: cache.get((1, 7)) is None)
+
+    assert cache.get((2, 7)) is None
+    assert cache.get((1, 8)) is True
+
+def test_values_loaded_before_an_invalidation_are_not_cached():
+    cache = LRUCache()
+    generation = cache.generation
+
+    cache.invalidate("key")
+    cache.set("key", "stale", generation)
+
+    assert cache.get("key") is None
@@ -0,0 +1,55 @@
+import datetime
+
+from app.extensions import db
+from app.models.message import Message
+from app.repositories.conversation_repository import ConversationRepository
+
+def test_keyset_is_an_index_range(make_user, make_conversation, add_messages, explain):
+    alice = make_user("alice")
+    conversation = make_conversation(alice)
+    add_messages(conversation, alice, 10)
+
+    query = ConversationRepository()._history_query(Message, conversation.id, (datetime.datetime(2025, 1, 1, 0, 0, 5), 5)).limit(30)
+
+    # The keyset bounds the index scan instead of being filtered row by row after conversation_id
+    assert "ix_message_conversation_timestamp_id (conversation_id=? AND timestamp<?)" in explain(query)
+
+def test_cursor_pages_visit_every_message_once(make_user, make_conversation, add_messages, client_for):
+    alice = make_user("alice")
+    conversation = make_conversation(alice)
+    # Pairs of messages share a timestamp, so pages have to break ties on id
+    add_messages(conversation, alice, 25, step=datetime.timedelta(seconds=0.5))
+    db.session.execute(db.update(Message).values(timestamp=db.func.strftime("%Y-%m-%d %H:%M:%S.000000", Message.timestamp)))
+    db.session.commit()
+
+    client = client_for(alice)
+    url = f"/conversations/conversations/{conversation.id}/messages"
+    seen, cursor = [], None
+    while True:
+        response = client.get(url, query_string={"limit": 4, **({"before": cursor} if cursor else {})})
+        assert response.status_code == 200
+        seen += [message["id"] for message in response.json["messages"]]
+        cursor = response.json["next_cursor"]
+        if cursor is None:
+            break
+
+    expected = db.session.execute(
+        db.select(Message.id).order_by(Message.timestamp.desc(), Message.id.desc())
+    ).scalars().all()
+    assert seen == expected
+
+def test_invalid_cursor_is_rejected(make_user, make_conversation, client_for):
+    alice = make_user("alice")
+    conversation = make_conversation(alice)
+
+    response = client_for(alice).get(f"/conversations/conversations/{conversation.id}/messages", query_string={"before": "garbage"})
+
+    assert response.status_code == 400
+
+def test_history_requires_membership(make_user, make_conversation, client_for):
+    alice, bob = make_user("alice"), make_user("bob")
+    conversation = make_conversation(alice)
+
+    response = client_for(bob).get(f"/conversations/conversations/{conversation.id}/messages")
+
+    assert response.status_code == 403
@@ -0,0 +1,42 @@
+import warnings
+
+from flask_migrate import check
+
+from app.repositories.conversation_repository import ConversationRepository
+from conftest import MIGRATIONS_DIR
+
+def test_search_pages_through_tied_scores(make_user, make_conversation, client_for):
+    alice, bob = make_user("alice"), make_user("bob")
+    conversation = make_conversation(alice)
+    elsewhere = make_conversation(bob)
+    repository = ConversationRepository()
+    # Identical messages score the same, so pages have to break ties on id
+    expected = sorted((repository.add_message(conversation.id, alice.id, "lunch at noon?").id for _ in range(5)), reverse=True)
+    repository.add_message(elsewhere.id, bob.id, "lunch at noon?")
+
+    client = client_for(alice)
+    seen, cursor = [], None
+    while True:
+        response = client.get("/conversations/search", query_string={"q": "lunch", "limit": 2, **({"after": cursor} if cursor else {})})
+        assert response.status_code == 200
+        seen += [result["id"] for result in response.json["results"]]
+        cursor = response.json["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == expected
+
+def test_search_cursor_is_a_row_value(make_user, statements):
+    alice = make_user("alice")
+
+    ConversationRepository().search_messages(alice.id, "lunch", 10, (1.0, 10))
+
+    search = next(statement for statement, _ in statements if "message_fts MATCH" in statement)
+    assert "(-message_fts.rank, m.id) < (?, ?)" in search
+
+def test_schema_check_ignores_search_artifacts():
+    with warnings.catch_warnings():
+        # Expression indexes cannot be compared on SQLite
+        warnings.simplefilter("ignore")
+        # Exits when the models and the migrated schema differ
+        check(directory=MIGRATIONS_DIR)
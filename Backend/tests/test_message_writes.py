@@ -0,0 +1,106 @@
+import sqlite3
+
+import gevent
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models.conversation import Conversation
+from app.models.message import Message
+from app.repositories.conversation_repository import ConversationRepository
+from app.services.message_writer import message_writer
+
+@pytest.fixture
+def batching():
+    message_writer.enabled = True
+    yield message_writer
+    message_writer.enabled = False
+
+def message_inserts(statements):
+    return [statement for statement, _ in statements if statement.startswith("INSERT INTO message ")]
+
+def test_message_to_a_missing_conversation_is_rejected_before_inserting(make_user, statements):
+    alice = make_user("alice")
+
+    with pytest.raises(ValueError, match="Conversation does not exist!"):
+        ConversationRepository().add_message(12345, alice.id, "hello?")
+
+    assert message_inserts(statements) == []
+    assert db.session.execute(db.select(db.func.count(Message.id))).scalar_one() == 0
+
+def test_message_updates_the_conversation_summary(make_user, make_conversation):
+    alice = make_user("alice")
+    conversation = make_conversation(alice)
+
+    message = ConversationRepository().add_message(conversation.id, alice.id, "x" * 150)
+
+    summary = db.session.get(Conversation, conversation.id)
+    db.session.refresh(summary)
+    assert summary.last_message_id == message.id
+    assert summary.last_message_username == "alice"
+    assert summary.last_message_snippet == "x" * 100
+
+def test_writer_commits_concurrent_messages_in_one_batch(make_user, make_conversation, batching, statements):
+    alice, bob = make_user("alice"), make_user("bob")
+    conversation = make_conversation(alice, bob)
+
+    senders = [gevent.spawn(batching.submit, conversation.id, user.id, f"message {i}") for i, user in enumerate([alice, bob] * 5)]
+    gevent.joinall(senders, raise_error=True)
+
+    # SQLite inserts row by row when ids are returned, one summary update means one transaction
+    summary_updates = [statement for statement, _ in statements if statement.startswith("UPDATE conversation SET last_message_id")]
+    assert len(summary_updates) == 1
+    ids = [sender.value.id for sender in senders]
+    assert len(set(ids)) == 10
+    assert db.session.execute(db.select(db.func.count(Message.id))).scalar_one() == 10
+
+def test_writer_fails_only_the_bad_message_of_a_batch(make_user, make_conversation, batching):
+    alice = make_user("alice")
+    conversation = make_conversation(alice)
+
+    good = [gevent.spawn(batching.submit, conversation.id, alice.id, f"message {i}") for i in range(3)]
+    bad = gevent.spawn(batching.submit, 12345, alice.id, "lost")
+    gevent.joinall(good + [bad])
+
+    assert all(sender.successful() for sender in good)
+    assert isinstance(bad.exception, ValueError)
+    assert db.session.execute(db.select(db.func.count(Message.id))).scalar_one() == 3
+
+@pytest.mark.parametrize("content", [None, "", "   ", 42])
+def test_empty_messages_are_rejected_before_inserting(make_user, make_conversation, statements, content):
+    alice = make_user("alice")
+    conversation = make_conversation(alice)
+    statements.clear()
+
+    with pytest.raises(ValueError, match="Message cannot be empty!"):
+        ConversationRepository().add_message(conversation.id, alice.id, content)
+
+    assert statements == []
+
+def test_send_message_without_content_is_an_empty_message_error(make_user, make_conversation, socket_for):
+    alice = make_user("alice")
+    conversation = make_conversation(alice)
+    socket = socket_for(alice)
+
+    socket.emit("send_message", {"conversation_id": conversation.id})
+    gevent.sleep(0.05)
+
+    errors = [packet["args"][0]["error"] for packet in socket.get_received() if packet["name"] == "error"]
+    assert errors == ["Message cannot be empty!"]
+    assert db.session.execute(db.select(db.func.count(Message.id))).scalar_one() == 0
+
+@pytest.mark.parametrize("violation, expected", [
+    ("FOREIGN KEY constraint failed", ValueError),
+    ("CHECK constraint failed: message", IntegrityError),
+])
+def test_only_sender_key_violations_blame_the_sender(make_user, make_conversation, monkeypatch, violation, expected):
+    alice = make_user("alice")
+    conversation = make_conversation(alice)
+
+    def flush(*args, **kwargs):
+        raise IntegrityError("INSERT INTO message", {}, sqlite3.IntegrityError(violation))
+
+    monkeypatch.setattr(db.session, "flush", flush)
+
+    with pytest.raises(expected):
+        ConversationRepository().add_message(conversation.id, alice.id, "hello")
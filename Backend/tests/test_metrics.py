@@ -0,0 +1,49 @@
+import gevent
+
+def scrape(client):
+    """Parses the /metrics endpoint into {series: value}"""
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    return {
+        series: float(value)
+        for series, value in (line.rsplit(" ", 1) for line in response.text.splitlines() if line and not line.startswith("#"))
+    }
+
+def delta(before, after, series):
+    return after.get(series, 0) - before.get(series, 0)
+
+INBOX = 'method="GET",route="/conversations/conversations"'
+SEND = 'event="send_message"'
+
+def test_routes_record_latency_and_sql(make_user, make_conversation, client_for, statements):
+    alice = make_user("alice")
+    make_conversation(alice)
+    client = client_for(alice)
+    before = scrape(client)
+    statements.clear()
+
+    client.get("/conversations/conversations")
+    client.get("/conversations/conversations")
+    queries = len(statements)
+    after = scrape(client)
+
+    assert delta(before, after, f"chatster_http_request_duration_seconds_count{{{INBOX}}}") == 2
+    assert delta(before, after, f'chatster_http_request_duration_seconds_bucket{{{INBOX},le="+Inf"}}') == 2
+    assert delta(before, after, f"chatster_http_request_sql_statements_total{{{INBOX}}}") == queries
+    assert delta(before, after, f'chatster_http_responses_total{{{INBOX},status="200"}}') == 2
+
+def test_socket_events_record_sql_and_connections(make_user, make_conversation, client_for, socket_for):
+    alice = make_user("alice")
+    conversation = make_conversation(alice)
+    client = client_for(alice)
+    before = scrape(client)
+
+    socket = socket_for(alice)
+    socket.emit("send_message", {"conversation_id": conversation.id, "message": "hi"})
+    gevent.sleep(0.05)
+    after = scrape(client)
+
+    assert delta(before, after, f"chatster_socket_event_duration_seconds_count{{{SEND}}}") == 1
+    assert delta(before, after, f"chatster_socket_event_sql_statements_total{{{SEND}}}") > 0
+    assert delta(before, after, "chatster_connected_sockets") == 1
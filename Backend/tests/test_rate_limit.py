@@ -0,0 +1,68 @@
+import types
+
+import fakeredis
+import gevent
+import pytest
+
+from app.extensions import db, rate_limiter, session_registry
+from app.models.message import Message
+from app.utils import rate_limit
+from app.utils.rate_limit import InMemoryTokenBuckets, RateLimiter, RedisTokenBuckets
+
+@pytest.fixture(params=["memory", "redis"])
+def buckets(request):
+    if request.param == "memory":
+        return InMemoryTokenBuckets()
+    return RedisTokenBuckets(client=fakeredis.FakeRedis(decode_responses=True))
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Freezes both clocks the buckets read, advanced by hand"""
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit, "time", types.SimpleNamespace(monotonic=lambda: now[0], time=lambda: now[0]))
+    return now
+
+def test_buckets_allow_a_burst_then_refill(buckets, clock):
+    assert [buckets.take("key", 20, 3) for _ in range(4)] == [True, True, True, False]
+
+    clock[0] += 0.06
+
+    assert buckets.take("key", 20, 3)
+    assert not buckets.take("key", 20, 3)
+    assert buckets.take("other", 20, 3)
+
+def test_user_budget_is_shared_between_workers():
+    server = fakeredis.FakeServer()
+    limits = {"send_message": {"sid": [1, 10], "user": [1, 3]}}
+    workers = []
+    for _ in range(2):
+        limiter = RateLimiter(session_registry)
+        limiter.limits = limits
+        limiter.shared = RedisTokenBuckets(client=fakeredis.FakeRedis(server=server, decode_responses=True))
+        workers.append(limiter)
+
+    allowed = [worker.allow("send_message", f"sid-{i}", 7) for i, worker in enumerate(workers * 2)]
+
+    assert allowed == [True, True, True, False]
+    assert workers[0].allow("send_message", "sid-0", 8)
+
+def test_unlimited_events_always_pass():
+    limiter = RateLimiter(session_registry)
+    limiter.limits = {"send_message": {"sid": [1, 1]}}
+
+    assert all(limiter.allow("typing", "sid", 7) for _ in range(100))
+
+def test_over_limit_events_are_refused_before_any_work(app, make_user, make_conversation, socket_for):
+    app.config["RATE_LIMITS"] = {"send_message": {"sid": [0.001, 3]}}
+    rate_limiter.init_app(app)
+    alice = make_user("alice")
+    conversation = make_conversation(alice)
+    socket = socket_for(alice)
+
+    for i in range(5):
+        socket.emit("send_message", {"conversation_id": conversation.id, "message": f"message {i}"})
+    gevent.sleep(0.05)
+
+    errors = [packet["args"][0] for packet in socket.get_received() if packet["name"] == "error"]
+    assert errors == [{"error": "rate_limited", "event": "send_message"}] * 2
+    assert db.session.execute(db.select(db.func.count(Message.id))).scalar_one() == 3
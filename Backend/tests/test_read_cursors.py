@@ -0,0 +1,155 @@
+import gevent
+import pytest
+from sqlalchemy import Update
+
+from app.extensions import db
+from app.models import conversation_participant
+from app.repositories.conversation_repository import ConversationRepository
+from app.services.read_cursor_writer import read_cursor_writer
+
+@pytest.fixture
+def quick_flush():
+    delay = read_cursor_writer.delay
+    read_cursor_writer.delay = 0.01
+    yield read_cursor_writer
+    read_cursor_writer.delay = delay
+
+@pytest.fixture
+def backlog(make_user, make_conversation):
+    """Bob has 10 unread messages from Alice"""
+    alice, bob = make_user("alice"), make_user("bob")
+    conversation = make_conversation(alice, bob)
+    repository = ConversationRepository()
+    messages = [repository.add_message(conversation.id, alice.id, f"message {i}") for i in range(10)]
+    return bob, conversation, messages
+
+def read_state(user, conversation):
+    participant = conversation_participant.c
+    return tuple(db.session.execute(
+        db.select(participant.last_read_message_id, participant.unread_count)
+        .where(participant.user_id == user.id, participant.conversation_id == conversation.id)
+    ).one())
+
+def unread_counts(client):
+    return {conversation["id"]: conversation["unread_count"] for conversation in client.get("/conversations/conversations").json["conversations"]}
+
+def test_messages_count_as_unread_until_read(backlog, client_for):
+    bob, conversation, messages = backlog
+    client = client_for(bob)
+    assert unread_counts(client) == {conversation.id: 10}
+
+    ConversationRepository().update_read_cursors([(bob.id, conversation.id, messages[6].id)])
+    assert read_state(bob, conversation) == (messages[6].id, 3)
+    assert unread_counts(client) == {conversation.id: 3}
+
+    ConversationRepository().update_read_cursors([(bob.id, conversation.id, None)])
+    assert read_state(bob, conversation) == (messages[-1].id, 0)
+
+def test_partial_read_count_is_bounded_by_the_backlog(backlog, statements, explain):
+    bob, conversation, messages = backlog
+    statements.clear()
+
+    ConversationRepository().update_read_cursors([(bob.id, conversation.id, messages[4].id)])
+
+    statement, params = next((statement, params) for statement, params in statements if "count(*)" in statement)
+    assert "LIMIT" in statement
+    assert "ix_message_conversation_id_id (conversation_id=? AND id>? AND id<?)" in explain(statement, params)
+    assert read_state(bob, conversation) == (messages[4].id, 5)
+
+def test_cursors_never_move_backwards(backlog):
+    bob, conversation, messages = backlog
+    repository = ConversationRepository()
+    repository.update_read_cursors([(bob.id, conversation.id, messages[7].id)])
+
+    repository.update_read_cursors([(bob.id, conversation.id, messages[2].id)])
+
+    assert read_state(bob, conversation) == (messages[7].id, 2)
+
+def test_rapid_reads_are_coalesced(backlog, client_for, quick_flush, statements):
+    bob, conversation, messages = backlog
+    client = client_for(bob)
+    statements.clear()
+
+    for message in messages[:8]:
+        assert client.post(f"/conversations/conversations/{conversation.id}/read", json={"message_id": message.id}).status_code == 202
+    gevent.sleep(0.1)
+
+    cursor_updates = [statement for statement, _ in statements if statement.startswith("UPDATE conversation_participant")]
+    assert len(cursor_updates) == 1
+    assert read_state(bob, conversation) == (messages[7].id, 2)
+
+@pytest.mark.parametrize("body", [[1, 2], {"message_id": "abc"}, {"message_id": 1.5}, {"message_id": True}])
+def test_malformed_reads_are_rejected_before_queuing(backlog, client_for, body):
+    bob, conversation, _ = backlog
+
+    response = client_for(bob).post(f"/conversations/conversations/{conversation.id}/read", json=body)
+
+    assert response.status_code == 400
+    assert read_cursor_writer._pending == {}
+
+@pytest.mark.parametrize("payload, error", [
+    ([1, 2], "Payload must be an object!"),
+    ({"message_id": "abc"}, "message_id must be an integer!"),
+])
+def test_malformed_socket_reads_are_answered_with_an_error(backlog, socket_for, payload, error):
+    bob, conversation, _ = backlog
+    socket = socket_for(bob)
+    if isinstance(payload, dict):
+        payload["conversation_id"] = conversation.id
+
+    socket.emit("mark_read", payload)
+    gevent.sleep(0.05)
+
+    assert [packet["args"][0]["error"] for packet in socket.get_received() if packet["name"] == "error"] == [error]
+    assert read_cursor_writer._pending == {}
+
+@pytest.fixture
+def racing_sender(backlog, monkeypatch):
+    """Commits a new message from Alice right before each read cursor write, as a concurrent sender would"""
+    _, conversation, messages = backlog
+    execute = db.session.execute
+    state = {"racing": False, "sent": 0, "limit": 1}
+
+    def racing_execute(statement, *args, **kwargs):
+        if (not state["racing"] and state["sent"] < state["limit"] and isinstance(statement, Update)
+                and statement.table.name == "conversation_participant" and "last_read_message_id" in str(statement)):
+            state["racing"] = True
+            ConversationRepository().add_message(conversation.id, messages[0].sender_id, "late")
+            state["racing"], state["sent"] = False, state["sent"] + 1
+        return execute(statement, *args, **kwargs)
+
+    monkeypatch.setattr(db.session, "execute", racing_execute)
+    return state
+
+def test_concurrent_messages_are_not_lost_from_the_counter(backlog, racing_sender):
+    bob, conversation, messages = backlog
+
+    assert ConversationRepository().update_read_cursors([(bob.id, conversation.id, messages[6].id)]) == []
+
+    assert racing_sender["sent"] == 1
+    assert read_state(bob, conversation) == (messages[6].id, 4)
+
+def test_cursors_outraced_every_time_are_given_back(backlog, racing_sender):
+    bob, conversation, messages = backlog
+    racing_sender["limit"] = 100
+    entry = (bob.id, conversation.id, messages[6].id)
+
+    assert ConversationRepository().update_read_cursors([entry]) == [entry]
+
+    assert read_state(bob, conversation) == (None, 10 + racing_sender["sent"])
+
+def test_writer_retries_outraced_cursors_on_the_next_flush(backlog, quick_flush, monkeypatch):
+    bob, conversation, messages = backlog
+    update = quick_flush.repository.update_read_cursors
+    calls = []
+
+    def outraced_once(entries):
+        calls.append(entries)
+        return entries if len(calls) == 1 else update(entries)
+
+    monkeypatch.setattr(quick_flush.repository, "update_read_cursors", outraced_once)
+    quick_flush.submit(bob.id, conversation.id, messages[6].id)
+    gevent.sleep(0.1)
+
+    assert len(calls) == 2
+    assert read_state(bob, conversation) == (messages[6].id, 3)
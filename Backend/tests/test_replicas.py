@@ -0,0 +1,94 @@
+import sqlite3
+import time
+
+import fakeredis
+import pytest
+from flask import Flask, current_app
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import column, table, text
+
+from app.utils.replicas import InMemoryWriteMarks, RedisWriteMarks, ReplicaRouter, RoutingSession, replica_binds
+
+STICKY_TTL = 0.2
+
+node = table("node", column("role"))
+
+@pytest.fixture
+def database(tmp_path):
+    """A primary and a replica in separate SQLite files, told apart by the row each holds"""
+    files = {role: tmp_path / f"{role}.sqlite" for role in ("primary", "replica")}
+    for role, path in files.items():
+        with sqlite3.connect(path) as connection:
+            connection.execute("CREATE TABLE node (role TEXT)")
+            connection.execute("INSERT INTO node VALUES (?)", (role,))
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{files['primary']}"
+    app.config["SQLALCHEMY_BINDS"] = replica_binds(f"sqlite:///{files['replica']}")
+    app.config["REPLICA_STICKY_TTL"] = STICKY_TTL
+    database = SQLAlchemy(app, session_options={"class_": RoutingSession})
+
+    with app.app_context():
+        yield database
+        database.session.remove()
+
+@pytest.fixture
+def workers(database):
+    """Two workers' routers sharing write marks through one fake Redis server"""
+    server = fakeredis.FakeServer()
+    routers = []
+    for _ in range(2):
+        router = ReplicaRouter()
+        router.init_app(current_app)
+        router.recent_writers = RedisWriteMarks(STICKY_TTL, client=fakeredis.FakeRedis(server=server, decode_responses=True))
+        routers.append(router)
+    return routers
+
+def read_from(database, router, user_id):
+    with router.reads(user_id):
+        return database.session.execute(text("SELECT role FROM node")).scalar_one()
+
+def test_reads_go_to_the_replica_and_writes_to_the_primary(database, workers):
+    router = workers[0]
+
+    assert read_from(database, router, 7) == "replica"
+
+    with router.reads(7):
+        database.session.execute(node.insert().values(role="written"))
+        database.session.commit()
+    assert database.session.execute(text("SELECT count(*) FROM node")).scalar_one() == 2
+
+def test_a_write_on_one_worker_pins_reads_on_another(database, workers):
+    writer, reader = workers
+
+    writer.mark_write(7)
+
+    assert read_from(database, reader, 7) == "primary"
+    assert read_from(database, reader, 8) == "replica"
+
+    time.sleep(STICKY_TTL + 0.1)
+    assert read_from(database, reader, 7) == "replica"
+
+def test_lagging_replicas_fall_back_to_the_primary(database, workers, monkeypatch):
+    router = workers[0]
+    monkeypatch.setattr(router, "get_lag", lambda key: router.max_lag + 1)
+
+    assert read_from(database, router, 7) == "primary"
+
+def test_unreachable_replicas_fall_back_to_the_primary(database, workers, monkeypatch):
+    router = workers[0]
+
+    def unreachable(key):
+        raise ConnectionError("replica down")
+
+    monkeypatch.setattr(router, "get_lag", unreachable)
+
+    assert read_from(database, router, 7) == "primary"
+
+def test_in_memory_marks_stay_in_their_process():
+    one, other = InMemoryWriteMarks(ttl=STICKY_TTL), InMemoryWriteMarks(ttl=STICKY_TTL)
+
+    one.mark(7)
+
+    assert one.is_marked("7")
+    assert not other.is_marked(7)
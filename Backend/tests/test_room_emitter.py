@@ -0,0 +1,95 @@
+import types
+
+import gevent
+import gevent.event
+import pytest
+
+from app.extensions import db, room_emitter
+from app.models.message import Message
+from app.utils.room_emitter import RoomEmitter
+
+class FakeSocketIO:
+    """Records broadcasts, lets tests hold them up and reports chosen sockets as having a backlog"""
+
+    def __init__(self):
+        self.emitted = []
+        self.disconnected = []
+        self.released = gevent.event.Event()
+        self.released.set()
+        self.backlogs = {} # sid -> queued packets
+        self.server = types.SimpleNamespace(
+            manager=types.SimpleNamespace(get_participants=lambda namespace, room: [(sid, sid) for sid in self.backlogs]),
+            eio=types.SimpleNamespace(sockets=self),
+            disconnect=lambda sid, namespace: self.disconnected.append(sid)
+        )
+
+    def get(self, eio_sid):
+        return types.SimpleNamespace(queue=types.SimpleNamespace(qsize=lambda: self.backlogs[eio_sid]))
+
+    def emit(self, event, data, room, skip_sid):
+        self.released.wait()
+        self.emitted.append((event, data, room, skip_sid))
+
+@pytest.fixture
+def emitter():
+    emitter = RoomEmitter(FakeSocketIO())
+    emitter.maxsize, emitter.timeout, emitter.backlog_limit, emitter.idle = 2, 0.05, 10, 0.1
+    return emitter
+
+def test_broadcasts_leave_in_order_per_room(emitter):
+    for i in range(5):
+        assert emitter.emit("new_message", i, room=1, skip_sid="sender" if i == 0 else None)
+        assert emitter.emit("new_message", i, room=2)
+        gevent.sleep(0)
+    gevent.sleep(0.01)
+
+    assert [data for _, data, room, _ in emitter.socketio.emitted if room == 1] == [0, 1, 2, 3, 4]
+    assert [data for _, data, room, _ in emitter.socketio.emitted if room == 2] == [0, 1, 2, 3, 4]
+    assert emitter.socketio.emitted[0][3] == ["sender"]
+
+def test_full_rooms_refuse_after_the_timeout(emitter):
+    emitter.socketio.released.clear()
+
+    # One broadcast held by the drainer and two waiting fill the room
+    accepted = []
+    for i in range(4):
+        accepted.append(emitter.emit("new_message", i, room=1))
+        gevent.sleep(0)
+
+    assert accepted == [True, True, True, False]
+    assert emitter.backlog() == 2
+
+    emitter.socketio.released.set()
+    gevent.sleep(0.01)
+    assert [data for _, data, _, _ in emitter.socketio.emitted] == [0, 1, 2]
+
+def test_slow_sockets_are_skipped_and_disconnected(emitter):
+    emitter.socketio.backlogs = {"reader": 0, "stalled": 11}
+
+    emitter.emit("new_message", "hi", room=1, skip_sid=["sender"])
+    gevent.sleep(0.01)
+
+    assert emitter.socketio.emitted == [("new_message", "hi", 1, ["sender", "stalled"])]
+    assert emitter.socketio.disconnected == ["stalled"]
+
+def test_idle_rooms_are_retired(emitter):
+    emitter.emit("new_message", "hi", room=1)
+    gevent.sleep(0.01)
+    assert 1 in emitter._queues
+
+    gevent.sleep(0.15)
+
+    assert emitter._queues == {}
+
+def test_busy_rooms_keep_the_message_and_tell_the_sender(make_user, make_conversation, socket_for, monkeypatch):
+    alice = make_user("alice")
+    conversation = make_conversation(alice)
+    socket = socket_for(alice)
+    monkeypatch.setattr(room_emitter, "emit", lambda *args, **kwargs: False)
+
+    socket.emit("send_message", {"conversation_id": conversation.id, "message": "hi"})
+    gevent.sleep(0.05)
+
+    errors = [packet["args"][0]["error"] for packet in socket.get_received() if packet["name"] == "error"]
+    assert errors == ["Conversation is busy, message saved but not broadcast"]
+    assert db.session.execute(db.select(Message.content)).scalars().all() == ["hi"]
@@ -0,0 +1,88 @@
+import collections
+import json
+
+import pytest
+
+from app import commands
+from app.extensions import db
+from app.models import conversation_participant
+from app.models.conversation import Conversation
+from app.models.message import Message
+from app.models.user import User
+from app.repositories.user_repository import UserRepository
+
+@pytest.fixture
+def cli(app):
+    runner = app.test_cli_runner()
+
+    def invoke(*args, **kwargs):
+        result = runner.invoke(args=list(args), **kwargs)
+        assert result.exit_code == 0, result.output
+        return result
+
+    return invoke
+
+def count(model):
+    return db.session.execute(db.select(db.func.count()).select_from(model)).scalar_one()
+
+def test_seeding_builds_a_searchable_skewed_dataset(cli, monkeypatch):
+    hashes = []
+    hash_password = commands.hash_password
+
+    def counting_hash(password):
+        hashes.append(password)
+        return hash_password(password)
+
+    monkeypatch.setattr(commands, "hash_password", counting_hash)
+
+    cli("seed", "users", "--count", "50", "--batch-size", "7")
+    cli("seed", "conversations", "--count", "10", "--min-members", "2", "--max-members", "20", "--batch-size", "7")
+    cli("seed", "messages", "--count", "500", "--batch-size", "64")
+
+    assert hashes == ["password"]
+    assert count(User) == 50
+    assert [row.username for row in UserRepository().search_by_username("user17")] == ["user17"]
+
+    sizes = db.session.execute(
+        db.select(db.func.count()).select_from(conversation_participant).group_by(conversation_participant.c.conversation_id)
+    ).scalars().all()
+    assert len(sizes) == 10 and all(2 <= size <= 20 for size in sizes)
+
+    per_conversation = collections.Counter(db.session.execute(db.select(Message.conversation_id)).scalars())
+    assert sum(per_conversation.values()) == 500
+    # Zipf activity puts far more messages on the hottest conversation than on an average one
+    assert max(per_conversation.values()) > 2 * 500 / 10
+
+    latest = db.session.execute(db.select(Message).order_by(Message.id.desc()).limit(1)).scalar_one()
+    summary = db.session.get(Conversation, latest.conversation_id)
+    assert summary.last_message_id == latest.id
+
+def test_seeding_appends_to_existing_data(cli):
+    cli("seed", "users", "--count", "3")
+    cli("seed", "users", "--count", "3")
+
+    assert count(User) == 6
+    assert len(set(db.session.execute(db.select(User.username)).scalars())) == 6
+
+def test_import_messages_from_ndjson(cli, make_user, make_conversation, tmp_path):
+    alice = make_user("alice")
+    conversation = make_conversation(alice)
+    source = tmp_path / "messages.ndjson"
+    source.write_text("\n".join(
+        json.dumps({"conversation_id": conversation.id, "sender_id": alice.id, "content": f"imported {i}", "timestamp": f"2025-01-01T00:00:0{i}"})
+        for i in range(3)
+    ) + "\n\n")
+
+    cli("seed", "import-messages", str(source))
+
+    assert count(Message) == 3
+    summary = db.session.get(Conversation, conversation.id)
+    db.session.refresh(summary)
+    assert summary.last_message_snippet == "imported 2"
+    assert summary.last_message_username == "alice"
+
+def test_conversations_need_users(app):
+    result = app.test_cli_runner().invoke(args=["seed", "conversations", "--count", "1"])
+
+    assert result.exit_code != 0
+    assert "Seed users first." in result.output
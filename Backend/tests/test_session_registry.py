@@ -0,0 +1,117 @@
+import fakeredis
+import gevent
+import pytest
+
+from app.extensions import session_registry, socketio
+from app.utils.session_registry import RedisSessionRegistry
+
+def received(socket, name):
+    return [packet["args"][0] for packet in socket.get_received() if packet["name"] == name]
+
+@pytest.fixture
+def redis_server():
+    """Points this process's registry at a fake Redis server other workers can share"""
+    server = fakeredis.FakeServer()
+    backend = session_registry.backend
+    session_registry.backend = RedisSessionRegistry(client=fakeredis.FakeRedis(server=server, decode_responses=True))
+
+    yield server
+
+    session_registry.backend.close()
+    session_registry.backend = backend
+
+@pytest.fixture
+def other_worker(redis_server):
+    """A second worker's registry sharing this process's Redis"""
+    worker = RedisSessionRegistry(client=fakeredis.FakeRedis(server=redis_server, decode_responses=True))
+    yield worker
+    worker.close()
+
+def test_workers_see_each_others_sockets(other_worker):
+    session_registry.add("local-sid", 7)
+    other_worker.add("remote-sid", 7)
+
+    assert session_registry.get_sessions(7) == {"local-sid", "remote-sid"}
+    assert other_worker.is_connected("7")
+    # Only the owning worker resolves a sid to its user
+    assert other_worker.get_user("local-sid") is None
+
+    session_registry.remove("local-sid")
+    other_worker.remove("remote-sid")
+    assert not session_registry.is_connected(7)
+
+def test_removed_user_leaves_the_room_on_every_socket(make_user, make_conversation, client_for, socket_for):
+    alice, bob = make_user("alice"), make_user("bob")
+    conversation = make_conversation(alice, bob)
+    alice_socket = socket_for(alice)
+    bob_sockets = [socket_for(bob), socket_for(bob)]
+
+    response = client_for(alice).post(f"/conversations/conversations/{conversation.id}/remove_user", json={"user_id": bob.id})
+    assert response.status_code == 200
+
+    alice_socket.emit("send_message", {"conversation_id": conversation.id, "message": "bob is gone"})
+    gevent.sleep(0.05)
+
+    assert [message["content"] for message in received(alice_socket, "new_message")] == ["bob is gone"]
+    assert all(received(socket, "new_message") == [] for socket in bob_sockets)
+
+def test_added_user_enters_the_room_without_reconnecting(make_user, make_conversation, client_for, socket_for):
+    alice, bob = make_user("alice"), make_user("bob")
+    conversation = make_conversation(alice)
+    alice_socket, bob_socket = socket_for(alice), socket_for(bob)
+
+    response = client_for(alice).post(f"/conversations/conversations/{conversation.id}/add_user", json={"user_id": bob.id})
+    assert response.status_code == 200
+
+    alice_socket.emit("send_message", {"conversation_id": conversation.id, "message": "welcome"})
+    gevent.sleep(0.05)
+
+    assert [message["content"] for message in received(bob_socket, "new_message")] == ["welcome"]
+
+def test_removal_reaches_sockets_of_other_workers(make_user, make_conversation, client_for, other_worker, monkeypatch):
+    alice, bob = make_user("alice"), make_user("bob")
+    conversation = make_conversation(alice, bob)
+    other_worker.add("remote-sid", bob.id)
+
+    left = []
+    monkeypatch.setattr(socketio.server.manager, "leave_room", lambda sid, namespace, room: left.append((sid, room)))
+
+    response = client_for(alice).post(f"/conversations/conversations/{conversation.id}/remove_user", json={"user_id": bob.id})
+
+    assert response.status_code == 200
+    # The manager relays leave_room through the message queue when the sid is not local
+    assert ("remote-sid", conversation.id) in left
+
+def test_sockets_of_a_killed_worker_expire(redis_server):
+    killed = RedisSessionRegistry(client=fakeredis.FakeRedis(server=redis_server, decode_responses=True), ttl=0.1)
+    killed.add("dead-sid", 7)
+    session_registry.add("live-sid", 7)
+    assert session_registry.get_sessions(7) == {"dead-sid", "live-sid"}
+
+    # SIGKILL leaves no chance to clean up, the heartbeat simply stops
+    killed._heartbeat.kill()
+    gevent.sleep(0.15)
+
+    assert session_registry.get_sessions(7) == {"live-sid"}
+    assert fakeredis.FakeRedis(server=redis_server, decode_responses=True).hkeys("chatster:sessions:7") == ["live-sid"]
+
+def test_heartbeat_keeps_a_live_worker_connected(redis_server):
+    worker = RedisSessionRegistry(client=fakeredis.FakeRedis(server=redis_server, decode_responses=True), ttl=0.1)
+    worker.add("sid", 7)
+
+    gevent.sleep(0.3)
+
+    assert session_registry.is_connected(7)
+    worker.remove("sid")
+    assert not session_registry.is_connected(7)
+
+def test_shutdown_removes_a_workers_sockets(redis_server, other_worker):
+    other_worker.add("remote-sid", 7)
+    other_worker.add("remote-sid-2", 8)
+    session_registry.add("local-sid", 7)
+
+    other_worker.close()
+
+    assert session_registry.get_sessions(7) == {"local-sid"}
+    assert not session_registry.is_connected(8)
+    assert other_worker.count() == 0
@@ -0,0 +1,40 @@
+from app.extensions import session_registry, socketio
+
+def received(socket, name):
+    return [packet["args"][0] for packet in socket.get_received() if packet["name"] == name]
+
+def test_every_socket_of_a_user_gets_new_conversations(make_user, client_for, socket_for, monkeypatch):
+    alice, bob = make_user("alice"), make_user("bob")
+    bob_sockets = [socket_for(bob) for _ in range(10)]
+
+    emits = []
+    emit = socketio.emit
+
+    def recording_emit(event, *args, **kwargs):
+        emits.append((event, kwargs.get("room")))
+        return emit(event, *args, **kwargs)
+
+    monkeypatch.setattr(socketio, "emit", recording_emit)
+
+    response = client_for(alice).post("/conversations/conversations", json={"chat_name": "pair", "participant_ids": [bob.id]})
+    assert response.status_code == 201
+
+    assert all([conversation["id"] for conversation in received(socket, "new_conversation")] == [response.json["id"]] for socket in bob_sockets)
+    # One emit per participant, however many sockets they have
+    assert sorted(room for event, room in emits if event == "new_conversation") == sorted([f"user:{alice.id}", f"user:{bob.id}"])
+
+def test_disconnecting_one_socket_keeps_the_others(make_user, make_conversation, client_for, socket_for):
+    alice, bob = make_user("alice"), make_user("bob")
+    conversation = make_conversation(alice)
+    phone, laptop = socket_for(bob), socket_for(bob)
+
+    phone.disconnect()
+
+    assert session_registry.is_connected(bob.id)
+    assert len(session_registry.get_sessions(bob.id)) == 1
+
+    client_for(alice).post(f"/conversations/conversations/{conversation.id}/add_user", json={"user_id": bob.id})
+    assert [conversation["id"] for conversation in received(laptop, "new_conversation")] == [conversation.id]
+
+    laptop.disconnect()
+    assert not session_registry.is_connected(bob.id)
@@ -0,0 +1,82 @@
+import datetime
+
+import pytest
+
+from app.extensions import db
+from app.models.message import Message
+
+def ago(seconds):
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None) - datetime.timedelta(seconds=seconds)
+
+def insert_message(conversation, sender, id, timestamp):
+    db.session.execute(db.insert(Message).values(id=id, content=f"message {id}", timestamp=timestamp, conversation_id=conversation.id, sender_id=sender.id))
+    db.session.commit()
+
+def sync(client, cursor, **params):
+    response = client.get("/conversations/sync", query_string={"since": cursor, **params})
+    assert response.status_code == 200
+    return response.json
+
+@pytest.fixture
+def no_margin(app):
+    app.config["SYNC_SAFETY_MARGIN_MS"] = 0
+
+def test_sync_returns_messages_memberships_and_new_conversations(make_user, make_conversation, client_for, no_margin):
+    alice, bob = make_user("alice"), make_user("bob")
+    shared = make_conversation(alice, bob)
+    client = client_for(bob)
+    cursor = client.get("/conversations/sync").json["next_cursor"]
+
+    insert_message(shared, alice, 1, ago(3))
+    response = client_for(alice).post("/conversations/conversations", json={"chat_name": "new", "participant_ids": [bob.id]})
+    changes = sync(client, cursor)
+
+    assert [message["id"] for message in changes["messages"]] == [1]
+    assert [(event["conversation_id"], event["kind"]) for event in changes["membership"]] == [(response.json["id"], "added")]
+    assert [conversation["id"] for conversation in changes["conversations"]] == [response.json["id"]]
+    assert sync(client, changes["next_cursor"])["messages"] == []
+
+def test_sync_pages_with_has_more(make_user, make_conversation, client_for, no_margin):
+    alice = make_user("alice")
+    conversation = make_conversation(alice)
+    client = client_for(alice)
+    cursor = client.get("/conversations/sync").json["next_cursor"]
+    for id in range(1, 6):
+        insert_message(conversation, alice, id, ago(10))
+
+    seen, more = [], True
+    while more:
+        changes = sync(client, cursor, limit=2)
+        seen += [message["id"] for message in changes["messages"]]
+        cursor, more = changes["next_cursor"], changes["has_more"]
+
+    assert seen == [1, 2, 3, 4, 5]
+
+def test_cursor_stays_behind_recent_writes(make_user, make_conversation, client_for):
+    alice = make_user("alice")
+    conversation = make_conversation(alice)
+    client = client_for(alice)
+    insert_message(conversation, alice, 1, ago(60))
+    cursor = client.get("/conversations/sync").json["next_cursor"]
+
+    insert_message(conversation, alice, 3, ago(1))
+    first = sync(client, cursor)
+    assert [message["id"] for message in first["messages"]] == [3]
+
+    # A transaction holding id 2 commits after id 3 was already served
+    insert_message(conversation, alice, 2, ago(2))
+    second = sync(client, first["next_cursor"])
+
+    assert [message["id"] for message in second["messages"]] == [2, 3]
+    assert second["has_more"] is False
+
+def test_initial_cursor_excludes_recent_writes(make_user, make_conversation, client_for):
+    alice = make_user("alice")
+    conversation = make_conversation(alice)
+    insert_message(conversation, alice, 1, ago(60))
+    insert_message(conversation, alice, 2, ago(1))
+    client = client_for(alice)
+
+    cursor = client.get("/conversations/sync").json["next_cursor"]
+
+    assert [message["id"] for message in sync(client, cursor)["messages"]] == [2]
@@ -0,0 +1,29 @@
+import datetime
+
+import gevent
+
+from app.dtos.message_dto import MessageDTO
+
+def test_dtos_serialize_utc_with_an_offset():
+    naive = MessageDTO(1, "hi", datetime.datetime(2025, 1, 1, 12), 1, "alice")
+    aware = MessageDTO(1, "hi", datetime.datetime(2025, 1, 1, 13, tzinfo=datetime.timezone(datetime.timedelta(hours=1))), 1, "alice")
+
+    assert naive.to_dict()["timestamp"] == aware.to_dict()["timestamp"] == datetime.datetime(2025, 1, 1, 12, tzinfo=datetime.timezone.utc)
+
+def test_live_history_and_export_timestamps_agree(make_user, make_conversation, client_for, socket_for):
+    alice = make_user("alice")
+    conversation = make_conversation(alice)
+    socket = socket_for(alice)
+    client = client_for(alice)
+
+    socket.emit("send_message", {"conversation_id": conversation.id, "message": "hi"})
+    gevent.sleep(0.05)
+    live = next(packet["args"][0] for packet in socket.get_received() if packet["name"] == "new_message")["timestamp"]
+
+    history = client.get(f"/conversations/conversations/{conversation.id}/messages").json["messages"][0]["timestamp"]
+    exported = client.get(f"/conversations/conversations/{conversation.id}/export").get_json(force=True)["timestamp"]
+    csv_row = client.get(f"/conversations/conversations/{conversation.id}/export", query_string={"format": "csv"}).text.splitlines()[1]
+
+    assert live == history == exported
+    assert live.endswith("+00:00")
+    assert csv_row.split(",")[1] == live
@@ -0,0 +1,81 @@
+import gevent
+import pytest
+
+from app.services.typing_indicators import TypingIndicators, typing_indicators
+
+@pytest.fixture
+def quick_typing(app):
+    app.config.update(TYPING_TIMEOUT_MS=200, TYPING_BROADCAST_INTERVAL_MS=20, TYPING_TICK_MS=10)
+    typing_indicators.init_app(app)
+    yield typing_indicators
+    app.config.update(TYPING_TIMEOUT_MS=5000, TYPING_BROADCAST_INTERVAL_MS=500, TYPING_TICK_MS=100)
+    typing_indicators.init_app(app)
+
+def typing_events(socket):
+    return [packet["args"][0] for packet in socket.get_received() if packet["name"] == "typing"]
+
+def errors(socket):
+    return [packet["args"][0]["error"] for packet in socket.get_received() if packet["name"] == "error"]
+
+def test_typists_are_announced_to_the_room_with_integer_ids(make_user, make_conversation, socket_for, quick_typing):
+    alice, bob = make_user("alice"), make_user("bob")
+    conversation = make_conversation(alice, bob)
+    alice_socket, bob_socket = socket_for(alice), socket_for(bob)
+
+    bob_socket.emit("typing", {"conversation_id": conversation.id})
+    gevent.sleep(0.05)
+    assert typing_events(alice_socket) == [{"conversation_id": conversation.id, "started": [{"user_id": bob.id, "username": "bob"}], "stopped": []}]
+    assert typing_events(bob_socket) == []
+
+    bob_socket.emit("typing", {"conversation_id": conversation.id, "typing": False})
+    gevent.sleep(0.05)
+    assert typing_events(alice_socket) == [{"conversation_id": conversation.id, "started": [], "stopped": [bob.id]}]
+
+def test_silent_typists_expire(make_user, make_conversation, socket_for, quick_typing):
+    alice, bob = make_user("alice"), make_user("bob")
+    conversation = make_conversation(alice, bob)
+    alice_socket, bob_socket = socket_for(alice), socket_for(bob)
+
+    bob_socket.emit("typing", {"conversation_id": conversation.id})
+    gevent.sleep(0.05)
+    typing_events(alice_socket)
+    gevent.sleep(0.3)
+
+    assert typing_events(alice_socket) == [{"conversation_id": conversation.id, "started": [], "stopped": [bob.id]}]
+
+def test_sending_a_message_stops_typing(make_user, make_conversation, socket_for, quick_typing):
+    alice, bob = make_user("alice"), make_user("bob")
+    conversation = make_conversation(alice, bob)
+    alice_socket, bob_socket = socket_for(alice), socket_for(bob)
+
+    bob_socket.emit("typing", {"conversation_id": conversation.id})
+    gevent.sleep(0.05)
+    typing_events(alice_socket)
+    bob_socket.emit("send_message", {"conversation_id": conversation.id, "message": "hi"})
+    gevent.sleep(0.05)
+
+    assert typing_events(alice_socket) == [{"conversation_id": conversation.id, "started": [], "stopped": [bob.id]}]
+
+def test_outsiders_cannot_type(make_user, make_conversation, socket_for, quick_typing):
+    alice, mallory = make_user("alice"), make_user("mallory")
+    conversation = make_conversation(alice)
+    alice_socket, mallory_socket = socket_for(alice), socket_for(mallory)
+
+    mallory_socket.emit("typing", {"conversation_id": conversation.id})
+    gevent.sleep(0.05)
+
+    assert errors(mallory_socket) == ["User is not part of conversation!"]
+    assert typing_events(alice_socket) == []
+
+def test_string_and_integer_ids_name_the_same_typist():
+    emitted = []
+    indicators = TypingIndicators()
+    indicators.emit = lambda *args, **kwargs: emitted.append(args)
+
+    indicators.start("sid", "7", "bob", 1)
+    indicators.stop(7, 1)
+
+    # The stop cancels the unheard start, so nothing is broadcast and nothing is left behind
+    assert indicators._typing == {} and indicators._by_sid == {}
+    assert indicators._changes == {1: {}}
+    assert emitted == []
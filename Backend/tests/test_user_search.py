@@ -0,0 +1,59 @@
+from app.extensions import username_search_cache
+from app.repositories.user_repository import UserRepository
+
+def search(client, username, **params):
+    response = client.get("/users/search", query_string={"username": username, **params})
+    assert response.status_code == 200
+    return [profile["username"] for profile in response.json["profiles"]]
+
+def test_search_ranks_exact_then_prefix_then_infix(make_user, client_for):
+    for username in ("xannax", "annabel", "ann", "joanne", "anna", "bob"):
+        make_user(username)
+    client = client_for(make_user("carol"))
+
+    assert search(client, "ANN", limit=10) == ["ann", "anna", "annabel", "joanne", "xannax"]
+
+def test_search_pages_through_the_ranking(make_user, client_for):
+    for username in ("ann", "anna", "annabel", "joanne", "xannax"):
+        make_user(username)
+    client = client_for(make_user("carol"))
+
+    pages = [search(client, "ann", limit=2, offset=offset) for offset in (0, 2, 4)]
+
+    assert pages == [["ann", "anna"], ["annabel", "joanne"], ["xannax"]]
+
+def test_short_terms_match_prefixes_only(make_user, client_for):
+    for username in ("al", "alice", "sally"):
+        make_user(username)
+    client = client_for(make_user("carol"))
+
+    assert search(client, "al") == ["al", "alice"]
+
+def test_wildcards_are_matched_literally(make_user, client_for):
+    make_user("a_b_c")
+    make_user("axbxc")
+    client = client_for(make_user("carol"))
+
+    assert search(client, "a_b") == ["a_b_c"]
+
+def test_renaming_drops_cached_results(make_user, client_for):
+    alice = make_user("alice")
+    client = client_for(alice)
+    assert search(client, "alice") == ["alice"]
+    assert username_search_cache.get(("alice", 5, 0)) is not None
+
+    UserRepository().update_username(alice.id, "alicia")
+
+    assert search(client, "alice") == []
+    assert search(client, "alicia") == ["alicia"]
+
+def test_search_is_served_by_the_trigram_index(make_user, explain, statements):
+    make_user("anna")
+    statements.clear()
+
+    UserRepository().search_by_username("anna")
+
+    statement, params = next((statement, params) for statement, params in statements if "username_trigram" in statement)
+    plan = explain(statement, params)
+    assert "SEARCH username_trigram USING" in plan
+    assert "SCAN user" not in plan